@@ -0,0 +1,224 @@
+import fitz  # PyMuPDF
+import os
+import re
+import itertools
+from No_OCR_unified import count_language_indicators, detect_language_from_counts
+import OCR_unified
+from OCR_unified import (POPPLER_PATH, OCR_DPI, detect_language_from_image, iter_ocr_pages, _is_error_page,
+                         summarize_language_detection, get_cache_options as ocr_cache_options)
+from preprocessing import choose_page_dpi
+from page_source import iter_pdf_pages, select_pages
+from output_writers import open_output_writer
+from bijoy_converter import convert_bijoy_to_unicode
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# A page needs OCR when its embedded text has fewer visible characters than this
+MIN_TEXT_CHARS = 20
+# ...or when more than this share of its characters are unreadable (missing glyph mappings)
+MAX_UNREADABLE_RATIO = 0.1
+# ...or when images cover this much of the page and the text layer is thin (e.g. a scan with a stamp)
+SCAN_IMAGE_AREA_RATIO = 0.8
+SCAN_MAX_TEXT_CHARS = 200
+
+# Replacement characters, private-use glyphs and control characters left by fonts without a Unicode mapping
+UNREADABLE_PATTERN = re.compile(r'[\ufffd\ue000-\uf8ff\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def analyze_page(page):
+    """
+    Decide whether a page's embedded text is usable or the page needs OCR
+
+    Args:
+        page: PyMuPDF page
+
+    Returns:
+        Tuple of (routing dict, embedded text). The routing dict holds the
+        page number, 'route' ('text' or 'ocr'), 'reason' and the measurements.
+    """
+    text = page.get_text()
+    visible_chars = len(re.sub(r'\s', '', text))
+    unreadable_ratio = len(UNREADABLE_PATTERN.findall(text)) / visible_chars if visible_chars else 0.0
+
+    page_area = abs(page.rect) or 1
+    image_area = 0
+    for info in page.get_image_info():
+        image_area += abs(fitz.Rect(info['bbox']) & page.rect)
+    image_ratio = min(1.0, image_area / page_area)
+
+    if visible_chars < MIN_TEXT_CHARS:
+        route, reason = 'ocr', 'no text layer'
+    elif unreadable_ratio > MAX_UNREADABLE_RATIO:
+        route, reason = 'ocr', 'unreadable glyphs'
+    elif image_ratio >= SCAN_IMAGE_AREA_RATIO and visible_chars < SCAN_MAX_TEXT_CHARS:
+        route, reason = 'ocr', 'scanned image'
+    else:
+        route, reason = 'text', 'embedded text'
+
+    routing = {
+        'page': page.number + 1,
+        'route': route,
+        'reason': reason,
+        'text_chars': visible_chars,
+        'unreadable_ratio': round(unreadable_ratio, 3),
+        'image_ratio': round(image_ratio, 3),
+    }
+    return routing, text
+
+
+def get_cache_options():
+    """Options that change Auto output, used in result cache keys"""
+    options = ocr_cache_options()
+    options.update({
+        'min_text_chars': MIN_TEXT_CHARS,
+        'max_unreadable_ratio': MAX_UNREADABLE_RATIO,
+        'scan_image_area_ratio': SCAN_IMAGE_AREA_RATIO,
+        'scan_max_text_chars': SCAN_MAX_TEXT_CHARS,
+        'bijoy_converter': 'table',
+        'bijoy_detection': 'per_page',
+    })
+    return options
+
+
+def process_auto_pdf(pdf_path, output_path, output_format='txt', progress_callback=None, workers=None, metadata=None,
+                     page_callback=None, page_numbers=None):
+    """
+    Process PDF page by page, using embedded text where it is usable and OCR elsewhere
+
+    Each page is inspected with PyMuPDF (text length, unreadable glyphs, image
+    coverage). Pages with usable text are extracted directly; the language of
+    each is detected from its own text, and only pages with Bijoy-encoded
+    Bangla are converted to Unicode. The rest are rasterized and OCR'd. Pages
+    outside page_numbers are not even inspected.
+
+    Args:
+        pdf_path: Path to the input PDF file
+        output_path: Path to save the output file
+        output_format: 'txt' or 'docx'
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        workers: Number of OCR worker processes (None = OCR_unified.OCR_WORKERS)
+        metadata: Optional dict that receives 'pages' (pages processed), 'language', 'text_pages',
+                  'ocr_pages', the per-page 'routing' decisions (with the 'language' of text pages),
+                  'has_errors' and 'failed_pages' (OCR pages tesseract failed on)
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
+
+    Returns:
+        Path to the output file
+    """
+    logger.info("Analyzing PDF pages...", extra={'pdf': pdf_path})
+
+    page_texts = {}
+    page_dpis = {}
+    routing = []
+    with fitz.open(pdf_path) as doc:
+        page_numbers = select_pages(page_numbers, len(doc))
+        page_count = len(page_numbers)
+        for page_number in page_numbers:
+            page = doc[page_number - 1]
+            with metrics.stage('analyze_page', pages=1):
+                decision, text = analyze_page(page)
+            routing.append(decision)
+            if decision['route'] == 'text':
+                # Per page, so English pages of a Bijoy document are not run through the converter
+                counts = count_language_indicators(text)
+                decision['language'] = detect_language_from_counts(*counts)
+                decision['bijoy'] = decision['language'] == 'bangla' and counts[1] > counts[0]
+                if decision['bijoy']:
+                    try:
+                        with metrics.stage('bijoy', pages=1):
+                            text = convert_bijoy_to_unicode(text)
+                    except Exception as e:
+                        logger.warning(f"Bijoy conversion failed on page {decision['page']}: {e}",
+                                       extra={'page': decision['page']})
+                page_texts[decision['page']] = text
+            elif OCR_unified.OCR_ADAPTIVE_DPI:
+                page_dpis[decision['page']] = choose_page_dpi(page, OCR_DPI)
+
+    ocr_page_numbers = [decision['page'] for decision in routing if decision['route'] == 'ocr']
+    logger.info(
+        f"PDF has {page_count} pages: {len(page_texts)} with usable text, {len(ocr_page_numbers)} need OCR",
+        extra={'pages': page_count, 'text_pages': len(page_texts), 'ocr_pages': len(ocr_page_numbers)}
+    )
+
+    text_languages = {decision['language'] for decision in routing if decision['route'] == 'text'}
+    detected_language = (text_languages.pop() if len(text_languages) == 1 else 'mixed') if text_languages else None
+
+    def report_progress(ocr_done, ocr_total):
+        if progress_callback:
+            progress_callback(len(page_texts) + ocr_done, page_count)
+
+    report_progress(0, len(ocr_page_numbers))
+
+    ocr_language = None
+    ocr_results = None
+    failed_pages = []
+    ocr_stats = {}
+    pages = None
+    try:
+        if ocr_page_numbers:
+            pages = iter_pdf_pages(pdf_path, dpi=OCR_DPI, poppler_path=POPPLER_PATH, page_numbers=ocr_page_numbers,
+                                   page_dpis=page_dpis)
+            if OCR_unified.OCR_LANGUAGE_PER_PAGE:
+                # The OCR workers pick 'ben+eng' or 'eng+ben' for each page
+                lang_config = None
+                all_pages = pages
+            else:
+                first_page = next(pages, None)
+                with metrics.stage('detect_language'):
+                    ocr_language = detect_language_from_image(first_page[1]) if first_page else 'mixed'
+                lang_config = 'eng+ben' if ocr_language == 'english' else 'ben+eng'
+                logger.info(f"OCR language: {ocr_language} ({lang_config})", extra={'language': ocr_language})
+
+                all_pages = itertools.chain([first_page], pages) if first_page else pages
+                first_page = None
+            ocr_results = iter_ocr_pages(all_pages, lang_config, len(ocr_page_numbers), workers, report_progress,
+                                         stats=ocr_stats)
+
+        # Write the pages in order: text pages right away, OCR pages as the workers finish them
+        with open_output_writer(output_path, output_format, page_callback=page_callback) as writer:
+            for decision in routing:
+                page_number = decision['page']
+                if decision['route'] == 'text':
+                    writer.write_page(page_number, f"--- Page {page_number} ---\n{page_texts[page_number]}\n\n")
+                else:
+                    page_number, page_text = next(ocr_results)
+                    if _is_error_page(page_number, page_text):
+                        failed_pages.append(page_number)
+                    writer.write_page(page_number, page_text)
+    finally:
+        if ocr_results is not None:
+            ocr_results.close()
+        if pages is not None:
+            pages.close()
+    logger.info(f"✅ Extracted text saved to {output_path}", extra={'output': output_path})
+
+    detection_summary = None
+    if ocr_page_numbers and OCR_unified.OCR_LANGUAGE_PER_PAGE:
+        ocr_language, detection_summary = summarize_language_detection(ocr_stats)
+
+    if metadata is not None:
+        metadata['pages'] = page_count
+        metadata['language'] = detected_language or ocr_language
+        if detection_summary is not None:
+            metadata['language_detection'] = detection_summary
+        metadata['text_pages'] = len(page_texts)
+        metadata['ocr_pages'] = len(ocr_page_numbers)
+        metadata['routing'] = routing
+        metadata['has_errors'] = bool(failed_pages)
+        metadata['failed_pages'] = failed_pages
+
+    return output_path
+
+
+# Main execution for testing
+if __name__ == "__main__":
+    # Test with your PDF files
+    test_pdf = "test.pdf"
+    output_txt = "output_auto.txt"
+
+    if os.path.exists(test_pdf):
+        process_auto_pdf(test_pdf, output_txt, 'txt')
+    else:
+        print("Please provide a test PDF file")
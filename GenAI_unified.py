@@ -1,15 +1,89 @@
-import os
-import tempfile
-from pdf2image import convert_from_path
 from PIL import Image
 import google.generativeai as genai
 import io
-import shutil
-from docx import Document
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import fitz  # PyMuPDF
+from page_source import get_page_count, iter_pdf_pages, select_pages
+from result_cache import hash_file, make_cache_key
+from checkpoints import iter_checkpointed_pages, offset_progress
+from page_dedup import PageDeduplicator
+from output_writers import open_output_writer
+from preprocessing import choose_page_dpi, preprocess_image
+import metrics
+
+logger = metrics.get_logger(__name__)
 
 # For Windows users: Update poppler path if needed
 POPPLER_PATH = r'C:\Program Files\poppler-24.08.0\Library\bin'
 
+# Gemini model and page rendering resolution
+GENAI_MODEL_NAME = 'gemini-2.0-flash-exp'
+GENAI_DPI = 300
+
+# Maximum Gemini requests in flight per job
+GENAI_MAX_IN_FLIGHT = 4
+# Requests-per-minute quota shared by all jobs using the same API key (None = no limit)
+GENAI_REQUESTS_PER_MINUTE = 15
+# Rate limiters kept for recently used API keys; the least recently used is dropped beyond this
+GENAI_MAX_RATE_LIMITERS = 64
+# Retries for rate-limit (429) and server (5xx) errors, with exponential backoff in seconds
+GENAI_MAX_RETRIES = 5
+GENAI_BACKOFF_BASE = 1.0
+GENAI_BACKOFF_MAX = 32.0
+# Seconds allowed per page, including rate-limit waits and retries
+GENAI_PAGE_DEADLINE = 180
+# Pick the DPI per page from the scan resolution or text size, capped at GENAI_DPI (False = always GENAI_DPI)
+GENAI_ADAPTIVE_DPI = True
+# Image preprocessing before upload (see preprocessing.STEPS); cropping margins shrinks each request
+GENAI_PREPROCESSING = ('crop_margins',)
+# Page rasterizer: 'pymupdf' renders in-process, 'pdf2image' runs poppler (see page_source.RENDERERS)
+GENAI_RENDERER = 'pymupdf'
+# JPEG quality of the uploaded page images
+GENAI_JPEG_QUALITY = 75
+# Longest side of an uploaded page image, in pixels. Gemini scales larger images down to
+# 3072x3072 anyway, so pages are rendered at a DPI that fits (None = no limit)
+GENAI_MAX_IMAGE_SIDE = 3072
+# Pages sent in one Gemini request (1 = one request per page). Batched responses that
+# cannot be split back into pages are retried one page per request
+GENAI_BATCH_SIZE = 1
+# Skip pages with almost no ink instead of sending them (see page_dedup)
+GENAI_SKIP_BLANK_PAGES = True
+# Send repeated pages (cover sheets, letterheads, forms) once and copy the text to the others
+GENAI_REUSE_DUPLICATE_PAGES = True
+
+# Output layout (see output_writers.open_output_writer); GenAI page texts carry no page header
+OUTPUT_LAYOUT = {
+    'page_header': "--- Page {page} ---\n",
+    'page_separator': "\n\n--- Page Break ---\n\n",
+    'docx_layout': 'page',
+}
+
+OCR_PROMPT = """
+Please perform OCR on this image.
+Extract all the text visible (Bangla, English, or mixed).
+Preserve the original structure, line breaks, and paragraph formatting as accurately as possible based on the visual layout.
+Do not add any commentary, explanations, or text other than the extracted content from the image.
+Output *only* the extracted text.
+"""
+
+# Marker put before each image of a batched request, and expected before each page of the response
+PAGE_MARKER = "<<<PAGE {number}>>>"
+
+BATCH_OCR_PROMPT = """
+Please perform OCR on each of the following {count} images. They are consecutive pages of one document, in order.
+Extract all the text visible on each page (Bangla, English, or mixed).
+Preserve the original structure, line breaks, and paragraph formatting as accurately as possible based on the visual layout.
+Start the text of each page with a line containing only the marker given before its image: <<<PAGE 1>>> for the first image, <<<PAGE 2>>> for the second, and so on. Write the marker even when a page has no text.
+Do not add any commentary, explanations, or text other than the page markers and the extracted content from the images.
+"""
+
+_PAGE_MARKER_PATTERN = re.compile(r'^[ \t]*<<<PAGE (\d+)>>>[ \t]*$', re.MULTILINE)
+
 
 def setup_gemini(api_key):
     """
@@ -22,111 +96,479 @@ def setup_gemini(api_key):
         Initialized Gemini model or None if failed
     """
     genai.configure(api_key=api_key)
-    model_name = 'gemini-2.0-flash-exp'
+    model_name = GENAI_MODEL_NAME
     
-    print(f"Initializing Gemini model: {model_name}")
+    logger.info(f"Initializing Gemini model: {model_name}")
     try:
         model = genai.GenerativeModel(model_name)
-        print("Model initialized successfully.")
+        logger.info("Model initialized successfully.")
         return model
     except Exception as e:
-        print(f"Error initializing model '{model_name}': {e}")
+        logger.error(f"Error initializing model '{model_name}': {e}")
         return None
 
 
-def convert_pdf_to_images_genai(pdf_path):
+def get_cache_options():
+    """Options that change GenAI output, used in result cache keys"""
+    options = {
+        'dpi': GENAI_DPI,
+        'adaptive_dpi': GENAI_ADAPTIVE_DPI,
+        'preprocessing': list(GENAI_PREPROCESSING),
+        'renderer': GENAI_RENDERER,
+        'jpeg_quality': GENAI_JPEG_QUALITY,
+        'max_image_side': GENAI_MAX_IMAGE_SIDE,
+        'model': GENAI_MODEL_NAME,
+        'prompt': OCR_PROMPT,
+        'skip_blank_pages': GENAI_SKIP_BLANK_PAGES,
+        'reuse_duplicate_pages': GENAI_REUSE_DUPLICATE_PAGES,
+    }
+    if GENAI_BATCH_SIZE > 1:
+        options['batch_size'] = GENAI_BATCH_SIZE
+        options['batch_prompt'] = BATCH_OCR_PROMPT
+    return options
+
+
+def encode_image_genai(image, quality=None, max_side=None):
     """
-    Convert PDF to images for GenAI processing
+    Encode a page image as JPEG bytes for a Gemini request
+    
+    Args:
+        image: Path to the image file, or a PIL Image
+        quality: JPEG quality (None = GENAI_JPEG_QUALITY)
+        max_side: Scale the image down so its longest side fits (None = GENAI_MAX_IMAGE_SIDE)
+        
+    Returns:
+        JPEG bytes
+    """
+    img = Image.open(image) if isinstance(image, str) else image
+    max_side = max_side or GENAI_MAX_IMAGE_SIDE
+    if max_side and max(img.size) > max_side:
+        img = img.copy()
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    img_byte_arr = io.BytesIO()
+    img.save(img_byte_arr, format='JPEG', quality=quality or GENAI_JPEG_QUALITY)
+    return img_byte_arr.getvalue()
+
+
+def choose_genai_page_dpi(page, max_side=None):
+    """
+    Rendering resolution of one page for GenAI
+    
+    Adaptive (see preprocessing.choose_page_dpi) when GENAI_ADAPTIVE_DPI is set,
+    never above GENAI_DPI, and low enough that the page fits in max_side
+    pixels, so pages are not rendered larger than what is uploaded.
+    
+    Args:
+        page: PyMuPDF page of an open document
+        max_side: Longest image side in pixels (None = GENAI_MAX_IMAGE_SIDE)
+        
+    Returns:
+        DPI
+    """
+    max_side = max_side or GENAI_MAX_IMAGE_SIDE
+    dpi = min(choose_page_dpi(page, GENAI_DPI), GENAI_DPI) if GENAI_ADAPTIVE_DPI else GENAI_DPI
+    longest = max(page.rect.width, page.rect.height)
+    if max_side and longest:
+        dpi = min(dpi, int(max_side * 72 / longest))
+    return dpi
+
+
+def choose_genai_page_dpis(pdf_path, max_side=None, page_numbers=None):
+    """
+    Rendering resolution of each page for GenAI (see choose_genai_page_dpi)
     
     Args:
         pdf_path: Path to the PDF file
+        max_side: Longest image side in pixels (None = GENAI_MAX_IMAGE_SIDE)
+        page_numbers: 1-based pages to inspect (None = all pages)
         
     Returns:
-        Tuple of (image_paths, temp_dir)
+        Dict of page number -> DPI
     """
-    print("Converting PDF to images for GenAI processing...")
-    if not os.path.exists(pdf_path):
-        print(f"Error: PDF file not found at {pdf_path}")
-        return [], None
+    with fitz.open(pdf_path) as doc:
+        if page_numbers is None:
+            page_numbers = range(1, len(doc) + 1)
+        return {page_number: choose_genai_page_dpi(doc[page_number - 1], max_side) for page_number in page_numbers}
 
-    temp_dir = tempfile.mkdtemp()
-    print(f"Created temporary directory for images: {temp_dir}")
 
-    try:
-        images = convert_from_path(
-            pdf_path,
-            dpi=300,
-            output_folder=temp_dir,
-            fmt='jpeg',
-            thread_count=4,
-            paths_only=True,
-            poppler_path=POPPLER_PATH
-        )
-        image_paths = images
-        print(f"Converted {len(image_paths)} pages to images.")
-        return image_paths, temp_dir
-    except Exception as e:
-        print(f"An error occurred during PDF to image conversion: {e}")
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
-        return [], None
+def parse_genai_response(response):
+    """Return the text of a Gemini response, or None if it has no text"""
+    if hasattr(response, 'text'):
+        return response.text
+    elif response.parts:
+        return "".join(part.text for part in response.parts if hasattr(part, 'text'))
+    return None
 
 
-def extract_text_from_image_genai(image_path, model):
+def split_batch_response(text, count):
     """
-    Extract text from image using Gemini AI
+    Split the text of a batched response into pages
     
     Args:
-        image_path: Path to the image file
-        model: Initialized Gemini model
+        text: Response text, with a PAGE_MARKER line before each page
+        count: Number of pages sent in the request
         
     Returns:
-        Extracted text or error message
+        List of count page texts, or None if the markers are missing, out of
+        order or there is text before the first one
     """
-    if not model:
-        print("Model not initialized, cannot extract text.")
+    if text is None:
         return None
-
-    if not os.path.exists(image_path):
-        print(f"Error: Image file not found at {image_path}")
+    markers = list(_PAGE_MARKER_PATTERN.finditer(text))
+    if [int(marker.group(1)) for marker in markers] != list(range(1, count + 1)):
+        return None
+    if text[:markers[0].start()].strip():
         return None
+    ends = [marker.start() for marker in markers[1:]] + [len(text)]
+    return [text[marker.end():end].strip('\n') for marker, end in zip(markers, ends)]
 
-    try:
-        img = Image.open(image_path)
-        img_byte_arr = io.BytesIO()
-        img.save(img_byte_arr, format='JPEG')
-        img_byte_arr = img_byte_arr.getvalue()
-
-        prompt = """
-        Please perform OCR on this image.
-        Extract all the text visible (Bangla, English, or mixed).
-        Preserve the original structure, line breaks, and paragraph formatting as accurately as possible based on the visual layout.
-        Do not add any commentary, explanations, or text other than the extracted content from the image.
-        Output *only* the extracted text.
+
+class TokenBucket:
+    """
+    Thread-safe token bucket for requests-per-minute quotas
+    
+    Args:
+        requests_per_minute: Sustained request rate
+        burst: Maximum number of requests that may be sent back to back
+    """
+
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst or max(1, int(requests_per_minute // 60))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """
+        Take one token, waiting for it if needed
+        
+        Returns:
+            True if a token was taken, False if the timeout ran out first
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait_time = (1 - self.tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait_time = min(wait_time, remaining)
+            time.sleep(wait_time)
 
-        image_part = {"mime_type": "image/jpeg", "data": img_byte_arr}
-        prompt_part = prompt
 
-        response = model.generate_content([prompt_part, image_part])
+_rate_limiters = OrderedDict()
+_rate_limiters_lock = threading.Lock()
 
-        extracted_text = ""
-        if hasattr(response, 'text'):
-            extracted_text = response.text
-        elif response.parts:
-            extracted_text = "".join(part.text for part in response.parts if hasattr(part, 'text'))
+
+def get_rate_limiter(key, requests_per_minute=None):
+    """
+    Get the shared rate limiter for an API key
+    
+    Quotas apply per key, so every job using the same key shares one bucket.
+    Only the GENAI_MAX_RATE_LIMITERS most recently used keys are kept; jobs
+    already holding a dropped limiter keep using it.
+    
+    Args:
+        key: The API key, or the model object for jobs given a pre-built model
+        requests_per_minute: Quota of the key (None = GENAI_REQUESTS_PER_MINUTE)
+    
+    Returns:
+        TokenBucket, or None when requests_per_minute is not set
+    """
+    requests_per_minute = requests_per_minute or GENAI_REQUESTS_PER_MINUTE
+    if not requests_per_minute:
+        return None
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get((key, requests_per_minute))
+        if limiter is None:
+            limiter = TokenBucket(requests_per_minute)
+            _rate_limiters[(key, requests_per_minute)] = limiter
+            while len(_rate_limiters) > GENAI_MAX_RATE_LIMITERS:
+                _rate_limiters.popitem(last=False)
         else:
-            print(f"Warning: Could not extract text from response for {os.path.basename(image_path)}.")
-            extracted_text = f"--- ERROR: Could not parse response for page {os.path.basename(image_path)} ---"
+            _rate_limiters.move_to_end((key, requests_per_minute))
+        return limiter
+
+
+def _is_retryable_error(error):
+    """True for rate-limit (429), server (5xx) and connection errors"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    code = getattr(error, 'code', None)
+    if code is None:
+        code = getattr(error, 'status_code', None)
+    try:
+        code = int(code)
+    except (TypeError, ValueError):
+        return False
+    return code == 429 or 500 <= code < 600
+
+
+def generate_with_retries(model, contents, rate_limiter=None, deadline=None, max_retries=None):
+    """
+    Call model.generate_content, retrying rate-limit and server errors
+    
+    Retries use exponential backoff with full jitter and never run past the deadline.
+    
+    Args:
+        model: Gemini model (or any object with a compatible generate_content)
+        contents: Request contents
+        rate_limiter: Optional TokenBucket shared by concurrent requests
+        deadline: time.monotonic() value after which the request is abandoned
+        max_retries: Retries before giving up (None = GENAI_MAX_RETRIES)
+        
+    Returns:
+        The model response
+        
+    Raises:
+        TimeoutError: If the deadline passes first
+        Exception: The last error if it is not retryable or retries ran out
+    """
+    if max_retries is None:
+        max_retries = GENAI_MAX_RETRIES
+    attempt = 0
+    while True:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            raise TimeoutError("Page deadline exceeded")
+        if rate_limiter and not rate_limiter.acquire(timeout=remaining):
+            raise TimeoutError("Page deadline exceeded while waiting for rate limit")
+        
+        try:
+            with metrics.stage('gemini'):
+                if remaining is None:
+                    return model.generate_content(contents)
+                return model.generate_content(contents, request_options={'timeout': remaining})
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable_error(e):
+                raise
+            backoff = random.uniform(0, min(GENAI_BACKOFF_MAX, GENAI_BACKOFF_BASE * (2 ** attempt)))
+            if deadline is not None and time.monotonic() + backoff >= deadline:
+                raise
+            logger.warning(f"Retryable GenAI error ({e}), retrying in {backoff:.1f}s...",
+                           extra={'attempt': attempt + 1, 'backoff': round(backoff, 3)})
+            metrics.inc('pdf_genai_retries_total')
+            time.sleep(backoff)
+            attempt += 1
 
+
+def extract_page_genai(image, page_number, model, rate_limiter=None, page_deadline=None, preprocessing=()):
+    """
+    Extract the text of one page, with retries, rate limiting and a deadline
+    
+    Args:
+        image: PIL Image of the page (or path to an image file)
+        page_number: 1-based page number
+        model: Gemini model
+        rate_limiter: Optional shared TokenBucket
+        page_deadline: Seconds allowed for this page (None = GENAI_PAGE_DEADLINE)
+        preprocessing: Preprocessing step names applied before encoding
+        
+    Returns:
+        Extracted text or an '--- ERROR: ... ---' message
+    """
+    page_deadline = page_deadline or GENAI_PAGE_DEADLINE
+    deadline = time.monotonic() + page_deadline if page_deadline else None
+    try:
+        if preprocessing:
+            with metrics.stage('preprocess', pages=1):
+                image = preprocess_image(Image.open(image) if isinstance(image, str) else image, preprocessing)
+        with metrics.stage('encode_image', pages=1):
+            image_part = {"mime_type": "image/jpeg", "data": encode_image_genai(image)}
+        metrics.inc('pdf_genai_upload_bytes_total', len(image_part['data']))
+        response = generate_with_retries(model, [OCR_PROMPT, image_part], rate_limiter, deadline)
+        extracted_text = parse_genai_response(response)
+        if extracted_text is None:
+            logger.warning(f"Could not extract text from response for {page_number}.", extra={'page': page_number})
+            metrics.inc('pdf_stage_errors_total', stage='gemini_parse')
+            return f"--- ERROR: Could not parse response for page {page_number} ---"
         return extracted_text
+    except Exception as e:
+        logger.error(f"An error occurred during text extraction for {page_number}: {e}", extra={'page': page_number})
+        return f"--- ERROR: Exception during extraction for page {page_number}: {e} ---"
 
+
+def extract_batch_genai(images, page_numbers, model, rate_limiter=None, page_deadline=None, preprocessing=()):
+    """
+    Extract the text of several pages with one Gemini request
+    
+    The prompt is sent once, followed by each page image after its PAGE_MARKER.
+    If the request fails with a non-retryable error, or the response cannot be
+    split into exactly one text per page, every page is sent again on its own.
+    
+    Args:
+        images: PIL Images of the pages (or paths to image files)
+        page_numbers: 1-based page numbers, in the same order
+        model: Gemini model
+        rate_limiter: Optional shared TokenBucket
+        page_deadline: Seconds allowed per page (None = GENAI_PAGE_DEADLINE); the
+                       batch request gets this much time for each of its pages
+        preprocessing: Preprocessing step names applied before encoding
+        
+    Returns:
+        List of extracted texts or '--- ERROR: ... ---' messages, one per page
+    """
+    if len(images) == 1:
+        return [extract_page_genai(images[0], page_numbers[0], model, rate_limiter, page_deadline, preprocessing)]
+    
+    page_deadline = page_deadline or GENAI_PAGE_DEADLINE
+    deadline = time.monotonic() + page_deadline * len(images) if page_deadline else None
+    pages_label = f"{page_numbers[0]}-{page_numbers[-1]}"
+    contents = [BATCH_OCR_PROMPT.format(count=len(images))]
+    texts = None
+    try:
+        for index, image in enumerate(images):
+            if preprocessing:
+                with metrics.stage('preprocess', pages=1):
+                    image = preprocess_image(Image.open(image) if isinstance(image, str) else image, preprocessing)
+            with metrics.stage('encode_image', pages=1):
+                image_part = {"mime_type": "image/jpeg", "data": encode_image_genai(image)}
+            metrics.inc('pdf_genai_upload_bytes_total', len(image_part['data']))
+            contents.append(PAGE_MARKER.format(number=index + 1))
+            contents.append(image_part)
+        metrics.inc('pdf_genai_batch_requests_total')
+        response = generate_with_retries(model, contents, rate_limiter, deadline)
+        texts = split_batch_response(parse_genai_response(response), len(images))
+        if texts is None:
+            logger.warning(f"Could not split the response for pages {pages_label}, sending them one by one.",
+                           extra={'pages': pages_label})
     except Exception as e:
-        print(f"An error occurred during text extraction for {os.path.basename(image_path)}: {e}")
-        return f"--- ERROR: Exception during extraction for page {os.path.basename(image_path)}: {e} ---"
+        if isinstance(e, TimeoutError) or _is_retryable_error(e):
+            logger.error(f"An error occurred during text extraction for pages {pages_label}: {e}",
+                         extra={'pages': pages_label})
+            return [f"--- ERROR: Exception during extraction for page {page_number}: {e} ---"
+                    for page_number in page_numbers]
+        logger.warning(f"Batch request for pages {pages_label} failed ({e}), sending them one by one.",
+                       extra={'pages': pages_label})
+    if texts is not None:
+        return texts
+    
+    metrics.inc('pdf_genai_batch_fallbacks_total')
+    return [extract_page_genai(image, page_number, model, rate_limiter, page_deadline, preprocessing)
+            for image, page_number in zip(images, page_numbers)]
+
+
+def iter_pages_genai(pages, model, total, max_in_flight=None, rate_limiter=None,
+                     page_deadline=None, progress_callback=None, page_cache=None, pdf_hash=None,
+                     preprocessing=None, batch_size=None):
+    """
+    Send pages to Gemini concurrently, yielding results in page order
+    
+    Args:
+        pages: Iterable of (page_number, PIL Image)
+        model: Gemini model
+        total: Number of pages the iterable yields
+        max_in_flight: Maximum concurrent requests (None = GENAI_MAX_IN_FLIGHT)
+        rate_limiter: Optional shared TokenBucket
+        page_deadline: Seconds allowed per page
+        progress_callback: Optional callable(pages_done, pages_total)
+        page_cache: Optional ResultCache; pages extracted without errors are stored
+                    and reused, so a rerun only sends the pages that failed
+        pdf_hash: SHA-256 of the PDF, required with page_cache
+        preprocessing: Preprocessing step names (None = GENAI_PREPROCESSING, () = none)
+        batch_size: Pages per request (None = GENAI_BATCH_SIZE, see extract_batch_genai);
+                    cached pages are left out of batches
+        
+    Yields:
+        Tuples of (page_number, extracted text or error message), as soon as
+        a page and all pages before it are done
+    """
+    max_in_flight = max(1, max_in_flight or GENAI_MAX_IN_FLIGHT)
+    batch_size = max(1, batch_size or GENAI_BATCH_SIZE)
+    if preprocessing is None:
+        preprocessing = GENAI_PREPROCESSING
+    submitted = []   # Page numbers in page order
+    results = {}     # Finished pages not yet yielded
+    in_flight = {}   # Future -> page numbers of its request
+    batch = []       # (page_number, image) waiting for a full batch
+    pages_done = 0
+    
+    def page_key(page_number):
+        return make_cache_key(pdf_hash, 'genai-page', page_number, **get_cache_options())
+    
+    def page_done(page_number, text):
+        nonlocal pages_done
+        results[page_number] = text
+        pages_done += 1
+        if progress_callback:
+            progress_callback(pages_done, total)
+    
+    def collect(finished):
+        for future in finished:
+            page_numbers = in_flight.pop(future)
+            for page_number, text in zip(page_numbers, future.result()):
+                if page_cache and "--- ERROR:" not in text:
+                    page_cache.put_page(page_key(page_number), text)
+                page_done(page_number, text)
+    
+    def ready():
+        while submitted and submitted[0] in results:
+            page_number = submitted.pop(0)
+            yield page_number, results.pop(page_number)
+    
+    def submit(executor):
+        # Wait for a free slot, then send the pending batch
+        if len(in_flight) >= max_in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+            yield from ready()
+        page_numbers = tuple(page_number for page_number, _ in batch)
+        images = [image for _, image in batch]
+        batch.clear()
+        future = executor.submit(extract_batch_genai, images, page_numbers, model, rate_limiter, page_deadline,
+                                 preprocessing)
+        in_flight[future] = page_numbers
+    
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='genai') as executor:
+        for page_number, image in pages:
+            submitted.append(page_number)
+            cached_text = page_cache.get_page(page_key(page_number)) if page_cache else None
+            if cached_text is not None:
+                logger.info(f"Page {page_number}/{total} found in cache", extra={'page': page_number})
+                metrics.inc('pdf_cache_requests_total', kind='genai_page', result='hit')
+                page_done(page_number, cached_text)
+                yield from ready()
+                continue
+            if page_cache:
+                metrics.inc('pdf_cache_requests_total', kind='genai_page', result='miss')
+            logger.info(f"Processing page {page_number}/{total} with GenAI...", extra={'page': page_number})
+            batch.append((page_number, image))
+            if len(batch) >= batch_size:
+                yield from submit(executor)
+        if batch:
+            yield from submit(executor)
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+            yield from ready()
+        yield from ready()
 
 
-def process_genai_pdf(pdf_path, output_path, output_format='txt', api_key=None):
+def extract_pages_genai(pages, model, total, **kwargs):
+    """
+    Send pages to Gemini concurrently, keeping page order
+    
+    Returns:
+        List of extracted page texts (or error messages) in page order
+        (see iter_pages_genai for the arguments)
+    """
+    return [text for _, text in iter_pages_genai(pages, model, total, **kwargs)]
+
+
+def process_genai_pdf(pdf_path, output_path, output_format='txt', api_key=None, progress_callback=None,
+                      model=None, max_in_flight=None, requests_per_minute=None,
+                      result_cache=None, pdf_hash=None, metadata=None, batch_size=None, page_callback=None,
+                      page_numbers=None, checkpoint=None, page_store=None):
     """
     Process PDF using GenAI (Google Gemini) with automatic language detection
     Supports Bangla, English, and mixed language content
@@ -136,69 +578,103 @@ def process_genai_pdf(pdf_path, output_path, output_format='txt', api_key=None):
         output_path: Path to save the output file
         output_format: 'txt' or 'docx'
         api_key: Google Gemini API key
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        model: Pre-built model to use instead of calling setup_gemini (any object with
+               generate_content(contents, **kwargs), e.g. a fake model for offline runs)
+        max_in_flight: Maximum concurrent Gemini requests (None = GENAI_MAX_IN_FLIGHT)
+        requests_per_minute: Quota for this API key (None = GENAI_REQUESTS_PER_MINUTE)
+        result_cache: Optional ResultCache used to reuse pages from earlier runs
+        pdf_hash: SHA-256 of the PDF (computed when result_cache is given without it)
+        metadata: Optional dict that receives 'pages' (pages processed), 'has_errors', 'failed_pages',
+                  'skipped_pages' (blank and duplicate pages) and, with a checkpoint, its 'checkpoint' summary
+        batch_size: Pages sent per Gemini request (None = GENAI_BATCH_SIZE)
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
+        checkpoint: Optional checkpoints.Checkpoint; each page is saved to it as it is written and
+                    pages an earlier run finished are taken from it instead of being sent again
+        page_store: Optional ResultCache; pages identical to a page of an earlier document
+                    reuse its text (with GENAI_REUSE_DUPLICATE_PAGES)
         
     Returns:
         Path to the output file or raises exception on error
     """
-    if not api_key:
-        raise ValueError("API key is required for GenAI processing")
-    
-    # Initialize the Gemini model
-    model = setup_gemini(api_key)
-    if not model:
-        raise Exception("Failed to initialize the Gemini model. Please check your API key.")
+    if model is None:
+        if not api_key:
+            raise ValueError("API key is required for GenAI processing")
+        
+        # Initialize the Gemini model
+        model = setup_gemini(api_key)
+        if not model:
+            raise Exception("Failed to initialize the Gemini model. Please check your API key.")
     
-    # Convert PDF to images
-    image_paths, temp_dir = convert_pdf_to_images_genai(pdf_path)
-    if not image_paths or temp_dir is None:
-        raise Exception("Failed to convert PDF to images.")
+    # Pages are rendered lazily, a few at a time, instead of the whole PDF up front
+    try:
+        document_pages = get_page_count(pdf_path, POPPLER_PATH, GENAI_RENDERER)
+    except Exception as e:
+        raise Exception(f"Failed to convert PDF to images: {e}")
+    # Only the selected pages are rendered and sent to Gemini
+    page_numbers = select_pages(page_numbers, document_pages)
+    page_count = len(page_numbers)
+    # Pages finished by an earlier run of this checkpoint are neither rendered nor sent again
+    pending = page_numbers
+    if checkpoint is not None:
+        pending = checkpoint.start('genai', get_cache_options(), page_numbers)
     
-    # Extract text from images
-    all_extracted_text = []
-    has_errors = False
+    # Extract text from images, several pages at a time
+    rate_limiter = get_rate_limiter(api_key or model, requests_per_minute)
+    if result_cache is not None and pdf_hash is None:
+        pdf_hash = hash_file(pdf_path)
+    failed_pages = []
+    with metrics.stage('choose_dpi', pages=len(pending)):
+        page_dpis = choose_genai_page_dpis(pdf_path, page_numbers=pending)
+    pages = iter_pdf_pages(pdf_path, dpi=GENAI_DPI, poppler_path=POPPLER_PATH, page_numbers=pending,
+                           page_dpis=page_dpis, renderer=GENAI_RENDERER)
+    dedup = None
+    if GENAI_SKIP_BLANK_PAGES or GENAI_REUSE_DUPLICATE_PAGES:
+        dedup = PageDeduplicator('genai', lambda page_number: '',
+                                 is_failed=lambda page_number, text: "--- ERROR:" in text,
+                                 skip_blank=GENAI_SKIP_BLANK_PAGES, reuse_duplicates=GENAI_REUSE_DUPLICATE_PAGES,
+                                 page_store=page_store, options=get_cache_options())
+    try:
+        # Save each page as soon as it and the pages before it are done
+        with open_output_writer(output_path, output_format, page_callback=page_callback, **OUTPUT_LAYOUT) as writer:
+            genai_progress = offset_progress(progress_callback, page_count - len(pending), page_count)
+            genai_results = iter_pages_genai(
+                dedup.filter(pages) if dedup else pages, model, len(pending),
+                max_in_flight=max_in_flight,
+                rate_limiter=rate_limiter,
+                progress_callback=None if dedup else genai_progress,
+                page_cache=result_cache,
+                pdf_hash=pdf_hash,
+                batch_size=batch_size
+            )
+            if dedup is not None:
+                # Blank and repeated pages are never sent; progress follows the pages written
+                genai_results = dedup.merge(genai_results, genai_progress, len(pending))
+            if checkpoint is not None:
+                genai_results = iter_checkpointed_pages(page_numbers, checkpoint, genai_results,
+                                                        lambda page_number, text: "--- ERROR:" in text)
+            for page_number, page_text in genai_results:
+                if "--- ERROR:" in page_text:
+                    failed_pages.append(page_number)
+                writer.write_page(page_number, page_text)
+    finally:
+        pages.close()
+    logger.info(f"✅ GenAI extracted text saved to {output_path}", extra={'output': output_path, 'pages': page_count})
     
-    for i, image_path in enumerate(image_paths):
-        print(f"Processing page {i+1}/{len(image_paths)} with GenAI...")
-        
-        if not image_path or not os.path.exists(image_path):
-            all_extracted_text.append(f"--- ERROR: Image file missing for page {i+1} ---")
-            has_errors = True
-            continue
-        
-        extracted_text = extract_text_from_image_genai(image_path, model)
-        
-        if extracted_text is None or "--- ERROR:" in extracted_text:
-            all_extracted_text.append(extracted_text or f"--- ERROR EXTRACTING PAGE {i+1} ---")
-            has_errors = True
-        else:
-            all_extracted_text.append(extracted_text)
+    if metadata is not None:
+        metadata['pages'] = page_count
+        metadata['has_errors'] = bool(failed_pages)
+        metadata['failed_pages'] = failed_pages
+        if dedup is not None:
+            skipped = dedup.summary()
+            # Requests the skipped pages would have taken
+            skipped['requests_saved'] = -(-skipped['pages_skipped'] // max(1, batch_size or GENAI_BATCH_SIZE))
+            metadata['skipped_pages'] = skipped
+        if checkpoint is not None:
+            metadata['checkpoint'] = checkpoint.summary()
     
-    # Clean up temporary directory
-    if temp_dir and os.path.exists(temp_dir):
-        try:
-            shutil.rmtree(temp_dir)
-        except Exception as e:
-            print(f"Warning: Could not remove temporary directory {temp_dir}: {e}")
-    
-    # Save output based on format
-    if output_format == 'txt':
-        with open(output_path, 'w', encoding='utf-8') as txt_file:
-            for i, page_text in enumerate(all_extracted_text):
-                txt_file.write(f"--- Page {i+1} ---\n")
-                txt_file.write(page_text)
-                if i < len(all_extracted_text) - 1:
-                    txt_file.write("\n\n--- Page Break ---\n\n")
-        print(f"✅ GenAI extracted text saved to {output_path}")
-    
-    elif output_format == 'docx':
-        document = Document()
-        for page_text in all_extracted_text:
-            document.add_paragraph(page_text)
-            document.add_page_break()
-        document.save(output_path)
-        print(f"✅ GenAI Word document saved to {output_path}")
-    
-    if has_errors:
-        print("⚠️ Some pages could not be processed correctly. Please check the output file.")
+    if failed_pages:
+        logger.warning("⚠️ Some pages could not be processed correctly. Please check the output file.")
     
     return output_path
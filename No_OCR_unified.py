@@ -1,40 +1,58 @@
 import fitz  # PyMuPDF
 import PyPDF2
-import unicodeconverter
 import os
-from docx import Document
+import itertools
 import re
+from output_writers import open_output_writer
+from page_source import select_pages
+from bijoy_converter import convert_bijoy_to_unicode
+import metrics
 
+logger = metrics.get_logger(__name__)
 
-def detect_language(text_sample):
+
+# Pages sampled for language detection
+LANGUAGE_SAMPLE_PAGES = 3
+# Extractor for English documents: 'pymupdf' reuses the already open document,
+# 'pypdf2' reopens the file with PyPDF2 (its layout differs slightly)
+ENGLISH_EXTRACTOR = 'pymupdf'
+
+# Check for Bangla Unicode characters (U+0980 to U+09FF)
+BANGLA_UNICODE_PATTERN = re.compile(r'[\u0980-\u09FF]')
+# Check for common Bijoy ASCII characters that are used for Bangla
+# Bijoy uses ASCII characters in unusual ways (like `, ~, etc.)
+BIJOY_PATTERN = re.compile(r'[`~©Ö¨«]')
+ENGLISH_PATTERN = re.compile(r'[a-zA-Z]')
+
+
+def count_language_indicators(text_sample):
     """
-    Detect if the text is Bangla (Bijoy/Unicode) or English
+    Count Bangla Unicode, Bijoy and English characters in a text sample
+    
+    Counts from several samples can be added together, so detection can run
+    page by page.
     
-    Args:
-        text_sample: A sample of text to analyze
-        
     Returns:
-        'bangla' or 'english'
+        Tuple of (bangla_unicode_count, bijoy_count, english_count)
     """
-    # Check for Bangla Unicode characters (U+0980 to U+09FF)
-    bangla_unicode_pattern = re.compile(r'[\u0980-\u09FF]')
-    
-    # Check for common Bijoy ASCII characters that are used for Bangla
-    # Bijoy uses ASCII characters in unusual ways (like `, ~, etc.)
-    bijoy_pattern = re.compile(r'[`~©Ö¨«]')
-    
-    # Count Bangla indicators
-    bangla_unicode_count = len(bangla_unicode_pattern.findall(text_sample))
-    bijoy_count = len(bijoy_pattern.findall(text_sample))
-    
+    return (
+        len(BANGLA_UNICODE_PATTERN.findall(text_sample)),
+        len(BIJOY_PATTERN.findall(text_sample)),
+        len(ENGLISH_PATTERN.findall(text_sample)),
+    )
+
+
+def is_clearly_bangla(bangla_unicode_count, bijoy_count):
+    """True once there is significant Bangla content"""
+    return bangla_unicode_count > 5 or bijoy_count > 10
+
+
+def detect_language_from_counts(bangla_unicode_count, bijoy_count, english_count):
+    """Classify counts from count_language_indicators as 'bangla' or 'english'"""
     # If we find significant Bangla content, classify as Bangla
-    if bangla_unicode_count > 5 or bijoy_count > 10:
+    if is_clearly_bangla(bangla_unicode_count, bijoy_count):
         return 'bangla'
     
-    # Check for English characters
-    english_pattern = re.compile(r'[a-zA-Z]')
-    english_count = len(english_pattern.findall(text_sample))
-    
     # If mostly English characters, classify as English
     if english_count > bangla_unicode_count + bijoy_count:
         return 'english'
@@ -43,88 +61,143 @@ def detect_language(text_sample):
     return 'bangla'
 
 
-def extract_text_from_pdf_pymupdf(pdf_path):
-    """Extract text using PyMuPDF (good for Bangla/Bijoy)"""
-    text = ""
-    doc = fitz.open(pdf_path)
-    for page in doc:
-        text += page.get_text()
-    doc.close()
-    return text
+def detect_language(text_sample):
+    """
+    Detect if the text is Bangla (Bijoy/Unicode) or English
+    
+    Args:
+        text_sample: A sample of text to analyze
+        
+    Returns:
+        'bangla' or 'english'
+    """
+    return detect_language_from_counts(*count_language_indicators(text_sample))
 
 
-def extract_text_from_pdf_pypdf2(pdf_path):
-    """Extract text using PyPDF2 (good for English)"""
-    text = ""
+def get_cache_options():
+    """Options that change No-OCR output, used in result cache keys"""
+    return {'bangla_extractor': 'pymupdf', 'english_extractor': ENGLISH_EXTRACTOR, 'bijoy_converter': 'table'}
+
+
+def iter_page_texts_pymupdf(doc, page_numbers=None):
+    """Yield the text of each page of an open PyMuPDF document (or of the given 1-based pages)"""
+    pages = doc if page_numbers is None else (doc[page_number - 1] for page_number in page_numbers)
+    for page in pages:
+        with metrics.stage('extract_text', pages=1):
+            page_text = page.get_text()
+        yield page_text
+
+
+def iter_page_texts_pypdf2(pdf_path, page_numbers=None):
+    """Yield the text of each page (or of the given 1-based pages) using PyPDF2, followed by a blank line"""
     with open(pdf_path, 'rb') as pdf_file:
         pdf_reader = PyPDF2.PdfReader(pdf_file)
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            page_text = page.extract_text()
-            text += page_text + '\n\n'
-    return text
+        pages = pdf_reader.pages
+        if page_numbers is not None:
+            pages = (pdf_reader.pages[page_number - 1] for page_number in page_numbers)
+        for page in pages:
+            with metrics.stage('extract_text', pages=1):
+                page_text = page.extract_text()
+            yield page_text + '\n\n'
 
 
-def process_no_ocr_pdf(pdf_path, output_path, output_format='txt'):
+def extract_text_from_pdf_pymupdf(pdf_path, progress_callback=None):
+    """Extract text using PyMuPDF (good for Bangla/Bijoy)"""
+    with fitz.open(pdf_path) as doc:
+        page_texts = []
+        for page_text in iter_page_texts_pymupdf(doc):
+            page_texts.append(page_text)
+            if progress_callback:
+                progress_callback(len(page_texts), len(doc))
+    return "".join(page_texts)
+
+
+def extract_text_from_pdf_pypdf2(pdf_path, progress_callback=None):
+    """Extract text using PyPDF2 (good for English)"""
+    page_texts = []
+    for page_text in iter_page_texts_pypdf2(pdf_path):
+        page_texts.append(page_text)
+        if progress_callback:
+            progress_callback(len(page_texts), None)
+    return "".join(page_texts)
+
+
+def convert_bijoy_page(page_text):
+    """Convert one page of Bijoy text to Unicode, keeping the text if conversion fails"""
+    try:
+        with metrics.stage('bijoy', pages=1):
+            return convert_bijoy_to_unicode(page_text)
+    except Exception as e:
+        logger.warning(f"Bijoy conversion not needed or failed: {e}")
+        return page_text
+
+
+def process_no_ocr_pdf(pdf_path, output_path, output_format='txt', progress_callback=None, metadata=None,
+                       page_callback=None, page_numbers=None):
     """
     Process PDF without OCR with automatic language detection
     Supports both Bangla (with Bijoy conversion) and English
     
+    The PDF is opened once. The first pages are read to detect the language,
+    then every page is extracted, converted and written to the output as it
+    is read, so the whole document is never held as one string. With
+    page_numbers only the selected pages are read at all.
+    
     Args:
         pdf_path: Path to the input PDF file
         output_path: Path to save the output file
         output_format: 'txt' or 'docx'
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        metadata: Optional dict that receives 'pages' (pages processed) and 'language'
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
         
     Returns:
         Path to the output file
     """
-    print("Extracting text from PDF...")
+    logger.info("Extracting text from PDF...", extra={'pdf': pdf_path})
     
-    # First, try to extract a sample using PyMuPDF to detect language
-    sample_text = ""
+    doc = fitz.open(pdf_path)
     try:
-        doc = fitz.open(pdf_path)
-        # Get text from first few pages for language detection
-        for i, page in enumerate(doc):
-            if i < 3:  # Check first 3 pages
-                sample_text += page.get_text()
+        page_numbers = select_pages(page_numbers, len(doc))
+        page_count = len(page_numbers)
+        page_texts = iter_page_texts_pymupdf(doc, page_numbers)
+        
+        # Detect the language from the first few pages, stopping early once Bangla is certain
+        sample_pages = []
+        counts = (0, 0, 0)
+        for page_text in page_texts:
+            sample_pages.append(page_text)
+            counts = tuple(a + b for a, b in zip(counts, count_language_indicators(page_text)))
+            if len(sample_pages) >= LANGUAGE_SAMPLE_PAGES or is_clearly_bangla(counts[0], counts[1]):
+                break
+        
+        detected_language = detect_language_from_counts(*counts)
+        logger.info(f"Detected language: {detected_language}", extra={'language': detected_language})
+        if metadata is not None:
+            metadata['pages'] = page_count
+            metadata['language'] = detected_language
+        
+        if detected_language == 'bangla':
+            # PyMuPDF is better for Bijoy fonts; convert Bijoy to Unicode page by page
+            pages = (convert_bijoy_page(page_text) for page_text in itertools.chain(sample_pages, page_texts))
+        elif ENGLISH_EXTRACTOR == 'pypdf2':
+            # PyPDF2 layout for English, at the cost of reading the file again
+            pages = iter_page_texts_pypdf2(pdf_path, page_numbers)
+        else:
+            # Pages separated by a blank line, as in the PyPDF2 output
+            pages = (page_text + '\n\n' for page_text in itertools.chain(sample_pages, page_texts))
+        sample_pages = None
+        
+        # Save output page by page
+        with open_output_writer(output_path, output_format, page_callback=page_callback) as writer:
+            for pages_done, (page_number, page_text) in enumerate(zip(page_numbers, pages), start=1):
+                writer.write_page(page_number, page_text)
+                if progress_callback:
+                    progress_callback(pages_done, page_count)
+        logger.info(f"✅ Output saved to: {output_path}", extra={'output': output_path, 'pages': page_count})
+    finally:
         doc.close()
-    except Exception as e:
-        print(f"Error extracting sample: {e}")
-        sample_text = ""
-    
-    # Detect the language
-    detected_language = detect_language(sample_text)
-    print(f"Detected language: {detected_language}")
-    
-    # Extract full text based on detected language
-    if detected_language == 'bangla':
-        # Use PyMuPDF for Bangla (better for Bijoy fonts)
-        extracted_text = extract_text_from_pdf_pymupdf(pdf_path)
-        # Convert Bijoy to Unicode if needed
-        try:
-            converted_text = unicodeconverter.convert_bijoy_to_unicode(extracted_text)
-            final_text = converted_text
-        except Exception as e:
-            print(f"Bijoy conversion not needed or failed: {e}")
-            final_text = extracted_text
-    else:
-        # Use PyPDF2 for English (better formatting)
-        final_text = extract_text_from_pdf_pypdf2(pdf_path)
-    
-    # Save output based on format
-    if output_format == 'txt':
-        with open(output_path, 'w', encoding='utf-8') as txt_file:
-            txt_file.write(final_text)
-        print(f"✅ Text file saved to: {output_path}")
-    
-    elif output_format == 'docx':
-        document = Document()
-        for line in final_text.splitlines():
-            if line.strip():  # Only add non-empty lines
-                document.add_paragraph(line)
-        document.save(output_path)
-        print(f"✅ Word document saved to: {output_path}")
     
     return output_path
 
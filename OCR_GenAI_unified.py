@@ -0,0 +1,306 @@
+import fitz  # PyMuPDF
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import OCR_unified
+import GenAI_unified
+from OCR_unified import (POPPLER_PATH, OCR_DPI, iter_ocr_pages, summarize_language_detection, _is_error_page,
+                         _blank_page_text, _copy_page_text, get_cache_options as ocr_cache_options)
+from GenAI_unified import (setup_gemini, get_rate_limiter, extract_page_genai, choose_genai_page_dpi,
+                           get_cache_options as genai_cache_options)
+from page_source import get_page_count, iter_pdf_pages, select_pages, render_page_pymupdf
+from page_dedup import PageDeduplicator
+from preprocessing import choose_page_dpis
+from output_writers import open_output_writer
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# A page goes to Gemini when the mean confidence (0-100) of the words tesseract read is below this
+ESCALATE_MIN_CONFIDENCE = 70
+# ...or when it is a Bangla page and Bangla letters make up less than this share of the letters read
+# (tesseract tends to read degraded Bangla as Latin look-alikes, with a confidence that looks fine)
+ESCALATE_MIN_BANGLA_RATIO = 0.6
+# ...or when tesseract read fewer words than this (photos, handwriting; blank pages are skipped before OCR)
+ESCALATE_MIN_WORDS = 1
+# Maximum concurrent Gemini requests for the escalated pages (None = GenAI_unified.GENAI_MAX_IN_FLIGHT)
+ESCALATE_MAX_IN_FLIGHT = None
+
+BANGLA_LETTER_PATTERN = re.compile(r'[\u0980-\u09FF]')
+LATIN_LETTER_PATTERN = re.compile(r'[A-Za-z]')
+
+
+def route_page(page_number, page_text, confidences, language, min_confidence=None, min_bangla_ratio=None):
+    """
+    Decide whether the OCR text of a page is good enough or the page goes to Gemini
+
+    Args:
+        page_number: 1-based page number
+        page_text: OCR page text block (see OCR_unified.ocr_page_with_confidences)
+        confidences: Word confidences of the page, or None if tesseract failed on it
+        language: Detected script of the page ('bangla', 'english' or 'mixed')
+        min_confidence: Mean word confidence below which the page is escalated (None = ESCALATE_MIN_CONFIDENCE)
+        min_bangla_ratio: Bangla letter share below which a Bangla page is escalated
+                          (None = ESCALATE_MIN_BANGLA_RATIO)
+
+    Returns:
+        Routing dict holding the page number, 'route' ('ocr' or 'genai'), 'reason' and the measurements
+    """
+    if min_confidence is None:
+        min_confidence = ESCALATE_MIN_CONFIDENCE
+    if min_bangla_ratio is None:
+        min_bangla_ratio = ESCALATE_MIN_BANGLA_RATIO
+
+    words = len(confidences) if confidences else 0
+    mean_confidence = sum(confidences) / words if words else None
+    # The page header (or the error block of a failed page) is not part of what tesseract read
+    body = page_text.partition('\n')[2] if confidences is not None else ''
+    bangla_letters = len(BANGLA_LETTER_PATTERN.findall(body))
+    letters = bangla_letters + len(LATIN_LETTER_PATTERN.findall(body))
+    bangla_ratio = bangla_letters / letters if letters else None
+
+    if confidences is None:
+        route, reason = 'genai', 'ocr error'
+    elif words < ESCALATE_MIN_WORDS:
+        route, reason = 'genai', 'no words'
+    elif mean_confidence < min_confidence:
+        route, reason = 'genai', 'low confidence'
+    elif language == 'bangla' and bangla_ratio is not None and bangla_ratio < min_bangla_ratio:
+        route, reason = 'genai', 'few Bangla letters'
+    else:
+        route, reason = 'ocr', 'confident'
+
+    return {
+        'page': page_number,
+        'route': route,
+        'reason': reason,
+        'language': language,
+        'words': words,
+        'mean_confidence': round(mean_confidence, 1) if mean_confidence is not None else None,
+        'low_confidence_words': sum(1 for conf in confidences or () if conf < min_confidence),
+        'bangla_ratio': round(bangla_ratio, 3) if bangla_ratio is not None else None,
+    }
+
+
+def get_cache_options():
+    """Options that change OCR + GenAI output, used in result cache keys"""
+    options = ocr_cache_options()
+    options.update({
+        'language_per_page': True,
+        'min_confidence': ESCALATE_MIN_CONFIDENCE,
+        'min_bangla_ratio': ESCALATE_MIN_BANGLA_RATIO,
+        'min_words': ESCALATE_MIN_WORDS,
+        'genai': genai_cache_options(),
+    })
+    return options
+
+
+def iter_escalated_pages(ocr_results, stats, pdf_path, model, rate_limiter=None, max_in_flight=None, routing=None,
+                         min_confidence=None, min_bangla_ratio=None):
+    """
+    Send the OCR'd pages route_page rejects to Gemini, yielding every page in page order
+
+    Rejected pages are rendered again at the GenAI resolution (with PyMuPDF) and
+    sent while tesseract carries on with the next pages. A page kept from OCR is
+    yielded as soon as the Gemini pages before it are done. A page Gemini fails
+    on keeps its OCR text.
+
+    Args:
+        ocr_results: Iterable of (page_number, page text block), in page order, from
+                     OCR_unified.iter_ocr_pages run with confidences=True
+        stats: The stats dict iter_ocr_pages fills (page languages and confidences)
+        pdf_path: Path to the PDF, to render the escalated pages from
+        model: Gemini model
+        rate_limiter: Optional shared TokenBucket
+        max_in_flight: Maximum concurrent Gemini requests (None = ESCALATE_MAX_IN_FLIGHT)
+        routing: Optional list that receives the routing dict of every page, in page order
+        min_confidence, min_bangla_ratio: Escalation thresholds (see route_page)
+
+    Yields:
+        Tuples of (page_number, page text block)
+    """
+    max_in_flight = max(1, max_in_flight or ESCALATE_MAX_IN_FLIGHT or GenAI_unified.GENAI_MAX_IN_FLIGHT)
+    pending = deque()  # (page_number, OCR text, routing dict, Gemini future or None), in page order
+
+    def ready(block=False):
+        while pending and (block or pending[0][3] is None or pending[0][3].done()):
+            page_number, page_text, decision, future = pending.popleft()
+            if future is not None:
+                text = future.result()
+                if "--- ERROR:" in text:
+                    logger.warning(f"Gemini failed on page {page_number}, keeping the OCR text",
+                                   extra={'page': page_number})
+                    decision['route'] = 'ocr'
+                    decision['genai_failed'] = True
+                else:
+                    page_text = f"--- Page {page_number} ---\n{text}\n\n"
+            metrics.inc('pdf_routed_pages_total', method='ocr+genai', route=decision['route'],
+                        reason=decision['reason'])
+            yield page_number, page_text
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='ocr-genai') as executor, \
+            fitz.open(pdf_path) as doc:
+        for page_number, page_text in ocr_results:
+            confidences = stats.get('page_confidences', {}).pop(page_number, None)
+            language = stats.get('page_languages', {}).get(page_number)
+            decision = route_page(page_number, page_text, confidences, language, min_confidence, min_bangla_ratio)
+            if routing is not None:
+                routing.append(decision)
+            future = None
+            if decision['route'] == 'genai':
+                in_flight = [entry[3] for entry in pending if entry[3] is not None and not entry[3].done()]
+                if len(in_flight) >= max_in_flight:
+                    wait(in_flight, return_when=FIRST_COMPLETED)
+                logger.info(f"Sending page {page_number} to Gemini ({decision['reason']})",
+                            extra={'page': page_number, 'reason': decision['reason'],
+                                   'mean_confidence': decision['mean_confidence']})
+                page = doc[page_number - 1]
+                with metrics.stage('rasterize', pages=1):
+                    image = render_page_pymupdf(page, choose_genai_page_dpi(page))
+                future = executor.submit(extract_page_genai, image, page_number, model, rate_limiter, None,
+                                         GenAI_unified.GENAI_PREPROCESSING)
+                del image
+            pending.append((page_number, page_text, decision, future))
+            yield from ready()
+        yield from ready(block=True)
+
+
+def summarize_routing(routing, min_confidence=None, min_bangla_ratio=None):
+    """
+    Per-job summary of the routing decisions, for tuning the thresholds
+
+    Returns:
+        Dict with the thresholds, the pages per route and reason, and a histogram
+        of the mean page confidences in steps of 10
+    """
+    reasons = {}
+    histogram = {}
+    for decision in routing:
+        reasons[decision['reason']] = reasons.get(decision['reason'], 0) + 1
+        if decision['mean_confidence'] is not None:
+            low = min(90, int(decision['mean_confidence'] // 10 * 10))
+            bucket = f"{low}-{low + 10}"
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+    confidences = [decision['mean_confidence'] for decision in routing if decision['mean_confidence'] is not None]
+    return {
+        'min_confidence': ESCALATE_MIN_CONFIDENCE if min_confidence is None else min_confidence,
+        'min_bangla_ratio': ESCALATE_MIN_BANGLA_RATIO if min_bangla_ratio is None else min_bangla_ratio,
+        'escalated': sum(1 for decision in routing if decision['reason'] != 'confident'),
+        'genai_failed': sum(1 for decision in routing if decision.get('genai_failed')),
+        'reasons': reasons,
+        'mean_confidence': round(sum(confidences) / len(confidences), 1) if confidences else None,
+        'confidence_histogram': dict(sorted(histogram.items(), key=lambda item: int(item[0].split('-')[0]))),
+    }
+
+
+def process_ocr_genai_pdf(pdf_path, output_path, output_format='txt', api_key=None, progress_callback=None,
+                          model=None, workers=None, max_in_flight=None, requests_per_minute=None, metadata=None,
+                          page_callback=None, page_numbers=None, min_confidence=None, min_bangla_ratio=None):
+    """
+    Process PDF with OCR, sending only the pages tesseract is unsure of to Gemini
+
+    Every page is OCR'd with per-word confidences (the script of each page is
+    detected, as with OCR_LANGUAGE_PER_PAGE). Pages whose mean confidence or
+    Bangla letter share is too low (see route_page) are extracted with Gemini
+    instead, concurrently with the OCR of the following pages. On a mostly
+    clean scan only a few pages cost a Gemini request.
+
+    Args:
+        pdf_path: Path to the input PDF file
+        output_path: Path to save the output file
+        output_format: 'txt' or 'docx'
+        api_key: Google Gemini API key
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        model: Pre-built model to use instead of calling setup_gemini (see GenAI_unified.process_genai_pdf)
+        workers: Number of OCR worker processes (None = OCR_unified.OCR_WORKERS)
+        max_in_flight: Maximum concurrent Gemini requests (None = ESCALATE_MAX_IN_FLIGHT)
+        requests_per_minute: Quota for this API key (None = GenAI_unified.GENAI_REQUESTS_PER_MINUTE)
+        metadata: Optional dict that receives 'pages' (pages processed), 'language', 'language_detection',
+                  'has_errors', 'failed_pages', 'ocr_pages', 'genai_pages', the per-page 'routing' decisions,
+                  the 'escalation' summary and 'skipped_pages' (blank and duplicate pages)
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
+        min_confidence: Escalation threshold (None = ESCALATE_MIN_CONFIDENCE)
+        min_bangla_ratio: Escalation threshold (None = ESCALATE_MIN_BANGLA_RATIO)
+
+    Returns:
+        Path to the output file
+    """
+    if model is None:
+        if not api_key:
+            raise ValueError("API key is required for OCR + GenAI processing")
+        model = setup_gemini(api_key)
+        if not model:
+            raise Exception("Failed to initialize the Gemini model. Please check your API key.")
+
+    page_numbers = select_pages(page_numbers, get_page_count(pdf_path, POPPLER_PATH))
+    page_count = len(page_numbers)
+    page_dpis = None
+    if OCR_unified.OCR_ADAPTIVE_DPI:
+        with metrics.stage('choose_dpi', pages=page_count):
+            page_dpis = choose_page_dpis(pdf_path, page_numbers, default_dpi=OCR_DPI)
+    pages = iter_pdf_pages(pdf_path, dpi=OCR_DPI, poppler_path=POPPLER_PATH, page_numbers=page_numbers,
+                           page_dpis=page_dpis)
+    logger.info(f"PDF has {page_count} pages. Processing...", extra={'pages': page_count})
+
+    rate_limiter = get_rate_limiter(api_key or model, requests_per_minute)
+    dedup = None
+    if OCR_unified.OCR_SKIP_BLANK_PAGES or OCR_unified.OCR_REUSE_DUPLICATE_PAGES:
+        dedup = PageDeduplicator('ocr+genai', _blank_page_text, _copy_page_text, _is_error_page,
+                                 skip_blank=OCR_unified.OCR_SKIP_BLANK_PAGES,
+                                 reuse_duplicates=OCR_unified.OCR_REUSE_DUPLICATE_PAGES,
+                                 options=get_cache_options())
+    stats = {}
+    routing = []
+    failed_pages = []
+    try:
+        with open_output_writer(output_path, output_format, page_callback=page_callback) as writer:
+            # The script of each page is needed for the Bangla letter test, so it is always detected per page
+            ocr_results = iter_ocr_pages(dedup.filter(pages) if dedup else pages, None, page_count, workers,
+                                         stats=stats, confidences=True)
+            results = iter_escalated_pages(ocr_results, stats, pdf_path, model, rate_limiter, max_in_flight, routing,
+                                           min_confidence, min_bangla_ratio)
+            if dedup is not None:
+                results = dedup.merge(results)
+            for pages_done, (page_number, page_text) in enumerate(results, start=1):
+                if _is_error_page(page_number, page_text):
+                    failed_pages.append(page_number)
+                writer.write_page(page_number, page_text)
+                if progress_callback:
+                    progress_callback(pages_done, page_count)
+    finally:
+        pages.close()
+
+    genai_pages = sum(1 for decision in routing if decision['route'] == 'genai')
+    escalation = summarize_routing(routing, min_confidence, min_bangla_ratio)
+    logger.info(f"✅ Extracted text saved to {output_path}: {genai_pages} of {len(routing)} OCR'd pages "
+                f"extracted with Gemini", extra={'output': output_path, 'escalation': escalation})
+
+    if metadata is not None:
+        language, detection_summary = summarize_language_detection(stats)
+        metadata['pages'] = page_count
+        metadata['language'] = language
+        metadata['language_detection'] = detection_summary
+        metadata['has_errors'] = bool(failed_pages)
+        metadata['failed_pages'] = failed_pages
+        metadata['ocr_pages'] = len(routing) - genai_pages
+        metadata['genai_pages'] = genai_pages
+        metadata['escalation'] = escalation
+        metadata['routing'] = routing
+        if dedup is not None:
+            metadata['skipped_pages'] = dedup.summary()
+
+    return output_path
+
+
+# Main execution for testing
+if __name__ == "__main__":
+    # Test with your PDF files
+    test_pdf = "test.pdf"
+    output_txt = "output_ocr_genai.txt"
+
+    if os.path.exists(test_pdf):
+        process_ocr_genai_pdf(test_pdf, output_txt, 'txt', api_key=os.environ.get('GEMINI_API_KEY'))
+    else:
+        print("Please provide a test PDF file")
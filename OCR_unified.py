@@ -1,22 +1,82 @@
 import pytesseract
 from PIL import Image
 import os
-from pdf2image import convert_from_path
-import tempfile
 import re
+import itertools
+import time
+import atexit
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from page_source import get_page_count, iter_pdf_pages, select_pages
+from checkpoints import iter_checkpointed_pages, offset_progress
+from page_dedup import PageDeduplicator
+from output_writers import open_output_writer
+from preprocessing import choose_page_dpis, preprocess_image
+from script_detection import detect_script, lang_config_for
+from ocr_engines import get_engine, resolve_engine_name
+import metrics
+
+logger = metrics.get_logger(__name__)
 
 # For Windows users: Update these paths if needed
 pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 POPPLER_PATH = r'C:\Program Files\poppler-24.08.0\Library\bin'
 
+# Rendering resolution for OCR
+OCR_DPI = 300
+# Tesseract engine and page segmentation options (the language is added per document)
+TESSERACT_CONFIG = '--oem 3 --psm 6'
+# Pick the DPI per page from the scan resolution or text size (False = always OCR_DPI)
+OCR_ADAPTIVE_DPI = True
+# Image preprocessing before tesseract, run in the OCR workers (see preprocessing.STEPS)
+OCR_PREPROCESSING = ('grayscale', 'deskew', 'crop_margins')
+# Detect the script of every page and pick 'ben+eng' or 'eng+ben' per page (False = from the first page only)
+OCR_LANGUAGE_PER_PAGE = True
+# Skip pages with almost no ink instead of OCR'ing them (see page_dedup)
+OCR_SKIP_BLANK_PAGES = True
+# OCR repeated pages (cover sheets, letterheads, forms) once and copy the text to the others
+OCR_REUSE_DUPLICATE_PAGES = True
+
+# Number of worker processes for page OCR (None = one per CPU core, 1 = OCR in this process)
+OCR_WORKERS = None
+# OpenMP threads each tesseract process may use; 1 keeps parallel workers from oversubscribing cores
+TESSERACT_THREAD_LIMIT = 1
+# OCR backend: 'tesserocr' keeps tesseract loaded in each worker, 'pytesseract' runs the binary
+# per page, 'auto' uses tesserocr when it is installed (see ocr_engines)
+OCR_ENGINE = 'auto'
+# Keep the OCR worker processes (and their loaded models) alive between jobs
+OCR_PERSISTENT_POOL = True
+# Times a page is sent to a fresh pool after a worker process died while it was in flight
+OCR_BROKEN_POOL_RETRIES = 2
+
+_executors = {}
+_executors_lock = threading.Lock()
+
 
 def detect_language_from_image(image):
     """
     Detect language from an image sample
     
+    Uses the headline (matra) test of script_detection on a thumbnail,
+    OCR'ing only a few text lines when that is not conclusive.
+    
     Args:
         image: PIL Image object
         
+    Returns:
+        'bangla', 'english', or 'mixed'
+    """
+    return detect_script(image)[0]
+
+
+def detect_language_with_tesseract(image):
+    """
+    Detect language by running tesseract on the whole image
+    
+    Tries OSD first, then OCRs the full page twice (eng and ben) and compares.
+    Much slower than detect_language_from_image; kept for comparison.
+    
     Returns:
         'bangla', 'english', or 'mixed'
     """
@@ -58,7 +118,367 @@ def detect_language_from_image(image):
         return 'mixed'
 
 
-def process_ocr_pdf(pdf_path, output_path, output_format='txt'):
+def get_cache_options():
+    """Options that change OCR output, used in result cache keys"""
+    return {
+        'dpi': OCR_DPI,
+        'adaptive_dpi': OCR_ADAPTIVE_DPI,
+        'preprocessing': list(OCR_PREPROCESSING),
+        'language_per_page': OCR_LANGUAGE_PER_PAGE,
+        'tesseract_config': TESSERACT_CONFIG,
+        # tesserocr and the tesseract binary can read a page differently
+        'engine': resolve_engine_name(OCR_ENGINE),
+        'languages': ['ben', 'eng'],
+        'skip_blank_pages': OCR_SKIP_BLANK_PAGES,
+        'reuse_duplicate_pages': OCR_REUSE_DUPLICATE_PAGES,
+    }
+
+
+def _init_ocr_worker(tesseract_cmd, thread_limit, engine_name='auto'):
+    """Initializer for OCR worker processes"""
+    global OCR_ENGINE
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    if thread_limit:
+        os.environ['OMP_THREAD_LIMIT'] = str(thread_limit)
+    OCR_ENGINE = engine_name
+    get_engine(engine_name)
+
+
+def _new_ocr_executor(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_ocr_worker,
+        initargs=(pytesseract.pytesseract.tesseract_cmd, TESSERACT_THREAD_LIMIT, OCR_ENGINE)
+    )
+
+
+def _get_ocr_executor(workers):
+    """Shared, long-lived OCR process pool for this worker count and configuration"""
+    key = (workers, pytesseract.pytesseract.tesseract_cmd, TESSERACT_THREAD_LIMIT, OCR_ENGINE)
+    with _executors_lock:
+        executor = _executors.get(key)
+        if executor is None:
+            executor = _executors[key] = _new_ocr_executor(workers)
+        return executor
+
+
+def _discard_ocr_executor(executor):
+    """Drop a broken pool so the next job starts a fresh one"""
+    with _executors_lock:
+        for key, shared in list(_executors.items()):
+            if shared is executor:
+                del _executors[key]
+    executor.shutdown(wait=False)
+
+
+@atexit.register
+def shutdown_ocr_pools():
+    """Stop the shared OCR worker processes"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True)
+
+
+def _error_page_text(page_number):
+    return f"--- Page {page_number} ---\nError extracting text\n\n"
+
+
+def _is_error_page(page_number, page_text):
+    return page_text == _error_page_text(page_number)
+
+
+def _blank_page_text(page_number):
+    return f"--- Page {page_number} ---\n\n\n"
+
+
+def _copy_page_text(page_text, from_page, page_number):
+    # Same text under the header of the other page
+    return page_text.replace(f"--- Page {from_page} ---", f"--- Page {page_number} ---", 1)
+
+
+def ocr_page(image, page_number, lang_config):
+    """
+    OCR a single page image
+    
+    Args:
+        image: PIL Image of the page (or a path to an image file)
+        page_number: 1-based page number used in the page header
+        lang_config: Tesseract language string (e.g. 'ben+eng')
+        
+    Returns:
+        Page text block, or an error block if the page could not be read
+    """
+    try:
+        if isinstance(image, str):
+            image = Image.open(image)
+        # Use adaptive OCR configuration
+        extracted_text = get_engine(OCR_ENGINE).image_to_string(image, lang_config, TESSERACT_CONFIG)
+        
+        # Add page number for better organization
+        return f"--- Page {page_number} ---\n{extracted_text}\n\n"
+    except Exception as e:
+        logger.error(f"Error extracting text from page {page_number}: {e}", extra={'page': page_number})
+        return _error_page_text(page_number)
+
+
+def ocr_page_with_confidences(image, page_number, lang_config):
+    """
+    OCR a single page image, also returning how sure tesseract is of each word
+    
+    Args:
+        image: PIL Image of the page (or a path to an image file)
+        page_number: 1-based page number used in the page header
+        lang_config: Tesseract language string (e.g. 'ben+eng')
+        
+    Returns:
+        Tuple of (page text block or error block, list of word confidences
+        from 0 to 100, or None if the page could not be read)
+    """
+    try:
+        if isinstance(image, str):
+            image = Image.open(image)
+        extracted_text, confidences = get_engine(OCR_ENGINE).image_to_string_with_confidences(
+            image, lang_config, TESSERACT_CONFIG)
+        return f"--- Page {page_number} ---\n{extracted_text}\n\n", confidences
+    except Exception as e:
+        logger.error(f"Error extracting text from page {page_number}: {e}", extra={'page': page_number})
+        return _error_page_text(page_number), None
+
+
+def _ocr_page_timed(image, page_number, lang_config, preprocessing=(), confidences=False):
+    """
+    Preprocess, detect the script of (when lang_config is None) and OCR a page
+    
+    Each step is timed so worker processes can report timings to the parent.
+    
+    Returns:
+        Tuple of (page text block, stats dict with 'tesseract_seconds',
+        'preprocess_seconds', 'detection_seconds', 'language', 'detected_by'
+        and, with confidences, the word 'confidences' of the page)
+    """
+    stats = {'preprocess_seconds': 0.0, 'detection_seconds': 0.0, 'language': None, 'detected_by': None}
+    if isinstance(image, str):
+        image = Image.open(image)
+    if preprocessing:
+        start = time.perf_counter()
+        try:
+            image = preprocess_image(image, preprocessing)
+        except Exception as e:
+            logger.warning(f"Preprocessing failed on page {page_number}, using the raw image: {e}",
+                           extra={'page': page_number})
+        stats['preprocess_seconds'] = time.perf_counter() - start
+    
+    if lang_config is None:
+        start = time.perf_counter()
+        stats['language'], stats['detected_by'] = detect_script(image, get_engine(OCR_ENGINE))
+        stats['detection_seconds'] = time.perf_counter() - start
+        lang_config = lang_config_for(stats['language'])
+    
+    start = time.perf_counter()
+    if confidences:
+        page_text, stats['confidences'] = ocr_page_with_confidences(image, page_number, lang_config)
+    else:
+        page_text = ocr_page(image, page_number, lang_config)
+    stats['tesseract_seconds'] = time.perf_counter() - start
+    return page_text, stats
+
+
+def _record_ocr_page(page_number, page_text, page_stats, stats):
+    metrics.record_stage('tesseract', page_stats['tesseract_seconds'], pages=1,
+                         error=_is_error_page(page_number, page_text))
+    if page_stats['preprocess_seconds']:
+        metrics.record_stage('preprocess', page_stats['preprocess_seconds'], pages=1)
+    if page_stats['language']:
+        metrics.record_stage('detect_script', page_stats['detection_seconds'], pages=1)
+        metrics.inc('pdf_script_detections_total', language=page_stats['language'],
+                    detected_by=page_stats['detected_by'])
+    if stats is not None:
+        for key in ('tesseract_seconds', 'preprocess_seconds', 'detection_seconds'):
+            stats[key] = stats.get(key, 0.0) + page_stats[key]
+        if page_stats['language']:
+            stats.setdefault('page_languages', {})[page_number] = page_stats['language']
+            detected_by = stats.setdefault('detected_by', {})
+            detected_by[page_stats['detected_by']] = detected_by.get(page_stats['detected_by'], 0) + 1
+        if 'confidences' in page_stats:
+            stats.setdefault('page_confidences', {})[page_number] = page_stats['confidences']
+    logger.debug("OCR page done", extra={
+        'page': page_number, 'seconds': round(page_stats['tesseract_seconds'], 3), 'language': page_stats['language']
+    })
+
+
+def summarize_language_detection(stats):
+    """
+    Per-job summary of per-page script detection, for the job metadata
+    
+    The previous detector OCR'd the first page twice (eng and ben) after an
+    OSD attempt, so the time saved is estimated as two average tesseract
+    page times minus the time spent on detection across all pages.
+    
+    Args:
+        stats: Dict filled by iter_ocr_pages
+        
+    Returns:
+        Tuple of (overall language, summary dict)
+    """
+    page_languages = stats.get('page_languages', {})
+    languages = set(page_languages.values())
+    language = languages.pop() if len(languages) == 1 else 'mixed'
+    
+    pages = len(page_languages)
+    tesseract_per_page = stats.get('tesseract_seconds', 0.0) / pages if pages else 0.0
+    detection_seconds = stats.get('detection_seconds', 0.0)
+    summary = {
+        'pages': pages,
+        'languages': {name: list(page_languages.values()).count(name) for name in sorted(set(page_languages.values()))},
+        'detected_by': stats.get('detected_by', {}),
+        'seconds': round(detection_seconds, 3),
+        'estimated_seconds_saved': round(2 * tesseract_per_page - detection_seconds, 3),
+    }
+    return language, summary
+
+
+def iter_ocr_pages(pages, lang_config, total, workers=None, progress_callback=None, preprocessing=None,
+                   stats=None, confidences=False):
+    """
+    OCR a stream of page images in parallel, yielding results in page order
+    
+    Pages are pulled from the iterator only as worker slots free up, so at
+    most about two pages per worker are held in memory at any time. Each
+    result is yielded as soon as it and all earlier pages are done.
+    
+    Args:
+        pages: Iterable of (page_number, PIL Image), e.g. from page_source.iter_pdf_pages
+        lang_config: Tesseract language string (None = detect the script of each page)
+        total: Number of pages the iterable yields
+        workers: Number of worker processes (None = OCR_WORKERS)
+        progress_callback: Optional callable(pages_done, pages_total)
+        preprocessing: Preprocessing step names (None = OCR_PREPROCESSING, () = none)
+        stats: Optional dict that receives summed timings and the per-page languages
+        confidences: Also collect the word confidences of each page into stats['page_confidences']
+                     (page number -> list of confidences, None for pages tesseract failed on),
+                     filled before the page is yielded
+        
+    Yields:
+        Tuples of (page_number, page text block)
+    """
+    if preprocessing is None:
+        preprocessing = OCR_PREPROCESSING
+    if workers is None:
+        workers = OCR_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, total))
+    
+    if workers == 1:
+        for pages_done, (page_number, image) in enumerate(pages, start=1):
+            logger.info(f"Extracting text from page {page_number}...", extra={'page': page_number})
+            page_text, page_stats = _ocr_page_timed(image, page_number, lang_config, preprocessing, confidences)
+            _record_ocr_page(page_number, page_text, page_stats, stats)
+            del image
+            if progress_callback:
+                progress_callback(pages_done, total)
+            yield page_number, page_text
+        return
+    
+    logger.info(f"Extracting text with {workers} worker processes...", extra={'workers': workers})
+    executor = _get_ocr_executor(workers) if OCR_PERSISTENT_POOL else _new_ocr_executor(workers)
+    max_in_flight = workers * 2
+    submitted = []   # Page numbers in submission (page) order
+    results = {}     # Finished pages not yet yielded
+    in_flight = {}   # Future -> (page number, image, retries, pool), the image kept for resubmission
+    pages_done = 0
+    
+    def replace_executor(broken):
+        nonlocal executor
+        # Several pages (and other jobs sharing the pool) see the same broken pool; replace it once
+        if executor is broken:
+            _discard_ocr_executor(broken)
+            executor = _get_ocr_executor(workers) if OCR_PERSISTENT_POOL else _new_ocr_executor(workers)
+    
+    def submit(image, page_number, retries=0):
+        try:
+            future = executor.submit(_ocr_page_timed, image, page_number, lang_config, preprocessing, confidences)
+        except BrokenProcessPool:
+            # A worker died earlier (possibly during another job); carry on with a fresh pool
+            replace_executor(executor)
+            future = executor.submit(_ocr_page_timed, image, page_number, lang_config, preprocessing, confidences)
+        in_flight[future] = (page_number, image, retries, executor)
+    
+    def collect(finished):
+        nonlocal pages_done
+        for future in finished:
+            page_number, image, retries, pool = in_flight.pop(future)
+            try:
+                results[page_number], page_stats = future.result()
+                _record_ocr_page(page_number, results[page_number], page_stats, stats)
+            except BrokenProcessPool as e:
+                # A worker process died (killed, or tesseract crashed on some page): the pool fails every
+                # page in flight, including other jobs' pages in the shared pool, so each job resubmits
+                # its own pages to a fresh pool. A page that keeps breaking pools becomes an error page.
+                if retries < OCR_BROKEN_POOL_RETRIES:
+                    logger.warning(f"OCR worker died with page {page_number} in flight; resubmitting it",
+                                   extra={'page': page_number, 'retries': retries + 1})
+                    metrics.inc('pdf_ocr_pages_resubmitted_total')
+                    replace_executor(pool)
+                    submit(image, page_number, retries + 1)
+                    continue
+                logger.error(f"Error extracting text from page {page_number}: {e}", extra={'page': page_number})
+                metrics.inc('pdf_stage_errors_total', stage='tesseract')
+                results[page_number] = _error_page_text(page_number)
+                if confidences and stats is not None:
+                    stats.setdefault('page_confidences', {})[page_number] = None
+            except Exception as e:
+                # Tesseract failed on this page alone
+                logger.error(f"Error extracting text from page {page_number}: {e}", extra={'page': page_number})
+                metrics.inc('pdf_stage_errors_total', stage='tesseract')
+                results[page_number] = _error_page_text(page_number)
+                if confidences and stats is not None:
+                    stats.setdefault('page_confidences', {})[page_number] = None
+            pages_done += 1
+            if progress_callback:
+                progress_callback(pages_done, total)
+    
+    def ready():
+        # Release finished pages whose predecessors are all done
+        while submitted and submitted[0] in results:
+            page_number = submitted.pop(0)
+            yield page_number, results.pop(page_number)
+    
+    try:
+        for page_number, image in pages:
+            if len(in_flight) >= max_in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(finished)
+                yield from ready()
+            submit(image, page_number)
+            submitted.append(page_number)
+            del image
+        while in_flight:
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(finished)
+            yield from ready()
+    finally:
+        # Stopped early: drop pages that have not started yet
+        for future in in_flight:
+            future.cancel()
+        if not OCR_PERSISTENT_POOL:
+            executor.shutdown(wait=True)
+
+
+def ocr_pages(pages, lang_config, total, workers=None, progress_callback=None, preprocessing=None, stats=None):
+    """
+    OCR a stream of page images in parallel, keeping page order
+    
+    Returns:
+        List of page text blocks in page order (see iter_ocr_pages for the arguments)
+    """
+    return [page_text for _, page_text in iter_ocr_pages(pages, lang_config, total, workers, progress_callback,
+                                                         preprocessing, stats)]
+
+
+def process_ocr_pdf(pdf_path, output_path, output_format='txt', progress_callback=None, workers=None, metadata=None,
+                    adaptive_dpi=None, preprocessing=None, page_callback=None, page_numbers=None, checkpoint=None,
+                    page_store=None):
     """
     Process PDF with OCR with automatic language detection
     Supports Bangla, English, and mixed language content
@@ -67,80 +487,126 @@ def process_ocr_pdf(pdf_path, output_path, output_format='txt'):
         pdf_path: Path to the input PDF file
         output_path: Path to save the output file
         output_format: 'txt' or 'docx'
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        workers: Number of OCR worker processes (None = OCR_WORKERS)
+        metadata: Optional dict that receives 'pages' (pages processed), 'language', 'has_errors',
+                  'failed_pages', with OCR_LANGUAGE_PER_PAGE the 'language_detection' summary, 'skipped_pages'
+                  (blank and duplicate pages) and with a checkpoint its 'checkpoint' summary
+        adaptive_dpi: Pick the DPI per page (None = OCR_ADAPTIVE_DPI)
+        preprocessing: Preprocessing step names (None = OCR_PREPROCESSING, () = none)
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
+        checkpoint: Optional checkpoints.Checkpoint; each page is saved to it as it is written and
+                    pages an earlier run finished are taken from it instead of being OCR'd again
+        page_store: Optional ResultCache; pages identical to a page of an earlier document
+                    reuse its text (with OCR_REUSE_DUPLICATE_PAGES)
         
     Returns:
         Path to the output file
     """
-    print("Converting PDF to images...")
+    logger.info("Converting PDF to images...")
     
-    # Create a temporary directory for the image files
-    with tempfile.TemporaryDirectory() as temp_dir:
-        try:
-            # Convert PDF to images
-            images = convert_from_path(pdf_path, dpi=300, output_folder=temp_dir, poppler_path=POPPLER_PATH)
-            print(f"PDF has {len(images)} pages. Processing...")
-        except Exception as e:
-            print(f"Error converting PDF to images: {e}")
-            raise
-        
+    if adaptive_dpi is None:
+        adaptive_dpi = OCR_ADAPTIVE_DPI
+    try:
+        # Pages are rendered lazily, a few at a time, as the OCR workers consume them; unselected pages never are
+        page_numbers = select_pages(page_numbers, get_page_count(pdf_path, POPPLER_PATH))
+        page_count = len(page_numbers)
+        # Pages finished by an earlier run of this checkpoint are not rendered again
+        pending = page_numbers
+        if checkpoint is not None:
+            pending = checkpoint.start('ocr', get_cache_options(), page_numbers)
+        page_dpis = None
+        if adaptive_dpi:
+            with metrics.stage('choose_dpi', pages=len(pending)):
+                page_dpis = choose_page_dpis(pdf_path, pending, default_dpi=OCR_DPI)
+        pages = iter_pdf_pages(pdf_path, dpi=OCR_DPI, poppler_path=POPPLER_PATH, page_numbers=pending,
+                               page_dpis=page_dpis)
+        logger.info(f"PDF has {page_count} pages. Processing...", extra={'pages': page_count})
+        first_page = None if OCR_LANGUAGE_PER_PAGE else next(pages, None)
+    except Exception as e:
+        logger.error(f"Error converting PDF to images: {e}")
+        raise
+    
+    if OCR_LANGUAGE_PER_PAGE:
+        # Each page gets 'ben+eng' or 'eng+ben' from its own script, detected in the OCR workers
+        lang_config = None
+        detected_language = None
+        logger.info("Detecting the language of each page")
+    else:
         # Detect language from first page
-        if len(images) > 0:
-            detected_language = detect_language_from_image(images[0])
-            print(f"Detected language: {detected_language}")
+        if first_page is not None:
+            with metrics.stage('detect_language'):
+                detected_language = detect_language_from_image(first_page[1])
+            logger.info(f"Detected language: {detected_language}", extra={'language': detected_language})
         else:
             detected_language = 'mixed'
-            print("No images found, defaulting to mixed language")
+            logger.warning("No images found, defaulting to mixed language")
         
         # Set Tesseract language based on detection
         if detected_language == 'bangla':
             lang_config = 'ben+eng'  # Bangla primary, English secondary
-            print("Using Bangla + English OCR")
+            logger.info("Using Bangla + English OCR")
         elif detected_language == 'english':
             lang_config = 'eng+ben'  # English primary, Bangla secondary
-            print("Using English + Bangla OCR")
+            logger.info("Using English + Bangla OCR")
         else:
             lang_config = 'ben+eng'  # Mixed: try both
-            print("Using mixed language OCR (Bangla + English)")
-        
-        all_text = []
-        
-        # Process each page
-        for i, image in enumerate(images):
-            print(f"Extracting text from page {i+1}...")
-            
-            try:
-                # Use adaptive OCR configuration
-                custom_config = f'--oem 3 --psm 6 -l {lang_config}'
-                extracted_text = pytesseract.image_to_string(image, config=custom_config)
-                
-                # Add page number for better organization
-                page_text = f"--- Page {i+1} ---\n{extracted_text}\n\n"
-                all_text.append(page_text)
-            except Exception as e:
-                print(f"Error extracting text from page {i+1}: {e}")
-                all_text.append(f"--- Page {i+1} ---\nError extracting text\n\n")
-        
-        # Combine text from all pages
-        full_text = "".join(all_text)
-        
-        # Save output based on format
-        if output_format == 'txt':
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(full_text)
-            print(f"✅ Extracted text saved to {output_path}")
-        
-        elif output_format == 'docx':
-            from docx import Document
-            document = Document()
-            
-            for line in full_text.splitlines():
-                if line.strip():  # Only add non-empty lines
-                    document.add_paragraph(line)
-            
-            document.save(output_path)
-            print(f"✅ Word document saved to {output_path}")
-        
-        return output_path
+            logger.info("Using mixed language OCR (Bangla + English)")
+    
+    if metadata is not None:
+        metadata['pages'] = page_count
+        metadata['language'] = detected_language
+    
+    # Process the pages across worker processes, writing each page as soon as it is in order
+    all_pages = itertools.chain([first_page], pages) if first_page is not None else pages
+    first_page = None
+    stats = {}
+    failed_pages = []
+    dedup = None
+    if OCR_SKIP_BLANK_PAGES or OCR_REUSE_DUPLICATE_PAGES:
+        dedup = PageDeduplicator('ocr', _blank_page_text, _copy_page_text, _is_error_page,
+                                 skip_blank=OCR_SKIP_BLANK_PAGES, reuse_duplicates=OCR_REUSE_DUPLICATE_PAGES,
+                                 page_store=page_store, options=get_cache_options())
+    try:
+        with open_output_writer(output_path, output_format, page_callback=page_callback) as writer:
+            ocr_progress = offset_progress(progress_callback, page_count - len(pending), page_count)
+            if dedup is None:
+                ocr_results = iter_ocr_pages(all_pages, lang_config, len(pending), workers, ocr_progress,
+                                             preprocessing, stats)
+            else:
+                # Blank and repeated pages never reach the OCR workers; progress follows the pages written
+                ocr_results = dedup.merge(
+                    iter_ocr_pages(dedup.filter(all_pages), lang_config, len(pending), workers, None, preprocessing,
+                                   stats),
+                    ocr_progress, len(pending)
+                )
+            if checkpoint is not None:
+                ocr_results = iter_checkpointed_pages(page_numbers, checkpoint, ocr_results, _is_error_page)
+            for page_number, page_text in ocr_results:
+                if _is_error_page(page_number, page_text):
+                    failed_pages.append(page_number)
+                writer.write_page(page_number, page_text)
+    finally:
+        pages.close()
+    if metadata is not None:
+        metadata['has_errors'] = bool(failed_pages)
+        metadata['failed_pages'] = failed_pages
+        if dedup is not None:
+            metadata['skipped_pages'] = dedup.summary()
+        if checkpoint is not None:
+            metadata['checkpoint'] = checkpoint.summary()
+    
+    if OCR_LANGUAGE_PER_PAGE:
+        detected_language, detection_summary = summarize_language_detection(stats)
+        logger.info(f"Detected language: {detected_language}",
+                    extra={'language': detected_language, 'language_detection': detection_summary})
+        if metadata is not None:
+            metadata['language'] = detected_language
+            metadata['language_detection'] = detection_summary
+    logger.info(f"✅ Extracted text saved to {output_path}", extra={'output': output_path})
+    
+    return output_path
 
 
 # Compatibility aliases for existing code
@@ -1,20 +1,70 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session
+from flask import Flask, render_template, request, redirect, url_for, flash, send_file, session, jsonify, Response
 import os
 import sys
-from werkzeug.utils import secure_filename
+import json
+import shutil
+import uuid
+import zipfile
 
 # Add the current directory to the Python path to ensure all modules are found
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Import functions from unified processing modules
-from No_OCR_unified import process_no_ocr_pdf
-from OCR_unified import process_ocr_pdf
-from GenAI_unified import process_genai_pdf
+# The processing modules are imported on first use (see methods.py)
+from methods import get_method, method_names, preload
+from jobs import JobManager, JobQueueFull, JOB_DONE, JOB_FAILED
+from result_cache import ResultCache, hash_file, make_cache_key
+from batch import run_batch, extract_pdfs_from_zip, find_pdfs, safe_pdf_filename, ArchiveTooLarge, MANIFEST_NAME
+from page_source import parse_page_ranges, select_pages
+from checkpoints import Checkpoint
+from broker import SQLiteBroker
+from distributed import process_distributed_pdf
+from upload_spool import (SpoolingRequest, FolderCleaner, InvalidUpload, discard_spool_files, save_upload,
+                          validate_pdf)
+import metrics
+
+logger = metrics.get_logger(__name__)
 
 app = Flask(__name__)
+# Uploaded files are streamed straight to spool files in the upload folder
+app.request_class = SpoolingRequest
 app.config['SECRET_KEY'] = 'pdf_processor_secret_key'
 app.config['UPLOAD_FOLDER'] = 'uploads'
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('PDF_MAX_UPLOAD_MB', 512)) * 1024 * 1024  # 512MB max upload size
+# Uploads and results in the upload folder are removed after this long, or oldest first past the size limit
+app.config['UPLOAD_MAX_AGE_SECONDS'] = 24 * 3600  # 1 day
+app.config['UPLOAD_FOLDER_MAX_BYTES'] = 10 * 1024 * 1024 * 1024  # 10GB
+# Processing methods this server accepts (see methods.py); set PDF_METHODS, e.g. 'no_ocr,auto', to
+# serve only those, so the modules of the others are never imported
+app.config['PROCESSING_METHODS'] = [name for name in os.environ.get('PDF_METHODS', '').split(',') if name] \
+    or method_names()
+# Import the modules of the accepted methods at startup instead of on their first job
+app.config['PRELOAD_METHODS'] = os.environ.get('PDF_PRELOAD_METHODS') == '1'
+# Number of jobs each processing method may run at the same time
+app.config['JOB_WORKERS'] = {'no_ocr': 4, 'ocr': 2, 'genai': 2, 'auto': 2, 'ocr+genai': 2, 'batch': 1}
+# Maximum queued + running jobs per method before /process starts refusing uploads
+app.config['JOB_MAX_QUEUED'] = 50
+# Cache of finished results, keyed by file hash, method, format and processing options
+app.config['CACHE_FOLDER'] = 'cache'
+app.config['CACHE_MAX_BYTES'] = 1024 * 1024 * 1024  # 1GB
+app.config['CACHE_TTL_SECONDS'] = 7 * 24 * 3600  # 7 days
+# Per-page checkpoints of OCR and GenAI jobs; kept with the input PDF when a job fails or has failed pages,
+# so uploading the same PDF again or retrying the job only redoes the missing and failed pages
+app.config['CHECKPOINT_FOLDER'] = 'checkpoints'
+app.config['CHECKPOINT_MAX_AGE_SECONDS'] = 7 * 24 * 3600  # 7 days
+# Let OCR and GenAI pages reuse the text of identical pages from earlier documents (kept in the result cache)
+app.config['REUSE_PAGES_ACROSS_DOCUMENTS'] = False
+# Worker processes used by each /batch job (None = one per CPU core)
+app.config['BATCH_WORKERS'] = None
+# Most bytes of PDFs a /batch ZIP archive may extract to, however small the upload
+app.config['BATCH_ZIP_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 2GB
+# Seconds between keep-alive comments on idle /jobs/<id>/events streams
+app.config['EVENTS_KEEPALIVE_SECONDS'] = 15
+# Broker folder shared with worker.py processes (None = process jobs in this server). With a broker,
+# jobs of the distributed methods are split into page tasks that the workers process on any host
+app.config['DISTRIBUTED_BROKER_FOLDER'] = os.environ.get('PDF_BROKER_FOLDER') or None
+app.config['DISTRIBUTED_METHODS'] = {'ocr', 'genai', 'auto', 'ocr+genai'}
+# A distributed job fails if its pages are not all finished after this long (None = no limit)
+app.config['DISTRIBUTED_JOB_TIMEOUT_SECONDS'] = 6 * 3600  # 6 hours
 
 # Create upload folder if it doesn't exist
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
@@ -22,9 +72,178 @@ os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf'}
 
+for name in app.config['PROCESSING_METHODS']:
+    missing = get_method(name).missing_dependencies()
+    if missing:
+        logger.warning(f"Processing method {name} is not available: missing {', '.join(missing)}",
+                       extra={'method': name, 'missing': missing})
+if app.config['PRELOAD_METHODS']:
+    preload(app.config['PROCESSING_METHODS'])
+
+result_cache = ResultCache(
+    app.config['CACHE_FOLDER'],
+    max_bytes=app.config['CACHE_MAX_BYTES'],
+    ttl_seconds=app.config['CACHE_TTL_SECONDS']
+)
+
+job_manager = JobManager(pool_sizes=app.config['JOB_WORKERS'], max_queued=app.config['JOB_MAX_QUEUED'])
+
+upload_cleaner = FolderCleaner(
+    app.config['UPLOAD_FOLDER'],
+    max_age_seconds=app.config['UPLOAD_MAX_AGE_SECONDS'],
+    max_bytes=app.config['UPLOAD_FOLDER_MAX_BYTES']
+)
+
+# Running jobs touch their checkpoint folder after every page, so only abandoned ones get old
+checkpoint_cleaner = FolderCleaner(
+    app.config['CHECKPOINT_FOLDER'],
+    max_age_seconds=app.config['CHECKPOINT_MAX_AGE_SECONDS']
+)
+
+broker = SQLiteBroker(app.config['DISTRIBUTED_BROKER_FOLDER']) if app.config['DISTRIBUTED_BROKER_FOLDER'] else None
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def wants_json():
+    """True when the client (the upload page's fetch call) asked for a JSON response"""
+    return request.accept_mimetypes.best == 'application/json'
+
+def error_response(message, status_code=400):
+    """Report an error as JSON for API clients or as a flash message for the form"""
+    if wants_json():
+        return jsonify({'error': message}), status_code
+    flash(message, 'error')
+    return redirect(url_for('index'))
+
+def is_distributed(processing_method):
+    """True when jobs of this method are processed by worker.py processes through the broker"""
+    return broker is not None and processing_method in app.config['DISTRIBUTED_METHODS']
+
+def method_unavailable(processing_method):
+    """Error response if this server does not serve the method or lacks its dependencies, else None"""
+    if processing_method not in app.config['PROCESSING_METHODS']:
+        return error_response('Invalid processing method selected')
+    method = get_method(processing_method)
+    missing = method.missing_dependencies()
+    if missing:
+        return error_response(f"{method.label} is not available on this server (missing {', '.join(missing)})", 503)
+    return None
+
+def run_processing_job(processing_method, filepath, output_filepath, output_format, api_key=None,
+                       progress_callback=None, page_callback=None, metadata=None, pdf_hash=None, page_numbers=None):
+    """
+    Run one processing method on an uploaded file (or the selected pages of it), removing the upload afterwards
+
+    OCR and GenAI jobs save each page to a checkpoint named after the cache key. If the job
+    fails or has failed pages, the upload is moved into the checkpoint instead of being
+    removed, and running the job again (JobManager.retry) only redoes the missing and failed pages.
+    An identical job (same PDF, method and options) waits for the checkpoint until the running
+    one is done, then takes its result from the cache or resumes its checkpoint.
+    With a broker, jobs of the distributed methods are processed by worker.py processes instead
+    (their tasks are retried by the broker, so no checkpoint is kept).
+    """
+    checkpoint = None
+    try:
+        # Reuse the result of an identical earlier upload (the hash is usually computed while uploading)
+        pdf_hash = pdf_hash or hash_file(filepath)
+        method = get_method(processing_method)
+        cache_options = method.cache_options()
+        if page_numbers is not None:
+            cache_options['pages'] = list(page_numbers)
+        cache_key = make_cache_key(pdf_hash, processing_method, output_format, **cache_options)
+        distributed = is_distributed(processing_method)
+        if method.uses_checkpoints and not distributed:
+            checkpoint = Checkpoint(os.path.join(app.config['CHECKPOINT_FOLDER'], cache_key))
+            checkpoint.acquire()
+        if result_cache.get_result(cache_key, output_filepath):
+            logger.info(f"Result for {os.path.basename(filepath)} found in cache", extra={'method': processing_method})
+            metrics.inc('pdf_cache_requests_total', kind='result', result='hit')
+            return
+        metrics.inc('pdf_cache_requests_total', kind='result', result='miss')
+        
+        if metadata is None:
+            metadata = {}
+        page_options = {}
+        if checkpoint is not None:
+            page_options['checkpoint'] = checkpoint
+            if app.config['REUSE_PAGES_ACROSS_DOCUMENTS']:
+                page_options['page_store'] = result_cache
+            if not os.path.exists(filepath):
+                # A retry: the upload was kept with the checkpoint
+                filepath = checkpoint.source_path
+        try:
+            if distributed:
+                # The workers use their own API key; the one given with the upload is not passed on
+                process_distributed_pdf(broker, processing_method, filepath, output_filepath, output_format,
+                                        progress_callback=progress_callback, metadata=metadata,
+                                        page_callback=page_callback, page_numbers=page_numbers,
+                                        timeout=app.config['DISTRIBUTED_JOB_TIMEOUT_SECONDS'])
+            else:
+                # Methods that take a result_cache (GenAI) cache pages individually, so a rerun only
+                # redoes the pages that failed; options a method does not take are dropped
+                method.run(filepath, output_filepath, output_format, api_key=api_key,
+                           progress_callback=progress_callback, metadata=metadata, page_callback=page_callback,
+                           page_numbers=page_numbers, result_cache=result_cache, pdf_hash=pdf_hash,
+                           **page_options)
+        finally:
+            if checkpoint is not None and checkpoint.manifest is not None:
+                metadata['checkpoint'] = checkpoint.summary()
+        
+        if not metadata.get('has_errors'):
+            result_cache.put_result(cache_key, output_filepath)
+            if checkpoint is not None:
+                checkpoint.discard()
+    finally:
+        if checkpoint is not None and checkpoint.manifest is not None:
+            # Failed, or finished with failed pages: keep the upload for a retry
+            checkpoint.keep_source(filepath)
+        # Clean up the uploaded file after processing
+        elif os.path.exists(filepath):
+            try:
+                os.remove(filepath)
+            except Exception as e:
+                logger.warning(f"Could not remove uploaded file: {e}")
+        if checkpoint is not None:
+            checkpoint.release()
+
+def run_batch_job(batch_dir, archive_filepath, processing_method, output_format, api_key=None,
+                  progress_callback=None, page_callback=None, metadata=None, page_numbers=None):
+    """
+    Process the PDFs of an uploaded batch and zip the outputs together with the manifest
+
+    Progress is reported per file; page_callback is not used since pages of
+    different files would be mixed up.
+    """
+    try:
+        output_dir = os.path.join(batch_dir, 'output')
+        records = run_batch(os.path.join(batch_dir, 'input'), output_dir, processing_method, output_format,
+                            workers=app.config['BATCH_WORKERS'], api_key=api_key,
+                            progress_callback=progress_callback, page_numbers=page_numbers)
+        
+        with zipfile.ZipFile(archive_filepath, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.write(os.path.join(output_dir, MANIFEST_NAME), MANIFEST_NAME)
+            for record in records:
+                if record['output'] and os.path.exists(record['output']):
+                    archive.write(record['output'], os.path.relpath(record['output'], output_dir))
+        
+        if metadata is not None:
+            metadata['files'] = len(records)
+            metadata['failed'] = sum(1 for record in records if record['status'] == 'failed')
+    finally:
+        # Clean up the uploaded files and individual outputs
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+@app.teardown_request
+def remove_unused_uploads(exception=None):
+    # Uploads that were rejected or never handed to a job
+    discard_spool_files(request)
+
+@app.errorhandler(413)
+def upload_too_large(error):
+    limit_mb = app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)
+    return error_response(f'The upload is too large (limit: {limit_mb}MB)', 413)
+
 @app.route('/')
 def index():
     # Clear any previous flash messages when returning to home page
@@ -35,79 +254,286 @@ def index():
 def process_pdf():
     # Check if a file was uploaded
     if 'pdf_file' not in request.files:
-        flash('No file part', 'error')
-        return redirect(request.url)
+        return error_response('No file part')
     
     file = request.files['pdf_file']
     
     # Check if user did not select a file
     if file.filename == '':
-        flash('No file selected', 'error')
-        return redirect(request.url)
+        return error_response('No file selected')
     
-    if file and allowed_file(file.filename):
-        # Get the selected processing method
-        processing_method = request.form.get('processing_method')
-        output_format = request.form.get('output_format', 'txt')
-        
-        # For GenAI method, get the API key
-        api_key = None
-        if processing_method == 'genai':
-            api_key = request.form.get('api_key')
-            if not api_key or api_key.strip() == '':
-                flash('API key is required for GenAI processing', 'error')
-                return redirect(url_for('index'))
-        
-        # Secure the filename and save the file
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        file.save(filepath)
-        
-        # Generate output filename
-        output_filename = os.path.splitext(filename)[0] + f".{output_format}"
-        output_filepath = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
-        
-        # Process the file based on the selected method
+    if not allowed_file(file.filename):
+        return error_response('Invalid file format. Only PDF files are allowed.')
+    
+    # Get the selected processing method
+    processing_method = request.form.get('processing_method')
+    output_format = request.form.get('output_format', 'txt')
+    
+    unavailable = method_unavailable(processing_method)
+    if unavailable:
+        return unavailable
+    
+    # For GenAI methods, get the API key (distributed jobs use the workers' keys)
+    api_key = None
+    if get_method(processing_method).requires_api_key and not is_distributed(processing_method):
+        api_key = request.form.get('api_key')
+        if not api_key or api_key.strip() == '':
+            return error_response('API key is required for GenAI processing')
+    
+    # Optional page selection, e.g. '1-5,12,20-' (empty = every page)
+    pages = request.form.get('pages', '').strip() or None
+    if pages:
         try:
-            if processing_method == 'no_ocr':
-                # No OCR - Auto-detect language (Bangla/English)
-                process_no_ocr_pdf(filepath, output_filepath, output_format)
-            
-            elif processing_method == 'ocr':
-                # OCR-based - Auto-detect language (Bangla/English)
-                process_ocr_pdf(filepath, output_filepath, output_format)
-            
-            elif processing_method == 'genai':
-                # GenAI-based - Google Gemini AI with language detection
-                process_genai_pdf(filepath, output_filepath, output_format, api_key)
-            
-            else:
-                flash('Invalid processing method selected', 'error')
-                return redirect(url_for('index'))
-            
-            # Clean up the uploaded file after processing
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except Exception as e:
-                    print(f"Warning: Could not remove uploaded file: {e}")
-            
-            # Store the output filename in session for download
-            return redirect(url_for('download_file', filename=output_filename))
-            
-        except Exception as e:
-            # Error handling
-            flash(f'Error processing PDF: {str(e)}', 'error')
-            # Clean up uploaded file on error
-            if os.path.exists(filepath):
-                try:
-                    os.remove(filepath)
-                except:
-                    pass
-            return redirect(url_for('index'))
-    else:
-        flash('Invalid file format. Only PDF files are allowed.', 'error')
-        return redirect(url_for('index'))
+            parse_page_ranges(pages)
+        except ValueError as e:
+            return error_response(f'Invalid page selection: {e}')
+    
+    upload_cleaner.maybe_run(keep=job_manager.files_in_use)
+    checkpoint_cleaner.maybe_run()
+    
+    # Secure the filename and keep the upload under a unique name, so concurrent uploads never clash
+    upload_id = uuid.uuid4().hex[:12]
+    filename = safe_pdf_filename(file.filename)
+    filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"{upload_id}_{filename}")
+    pdf_hash = save_upload(file, filepath)
+    metrics.inc('pdf_upload_bytes_total', os.path.getsize(filepath))
+    
+    # Reject damaged and non-PDF files before they take a place in the queue
+    try:
+        page_count = validate_pdf(filepath)
+        page_numbers = select_pages(pages, page_count) if pages else None
+    except (InvalidUpload, ValueError) as e:
+        os.remove(filepath)
+        return error_response(str(e))
+    
+    # Generate output filename
+    output_filename = os.path.splitext(filename)[0] + f"_{upload_id}.{output_format}"
+    output_filepath = os.path.join(app.config['UPLOAD_FOLDER'], output_filename)
+    
+    # Queue the job instead of processing inside the request
+    try:
+        job = job_manager.submit(
+            processing_method, run_processing_job,
+            processing_method, filepath, output_filepath, output_format, api_key,
+            output_filename=output_filename,
+            files=(os.path.basename(filepath),),
+            pdf_hash=pdf_hash,
+            page_numbers=page_numbers
+        )
+    except JobQueueFull as e:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        return error_response(str(e), 503)
+    if job.pages_total is None:
+        job.pages_total = len(page_numbers) if page_numbers else page_count
+    
+    if wants_json():
+        response = job.to_dict()
+        response['status_url'] = url_for('job_status', job_id=job.id)
+        response['result_url'] = url_for('job_result', job_id=job.id)
+        response['events_url'] = url_for('job_events', job_id=job.id)
+        response['partial_url'] = url_for('job_partial', job_id=job.id)
+        response['retry_url'] = url_for('retry_job', job_id=job.id)
+        return jsonify(response), 202
+    return redirect(url_for('job_status', job_id=job.id))
+
+@app.route('/batch', methods=['POST'])
+def process_batch():
+    # Accept either a ZIP archive or several PDF files
+    zip_file = request.files.get('zip_file')
+    pdf_files = [file for file in request.files.getlist('pdf_files') if file.filename != '']
+    if (zip_file is None or zip_file.filename == '') and not pdf_files:
+        return error_response('No files selected')
+    
+    processing_method = request.form.get('processing_method')
+    output_format = request.form.get('output_format', 'txt')
+    
+    unavailable = method_unavailable(processing_method)
+    if unavailable:
+        return unavailable
+    
+    api_key = None
+    if get_method(processing_method).requires_api_key:
+        api_key = request.form.get('api_key')
+        if not api_key or api_key.strip() == '':
+            return error_response('API key is required for GenAI processing')
+    
+    # Optional page selection, e.g. '1-5,12,20-' (empty = every page)
+    pages = request.form.get('pages', '').strip() or None
+    if pages:
+        try:
+            parse_page_ranges(pages)
+        except ValueError as e:
+            return error_response(f'Invalid page selection: {e}')
+    
+    upload_cleaner.maybe_run(keep=job_manager.files_in_use)
+    
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(app.config['UPLOAD_FOLDER'], f"batch_{batch_id}")
+    input_dir = os.path.join(batch_dir, 'input')
+    os.makedirs(input_dir)
+    
+    if zip_file is not None and zip_file.filename != '':
+        zip_filepath = os.path.join(batch_dir, 'upload.zip')
+        save_upload(zip_file, zip_filepath)
+        try:
+            extract_pdfs_from_zip(zip_filepath, input_dir, app.config['BATCH_ZIP_MAX_BYTES'])
+        except zipfile.BadZipFile:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return error_response('Invalid ZIP archive')
+        except ArchiveTooLarge as e:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return error_response(str(e), 413)
+        os.remove(zip_filepath)
+    names = {relative_path: relative_path for relative_path in find_pdfs(input_dir)}
+    # The index keeps files with the same (or the same sanitized) name apart
+    for index, file in enumerate(pdf_files, start=1):
+        if allowed_file(file.filename):
+            filename = f"{index:04d}_{safe_pdf_filename(file.filename)}"
+            save_upload(file, os.path.join(input_dir, filename))
+            names[filename] = file.filename
+    
+    if not names:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return error_response('No PDF files found in the upload')
+    
+    # Reject damaged and non-PDF files before the batch takes a place in the queue
+    for relative_path, name in names.items():
+        try:
+            validate_pdf(os.path.join(input_dir, relative_path))
+        except InvalidUpload as e:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            return error_response(f'{name}: {e}')
+    
+    archive_filename = f"batch_{batch_id}.zip"
+    try:
+        job = job_manager.submit(
+            'batch', run_batch_job,
+            batch_dir, os.path.join(app.config['UPLOAD_FOLDER'], archive_filename),
+            processing_method, output_format, api_key,
+            output_filename=archive_filename,
+            files=(os.path.basename(batch_dir),),
+            page_numbers=pages
+        )
+    except JobQueueFull as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return error_response(str(e), 503)
+    
+    if wants_json():
+        response = job.to_dict()
+        response['status_url'] = url_for('job_status', job_id=job.id)
+        response['result_url'] = url_for('job_result', job_id=job.id)
+        return jsonify(response), 202
+    return redirect(url_for('job_status', job_id=job.id))
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+def sse_message(event, data, event_id=None):
+    """Format one server-sent event"""
+    lines = [f"event: {event}"]
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+def iter_job_events(job, result_url, pages_sent=0, keepalive_seconds=15):
+    """
+    Server-sent events for a job: 'page' with the text of each page as it is
+    written, 'progress' when the status or page count changes, then 'done'
+    or 'failed'. Page events carry their index as the event id, so a
+    reconnecting EventSource resumes after the last page it received.
+
+    Runs after the request context is gone, so anything needing it is passed in.
+    """
+    state = None
+    while True:
+        changed = job.wait_for_update(pages_sent, state, keepalive_seconds)
+        pages = job.pages[pages_sent:]
+        for page_number, text in pages:
+            pages_sent += 1
+            yield sse_message('page', {'page': page_number, 'text': text}, pages_sent)
+        state = job.state()
+        if job.finished:
+            data = job.to_dict()
+            data['result_url'] = result_url
+            yield sse_message(job.status, data)
+            return
+        if changed:
+            yield sse_message('progress', {'status': job.status, 'pages_done': job.pages_done,
+                                           'pages_total': job.pages_total})
+        else:
+            yield ': keep-alive\n\n'
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    try:
+        pages_sent = int(request.headers.get('Last-Event-ID', 0))
+    except ValueError:
+        pages_sent = 0
+    events = iter_job_events(job, url_for('job_result', job_id=job.id), pages_sent,
+                             app.config['EVENTS_KEEPALIVE_SECONDS'])
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/jobs/<job_id>/partial')
+def job_partial(job_id):
+    # Text of the pages finished so far, as a TXT download, while the job is still running
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    text = '\n\n'.join(text for _, text in list(job.pages))
+    stem = os.path.splitext(job.output_filename or job.id)[0]
+    return Response(text, mimetype='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename="{stem}_partial.txt"'})
+
+@app.route('/jobs/<job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    # Run a job that failed or has failed pages again; pages saved in its checkpoint are not redone
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job.finished:
+        return jsonify({'error': 'Job is still running'}), 409
+    checkpoint_id = job.metadata.get('checkpoint', {}).get('id')
+    if checkpoint_id is None or not os.path.exists(
+            Checkpoint(os.path.join(app.config['CHECKPOINT_FOLDER'], checkpoint_id)).source_path):
+        return jsonify({'error': 'This job has no failed pages to retry'}), 409
+    try:
+        retry = job_manager.retry(job.id)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    
+    response = retry.to_dict()
+    response['status_url'] = url_for('job_status', job_id=retry.id)
+    response['result_url'] = url_for('job_result', job_id=retry.id)
+    response['events_url'] = url_for('job_events', job_id=retry.id)
+    response['partial_url'] = url_for('job_partial', job_id=retry.id)
+    response['retry_url'] = url_for('retry_job', job_id=retry.id)
+    return jsonify(response), 202
+
+@app.route('/jobs/<job_id>/result')
+def job_result(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job.status == JOB_FAILED:
+        return jsonify({'error': f'Error processing PDF: {job.error}'}), 500
+    if job.status != JOB_DONE:
+        return jsonify(job.to_dict()), 409
+    return redirect(url_for('download_file', filename=job.output_filename, direct=request.args.get('direct')))
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus scrape endpoint
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/download/<filename>')
 def download_file(filename):
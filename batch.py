@@ -0,0 +1,271 @@
+"""
+Bulk processing of PDF folders and ZIP archives
+
+Usage:
+    python batch.py <folder-or-zip> <output-folder> --method no_ocr --format txt --workers 4
+
+Every PDF is processed with the regular process_*_pdf functions on a
+process pool. One JSON line per file is appended to manifest.jsonl in the
+output folder (status, timings, pages, detected language), and files that
+already have a manifest line are skipped, so an interrupted run can be
+resumed by running the same command again.
+"""
+import argparse
+import json
+import os
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from werkzeug.utils import secure_filename
+from page_source import parse_page_ranges
+from methods import get_method, method_names, preload
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+MANIFEST_NAME = 'manifest.jsonl'
+# Manifest statuses --retry-failed reprocesses: failed files and files with failed pages
+RETRY_STATUSES = ('failed', 'partial')
+# Most bytes of PDFs extracted from one ZIP archive, so a ZIP bomb cannot fill the disk
+ZIP_MAX_EXTRACTED_BYTES = 10 * 1024 * 1024 * 1024  # 10GB
+BATCH_METHODS = tuple(method_names())
+
+
+class ArchiveTooLarge(ValueError):
+    """Raised when the PDFs of a ZIP archive are larger than the extraction limit"""
+
+
+def safe_pdf_filename(filename):
+    """
+    secure_filename for a PDF name, keeping the .pdf extension
+
+    secure_filename drops non-ASCII characters, so 'ফাইল.pdf' would become 'pdf';
+    a name left without a stem becomes 'document.pdf'.
+    """
+    stem = secure_filename(os.path.splitext(filename)[0])
+    return f"{stem or 'document'}.pdf"
+
+
+def extract_pdfs_from_zip(zip_path, target_dir, max_bytes=None):
+    """
+    Extract the PDF files of a ZIP archive
+
+    Member paths are sanitized, so entries like '../x.pdf' stay inside target_dir.
+    Members whose sanitized paths collide (e.g. names without ASCII characters,
+    which become document.pdf) get a numbered suffix instead of overwriting each other.
+
+    Args:
+        zip_path: Path to the ZIP archive
+        target_dir: Folder the PDFs are extracted into
+        max_bytes: Most uncompressed bytes of PDFs to extract (None = ZIP_MAX_EXTRACTED_BYTES)
+
+    Returns:
+        Number of PDFs extracted
+
+    Raises:
+        ArchiveTooLarge: If the PDFs add up to more than max_bytes; nothing is extracted then
+    """
+    max_bytes = max_bytes or ZIP_MAX_EXTRACTED_BYTES
+    count = 0
+    used = set()
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [member for member in archive.infolist()
+                   if not member.is_dir() and member.filename.lower().endswith('.pdf')]
+        # ZipExtFile never reads past file_size, so the declared sizes bound what is written
+        total = sum(member.file_size for member in members)
+        if total > max_bytes:
+            raise ArchiveTooLarge(f"The PDFs in the archive add up to {total // (1024 * 1024)}MB "
+                                  f"(limit: {max_bytes // (1024 * 1024)}MB)")
+        for member in members:
+            parts = member.filename.replace('\\', '/').split('/')
+            folders = [part for part in (secure_filename(part) for part in parts[:-1]) if part]
+            stem, suffix = os.path.splitext(safe_pdf_filename(parts[-1]))
+            relative_path = os.path.join(*folders, stem + suffix)
+            number = 1
+            while relative_path.lower() in used:
+                number += 1
+                relative_path = os.path.join(*folders, f"{stem}_{number}{suffix}")
+            used.add(relative_path.lower())
+            target_path = os.path.join(target_dir, relative_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with archive.open(member) as source, open(target_path, 'wb') as target:
+                while True:
+                    chunk = source.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    target.write(chunk)
+            count += 1
+    return count
+
+
+def find_pdfs(source_dir):
+    """Relative paths of all PDFs under source_dir, sorted"""
+    pdfs = []
+    for root, _, files in os.walk(source_dir):
+        for name in files:
+            if name.lower().endswith('.pdf'):
+                pdfs.append(os.path.relpath(os.path.join(root, name), source_dir))
+    return sorted(pdfs)
+
+
+def load_manifest(output_dir):
+    """
+    Read the manifest of an earlier run
+
+    Returns:
+        Dict of relative file path -> manifest record
+    """
+    records = {}
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return records
+    with open(manifest_path, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Partial line from a crash
+            records[record['file']] = record
+    return records
+
+
+def process_one(pdf_path, relative_path, output_path, method, output_format, api_key=None, page_numbers=None):
+    """
+    Process a single PDF; runs in a worker process
+
+    Returns:
+        Manifest record dict
+    """
+    record = {'file': relative_path, 'method': method, 'output': None, 'status': 'done', 'error': None}
+    metadata = {}
+    start = time.time()
+    try:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        # The batch pool already uses every core, so methods that OCR do it in this worker only
+        get_method(method).run(pdf_path, output_path, output_format, api_key=api_key, workers=1, metadata=metadata,
+                               page_numbers=page_numbers)
+        record['output'] = output_path
+        if metadata.get('has_errors'):
+            record['status'] = 'partial'
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e)
+    record['seconds'] = round(time.time() - start, 3)
+    record['pages'] = metadata.get('pages')
+    record['language'] = metadata.get('language')
+    record['finished_at'] = time.time()
+    return record
+
+
+def run_batch(source_dir, output_dir, method, output_format='txt', workers=None, api_key=None,
+              retry_failed=False, progress_callback=None, page_numbers=None):
+    """
+    Process every PDF under source_dir, resuming from an existing manifest
+
+    Args:
+        source_dir: Folder with the input PDFs (searched recursively)
+        output_dir: Folder for the outputs and manifest.jsonl
+        method: Processing method name (see methods.py)
+        output_format: 'txt' or 'docx'
+        workers: Number of worker processes (None = one per CPU core)
+        api_key: Gemini API key for the methods that need one
+        retry_failed: Also reprocess files whose manifest record failed or has failed pages (RETRY_STATUSES)
+        progress_callback: Optional callable(files_done, files_total)
+        page_numbers: Pages to process in every file, e.g. '1-3' (None = all pages; see
+                      page_source.parse_page_ranges). Files without any of them fail.
+
+    Returns:
+        List of manifest records for every file, including skipped ones
+    """
+    if method not in BATCH_METHODS:
+        raise ValueError(f"Unknown processing method: {method}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    done = load_manifest(output_dir)
+    pdfs = find_pdfs(source_dir)
+    pending = [
+        relative_path for relative_path in pdfs
+        if relative_path not in done or (retry_failed and done[relative_path]['status'] in RETRY_STATUSES)
+    ]
+    logger.info(f"Found {len(pdfs)} PDFs, {len(pdfs) - len(pending)} already in the manifest, {len(pending)} to process",
+                extra={'files': len(pdfs), 'pending': len(pending)})
+
+    records = {relative_path: done[relative_path] for relative_path in pdfs if relative_path in done}
+    files_done = len(pdfs) - len(pending)
+    if progress_callback:
+        progress_callback(files_done, len(pdfs))
+
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    # Each worker process loads the one method it serves before its first file
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'a', encoding='utf-8') as manifest, \
+            ProcessPoolExecutor(max_workers=workers, initializer=preload, initargs=([method],)) as executor:
+        futures = {}
+        for relative_path in pending:
+            output_path = os.path.join(output_dir, os.path.splitext(relative_path)[0] + f".{output_format}")
+            future = executor.submit(process_one, os.path.join(source_dir, relative_path), relative_path,
+                                     output_path, method, output_format, api_key, page_numbers)
+            futures[future] = relative_path
+
+        for future in as_completed(futures):
+            relative_path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process itself died
+                record = {'file': relative_path, 'method': method, 'output': None,
+                          'status': 'failed', 'error': str(e), 'finished_at': time.time()}
+            records[relative_path] = record
+
+            # One line per file, on disk before moving on, so a crash loses nothing
+            manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+            manifest.flush()
+            os.fsync(manifest.fileno())
+
+            files_done += 1
+            metrics.inc('pdf_batch_files_total', method=method, status=record['status'])
+            logger.info(f"[{files_done}/{len(pdfs)}] {relative_path}: {record['status']}", extra=record)
+            if progress_callback:
+                progress_callback(files_done, len(pdfs))
+
+    return [records[relative_path] for relative_path in pdfs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', help='folder of PDFs or a ZIP archive')
+    parser.add_argument('output', help='folder for the outputs and manifest.jsonl')
+    parser.add_argument('--method', choices=BATCH_METHODS, default='no_ocr')
+    parser.add_argument('--format', dest='output_format', choices=('txt', 'docx'), default='txt')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per CPU core)')
+    parser.add_argument('--api-key', default=os.environ.get('GEMINI_API_KEY'),
+                        help='Gemini API key for methods that need one, e.g. genai (default: $GEMINI_API_KEY)')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='reprocess files that failed or had failed pages (status partial) in an earlier run')
+    parser.add_argument('--pages', help="only process these pages of each file, e.g. '1-5,12,20-'")
+    args = parser.parse_args()
+
+    if get_method(args.method).requires_api_key and not args.api_key:
+        parser.error(f"--api-key (or GEMINI_API_KEY) is required for the {args.method} method")
+    if args.pages:
+        try:
+            parse_page_ranges(args.pages)
+        except ValueError as e:
+            parser.error(f"--pages: {e}")
+
+    source_dir = args.source
+    if zipfile.is_zipfile(args.source):
+        source_dir = os.path.join(args.output, '_input')
+        os.makedirs(source_dir, exist_ok=True)
+        try:
+            print(f"Extracted {extract_pdfs_from_zip(args.source, source_dir)} PDFs from {args.source}")
+        except ArchiveTooLarge as e:
+            parser.error(str(e))
+
+    records = run_batch(source_dir, args.output, args.method, args.output_format,
+                        args.workers, args.api_key, args.retry_failed, page_numbers=args.pages)
+    failed = sum(1 for record in records if record['status'] == 'failed')
+    print(f"✅ Processed {len(records)} files ({failed} failed). Manifest: {os.path.join(args.output, MANIFEST_NAME)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare the throughput of the table-driven Bijoy converter and unicodeconverter
+
+Usage:
+    python benchmarks/bench_bijoy.py --pages 200 --page-chars 4000
+
+Both converters convert synthetic Bijoy pages one by one (as the No-OCR
+and Auto methods do) and as one document-sized string. That their outputs
+match is checked by tests/test_bijoy_converter.py.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import unicodeconverter
+from bijoy_converter import convert_bijoy_to_unicode
+from synthetic import make_bijoy_text
+
+CONVERTERS = {
+    'unicodeconverter': unicodeconverter.convert_bijoy_to_unicode,
+    'table': convert_bijoy_to_unicode,
+}
+
+
+def throughput(convert, texts):
+    size = sum(len(text.encode('utf-8')) for text in texts)
+    start = time.perf_counter()
+    for text in texts:
+        convert(text)
+    return size / (time.perf_counter() - start) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--page-chars', type=int, default=4000, help='characters of Bijoy text per page')
+    args = parser.parse_args()
+
+    pages = [make_bijoy_text(args.page_chars, seed=page) for page in range(args.pages)]
+
+    document = ''.join(pages)
+    print(f"{'converter':<18} {'per page (MB/s)':>16} {'whole document (MB/s)':>22}")
+    for name, convert in CONVERTERS.items():
+        print(f"{name:<18} {throughput(convert, pages):>16.2f} {throughput(convert, [document]):>22.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark distributed throughput (pages/sec) against the number of worker processes
+
+Usage:
+    python benchmarks/bench_distributed.py --pages 48 --workers 1 2 4 8 --latency 0.2
+
+Runs the GenAI method against a stand-in model (--latency seconds per
+request, one request at a time per worker, like a worker with its own
+quota) through a broker in a temporary folder, with worker.py workers as
+local processes. Workers are started and their methods loaded before the
+clock starts; the time covers publishing, processing and assembling.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from broker import SQLiteBroker
+from distributed import process_distributed_pdf
+from methods import preload
+from synthetic import make_digital_pdf, FakeGeminiModel
+from worker import run_worker
+
+
+def serve(broker_folder, latency, stop):
+    preload(['genai'])
+    method_options = {'model': FakeGeminiModel(latency=latency), 'requests_per_minute': 10 ** 9,
+                      'max_in_flight': 1, 'batch_size': 1}
+    run_worker(SQLiteBroker(broker_folder), methods=['genai'], poll_interval=0.02, stop=stop,
+               method_options=method_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=48, help='pages in the synthetic PDF')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds per stand-in Gemini request')
+    parser.add_argument('--pages-per-task', type=int, default=2)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_digital_pdf(os.path.join(temp_dir, 'digital.pdf'), args.pages)
+        output_path = os.path.join(temp_dir, 'output.txt')
+        for workers in sorted(set(args.workers)):
+            broker_folder = os.path.join(temp_dir, f'broker_{workers}')
+            broker = SQLiteBroker(broker_folder)
+            stop = multiprocessing.Event()
+            processes = [multiprocessing.Process(target=serve, args=(broker_folder, args.latency, stop))
+                         for _ in range(workers)]
+            for process in processes:
+                process.start()
+            # Workers show up in the broker once their method is loaded and they poll for tasks
+            while len(broker.live_workers('genai')) < workers:
+                time.sleep(0.05)
+
+            start = time.perf_counter()
+            process_distributed_pdf(broker, 'genai', pdf_path, output_path, 'txt', pages_per_task=args.pages_per_task)
+            elapsed = time.perf_counter() - start
+            results.append((workers, elapsed, args.pages / elapsed))
+
+            stop.set()
+            for process in processes:
+                process.join()
+
+    baseline = results[0][2]
+    print(f"\n{'workers':>8} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+    for workers, elapsed, rate in results:
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Gemini requests and wall time for a GenAI job at different batch sizes, offline
+
+Usage:
+    python benchmarks/bench_genai_batching.py --pages 24 --batch-sizes 1,2,4,8 --latency 0.5
+
+A fake model stands in for Gemini: each request sleeps --latency seconds plus
+--per-image seconds per image and answers with a canned text per image
+(derived from the image bytes, so every batch size must produce the same
+output). With --garble, batched responses come back without page markers to
+exercise the one-page-per-request fallback.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from GenAI_unified import process_genai_pdf
+from synthetic import FakeGeminiModel, make_digital_pdf
+
+
+def run(pdf_path, output_path, batch_size, args):
+    model = FakeGeminiModel(args.latency, args.per_image, args.garble)
+    start = time.perf_counter()
+    process_genai_pdf(pdf_path, output_path, model=model, requests_per_minute=10 ** 6,
+                      max_in_flight=args.in_flight, batch_size=batch_size)
+    seconds = time.perf_counter() - start
+    with open(output_path, encoding='utf-8') as f:
+        return model.requests, seconds, f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=24)
+    parser.add_argument('--batch-sizes', default='1,2,4,8')
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per request')
+    parser.add_argument('--per-image', type=float, default=0.05, help='extra seconds per image in a request')
+    parser.add_argument('--in-flight', type=int, default=4, help='concurrent requests')
+    parser.add_argument('--garble', action='store_true', help='return batched responses without page markers')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_digital_pdf(os.path.join(temp_dir, 'digital.pdf'), args.pages)
+        baseline = None
+        print(f"{'batch':>5} {'requests':>9} {'seconds':>8} {'pages/s':>8}  output")
+        for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+            output_path = os.path.join(temp_dir, f'out_{batch_size}.txt')
+            requests, seconds, text = run(pdf_path, output_path, batch_size, args)
+            if baseline is None:
+                baseline = text
+            same = 'same' if text == baseline else 'DIFFERENT'
+            print(f"{batch_size:>5} {requests:>9} {seconds:>8.2f} {args.pages / seconds:>8.1f}  {same}")
+
+
+if __name__ == "__main__":
+    main()
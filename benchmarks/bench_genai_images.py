@@ -0,0 +1,106 @@
+"""
+Per-page image preparation time and upload size for GenAI requests
+
+Compares:
+  legacy     pdf2image writes JPEG files to a temp dir, each is reopened and re-encoded
+  pdf2image  pages rendered in memory by poppler, encoded once
+  pymupdf    pages rendered in-process at a DPI that fits GENAI_MAX_IMAGE_SIDE, encoded once
+
+Usage:
+    python benchmarks/bench_genai_images.py --pages 10
+    python benchmarks/bench_genai_images.py --pdf some.pdf --quality 60 --max-side 2048
+
+No requests are sent. The pdf2image rows need poppler and are skipped without it.
+"""
+import argparse
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GenAI_unified
+from GenAI_unified import GENAI_DPI, choose_genai_page_dpis, encode_image_genai
+from page_source import iter_pdf_pages
+from synthetic import make_digital_pdf, make_scanned_pdf
+
+
+def prepare_legacy(pdf_path):
+    # The old GenAI path: every page written to a JPEG file first, then reopened for the request
+    from pdf2image import convert_from_path
+    temp_dir = tempfile.mkdtemp()
+    try:
+        image_paths = convert_from_path(pdf_path, dpi=300, output_folder=temp_dir, fmt='jpeg', thread_count=4,
+                                        paths_only=True, poppler_path=GenAI_unified.POPPLER_PATH)
+        for image_path in image_paths:
+            buffer = io.BytesIO()
+            Image.open(image_path).save(buffer, format='JPEG')
+            yield buffer.getvalue()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def prepare_pdf2image(pdf_path):
+    for _, image in iter_pdf_pages(pdf_path, dpi=GENAI_DPI, poppler_path=GenAI_unified.POPPLER_PATH):
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=GenAI_unified.GENAI_JPEG_QUALITY)
+        yield buffer.getvalue()
+
+
+def prepare_pymupdf(pdf_path):
+    pages = iter_pdf_pages(pdf_path, dpi=GENAI_DPI, page_dpis=choose_genai_page_dpis(pdf_path), renderer='pymupdf')
+    for _, image in pages:
+        yield encode_image_genai(image)
+
+
+PATHS = {
+    'legacy': prepare_legacy,
+    'pdf2image': prepare_pdf2image,
+    'pymupdf': prepare_pymupdf,
+}
+
+
+def measure(prepare, pdf_path):
+    """Return (pages, seconds, bytes) for preparing every page of the PDF"""
+    pages = total_bytes = 0
+    start = time.perf_counter()
+    for data in prepare(pdf_path):
+        pages += 1
+        total_bytes += len(data)
+    return pages, time.perf_counter() - start, total_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=10, help='pages in each synthetic PDF')
+    parser.add_argument('--pdf', action='append', help='benchmark this PDF instead (repeatable)')
+    parser.add_argument('--quality', type=int, default=GenAI_unified.GENAI_JPEG_QUALITY)
+    parser.add_argument('--max-side', type=int, default=GenAI_unified.GENAI_MAX_IMAGE_SIDE)
+    args = parser.parse_args()
+    GenAI_unified.GENAI_JPEG_QUALITY = args.quality
+    GenAI_unified.GENAI_MAX_IMAGE_SIDE = args.max_side
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_paths = args.pdf or [
+            make_scanned_pdf(os.path.join(temp_dir, 'scanned.pdf'), args.pages, dpi=300),
+            make_digital_pdf(os.path.join(temp_dir, 'digital.pdf'), args.pages),
+        ]
+        print(f"{'pdf':<16} {'path':<10} {'ms/page':>9} {'KB/page':>9}")
+        for pdf_path in pdf_paths:
+            for name, prepare in PATHS.items():
+                try:
+                    pages, seconds, total_bytes = measure(prepare, pdf_path)
+                except Exception as e:
+                    print(f"{os.path.basename(pdf_path):<16} {name:<10} skipped: {e}")
+                    continue
+                print(f"{os.path.basename(pdf_path):<16} {name:<10} {seconds / pages * 1000:>9.1f} "
+                      f"{total_bytes / pages / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
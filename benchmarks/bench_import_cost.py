@@ -0,0 +1,82 @@
+"""
+Startup time and memory of the web app and of each processing method
+
+Every scenario runs in a fresh interpreter: importing the web app (methods
+are loaded lazily), importing it and loading every method (what the app
+did before methods.py), and loading one method alone, as a worker process
+dedicated to that method does. Reports the import time (median of
+--repeat runs), peak RSS, the number of modules loaded and which heavy
+packages got imported (resource module: Linux/macOS only).
+
+Usage:
+    python benchmarks/bench_import_cost.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+
+from methods import method_names
+
+# Packages whose import cost the report tracks
+HEAVY_PACKAGES = ('google.generativeai', 'pytesseract', 'tesserocr', 'pdf2image', 'fitz', 'PyPDF2', 'PIL')
+
+CHILD = """
+import json, resource, sys, time
+sys.path.insert(0, {repo!r})
+start = time.perf_counter()
+{code}
+seconds = time.perf_counter() - start
+peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == 'darwin' else 1024)
+print(json.dumps({{'seconds': seconds, 'peak_rss': peak_rss, 'modules': len(sys.modules),
+                  'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def scenarios():
+    yield 'app (lazy)', 'import app'
+    yield 'app + all methods', 'import app, methods; methods.preload()'
+    for name in method_names():
+        yield f'method {name}', f'import methods; methods.preload([{name!r}])'
+
+
+def measure(code, cwd):
+    """Run code in a fresh interpreter; returns the measurements, or an 'error'"""
+    process = subprocess.run(
+        [sys.executable, '-c', CHILD.format(repo=REPO_DIR, code=code, heavy=HEAVY_PACKAGES)],
+        capture_output=True, text=True, cwd=cwd, env=dict(os.environ, PDF_LOG_LEVEL='ERROR')
+    )
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        return {'error': (process.stderr.strip().splitlines() or ['no output'])[-1]}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='runs per scenario (the median time is reported)')
+    args = parser.parse_args()
+
+    # The app creates its upload and cache folders in the working directory
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"{'scenario':<22} {'seconds':>8} {'RSS MB':>7} {'modules':>8}  heavy packages")
+        for label, code in scenarios():
+            runs = [measure(code, temp_dir) for _ in range(max(1, args.repeat))]
+            failed = [run for run in runs if 'error' in run]
+            if failed:
+                print(f"{label:<22} error: {failed[0]['error']}")
+                continue
+            seconds = statistics.median(run['seconds'] for run in runs)
+            peak_rss = statistics.median(run['peak_rss'] for run in runs)
+            print(f"{label:<22} {seconds:>8.3f} {peak_rss / 1e6:>7.1f} {runs[0]['modules']:>8}  "
+                  f"{', '.join(runs[0]['heavy']) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
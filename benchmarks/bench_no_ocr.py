@@ -0,0 +1,96 @@
+"""
+Benchmark No-OCR extraction: wall time and peak RSS of the single-pass
+streaming extractor against the previous three-open, string-concatenating path
+
+Usage:
+    python benchmarks/bench_no_ocr.py --pages 1000
+
+Each run happens in a fresh subprocess so peak RSS is measured per path
+(uses the resource module, so Linux/macOS only).
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from synthetic import make_digital_pdf
+
+
+def legacy_no_ocr(pdf_path, output_path):
+    """The previous process_no_ocr_pdf: sample open, full re-open, quadratic concatenation"""
+    import fitz
+    import PyPDF2
+    from No_OCR_unified import detect_language
+
+    sample_text = ""
+    doc = fitz.open(pdf_path)
+    for i, page in enumerate(doc):
+        if i < 3:
+            sample_text += page.get_text()
+    doc.close()
+
+    if detect_language(sample_text) == 'bangla':
+        text = ""
+        doc = fitz.open(pdf_path)
+        for page in doc:
+            text += page.get_text()
+        doc.close()
+    else:
+        text = ""
+        with open(pdf_path, 'rb') as pdf_file:
+            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            for page_num in range(len(pdf_reader.pages)):
+                text += pdf_reader.pages[page_num].extract_text() + '\n\n'
+
+    with open(output_path, 'w', encoding='utf-8') as txt_file:
+        txt_file.write(text)
+
+
+def run_one(path_name, pdf_path, output_path):
+    """Child process: run one path and print its timing as JSON"""
+    from No_OCR_unified import process_no_ocr_pdf
+
+    start = time.perf_counter()
+    if path_name == 'legacy':
+        legacy_no_ocr(pdf_path, output_path)
+    else:
+        process_no_ocr_pdf(pdf_path, output_path, 'txt')
+    elapsed = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak_rss *= 1024  # Linux reports KiB
+    print(json.dumps({'path': path_name, 'seconds': elapsed, 'peak_rss': peak_rss}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=1000, help='pages in the synthetic digital PDF')
+    parser.add_argument('--run', nargs=3, metavar=('PATH', 'PDF', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(*args.run)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_digital_pdf(os.path.join(temp_dir, 'digital.pdf'), args.pages)
+        print(f"{'path':>10} {'seconds':>9} {'peak RSS (MB)':>14}")
+        for path_name in ('legacy', 'streaming'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--run', path_name, pdf_path,
+                 os.path.join(temp_dir, f'{path_name}.txt')],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{path_name:>10} {result['seconds']:>9.2f} {result['peak_rss'] / 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
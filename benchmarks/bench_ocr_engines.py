@@ -0,0 +1,59 @@
+"""
+Per-page OCR latency of the available OCR engines (pytesseract vs tesserocr)
+
+pytesseract starts a tesseract process and reloads the models for every
+page; tesserocr keeps them loaded. Short pages show the difference most,
+so the default page holds only a few lines.
+
+Usage:
+    python benchmarks/bench_ocr_engines.py --pages 20 --lines 5
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCR_unified import TESSERACT_CONFIG
+from ocr_engines import ENGINES, tesserocr
+from synthetic import make_scanned_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20)
+    parser.add_argument('--lines', type=int, default=5, help='text lines per page')
+    parser.add_argument('--lang', default='eng+ben')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_scanned_pdf(os.path.join(temp_dir, 'scanned.pdf'), 1, dpi=300, lines_per_page=args.lines)
+        with fitz.open(pdf_path) as doc:
+            image = Image.open(io.BytesIO(doc[0].get_pixmap(dpi=300).tobytes('png'))).convert('L')
+
+    names = ['pytesseract'] + (['tesserocr'] if tesserocr is not None else [])
+    if tesserocr is None:
+        print("tesserocr is not installed; only measuring pytesseract (pip install tesserocr)")
+
+    print(f"{'engine':<12} {'first page':>11} {'median':>9} {'mean':>9}")
+    for name in names:
+        engine = ENGINES[name]()
+        latencies = []
+        for _ in range(args.pages):
+            start = time.perf_counter()
+            engine.image_to_string(image, args.lang, TESSERACT_CONFIG)
+            latencies.append(time.perf_counter() - start)
+        engine.close()
+        print(f"{name:<12} {latencies[0]:>10.3f}s {statistics.median(latencies[1:] or latencies):>8.3f}s "
+              f"{statistics.mean(latencies):>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
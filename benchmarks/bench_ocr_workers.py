@@ -0,0 +1,43 @@
+"""
+Benchmark OCR throughput (pages/sec) against the number of worker processes
+
+Usage:
+    python benchmarks/bench_ocr_workers.py --pages 32 --workers 1 2 4 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCR_unified import process_ocr_pdf
+from synthetic import make_scanned_pdf
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=32, help='pages in the synthetic scanned PDF')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_scanned_pdf(os.path.join(temp_dir, 'scanned.pdf'), args.pages)
+        output_path = os.path.join(temp_dir, 'output.txt')
+
+        results = []
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            process_ocr_pdf(pdf_path, output_path, 'txt', workers=workers)
+            elapsed = time.perf_counter() - start
+            results.append((workers, elapsed, args.pages / elapsed))
+
+    baseline = results[0][2]
+    print(f"\n{'workers':>8} {'seconds':>9} {'pages/sec':>10} {'speedup':>8}")
+    for workers, elapsed, rate in results:
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
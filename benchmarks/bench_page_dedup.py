@@ -0,0 +1,58 @@
+"""
+Gemini requests and wall time with and without blank/duplicate page skipping, offline
+
+Usage:
+    python benchmarks/bench_page_dedup.py --documents 10 --pages-per-document 3 --latency 0.5
+
+The input is a synthetic scanned bundle: every document starts with the same
+cover sheet and ends with a blank separator page, so with the default layout
+2 of every 5 pages need no Gemini call. A fake model stands in for Gemini
+(see synthetic.FakeGeminiModel).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import GenAI_unified
+from synthetic import FakeGeminiModel, make_bundle_pdf
+
+
+def run(pdf_path, output_path, skip, args):
+    GenAI_unified.GENAI_SKIP_BLANK_PAGES = skip
+    GenAI_unified.GENAI_REUSE_DUPLICATE_PAGES = skip
+    model = FakeGeminiModel(args.latency)
+    metadata = {}
+    start = time.perf_counter()
+    GenAI_unified.process_genai_pdf(pdf_path, output_path, model=model, requests_per_minute=10 ** 6,
+                                    max_in_flight=args.in_flight, metadata=metadata)
+    return model.requests, time.perf_counter() - start, metadata.get('skipped_pages')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=10)
+    parser.add_argument('--pages-per-document', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per request')
+    parser.add_argument('--in-flight', type=int, default=4, help='concurrent requests')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        pdf_path = make_bundle_pdf(os.path.join(temp_dir, 'bundle.pdf'), args.documents, args.pages_per_document)
+        pages = args.documents * (args.pages_per_document + 2)
+        print(f"{pages} pages")
+        print(f"{'skipping':>8} {'requests':>9} {'seconds':>8} {'blank':>6} {'dupes':>6} {'check s':>8}")
+        for skip in (False, True):
+            requests, seconds, skipped = run(pdf_path, os.path.join(temp_dir, f'out_{skip}.txt'), skip, args)
+            if skipped:
+                print(f"{'on':>8} {requests:>9} {seconds:>8.2f} {len(skipped['blank_pages']):>6} "
+                      f"{len(skipped['duplicate_pages']):>6} {skipped['check_seconds']:>8.2f}")
+            else:
+                print(f"{'off':>8} {requests:>9} {seconds:>8.2f} {'-':>6} {'-':>6} {'-':>8}")
+
+
+if __name__ == "__main__":
+    main()
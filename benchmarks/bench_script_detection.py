@@ -0,0 +1,71 @@
+"""
+Compare the cost of the old tesseract language detection with the thumbnail script detector
+
+Usage:
+    python benchmarks/bench_script_detection.py --pages 5
+    python benchmarks/bench_script_detection.py --fixtures fixtures/ocr
+
+With --fixtures, every page of every PDF in the folder is used (put some
+Bangla pages there); otherwise synthetic English scans are used.
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from OCR_unified import detect_language_with_tesseract
+from script_detection import detect_script
+from synthetic import make_scanned_pdf
+
+
+def load_page_images(pdf_paths, dpi=300):
+    images = []
+    for pdf_path in pdf_paths:
+        with fitz.open(pdf_path) as doc:
+            for page in doc:
+                pixmap = page.get_pixmap(dpi=dpi)
+                images.append((f"{os.path.basename(pdf_path)}:{page.number + 1}",
+                               Image.open(io.BytesIO(pixmap.tobytes('png'))).convert('RGB')))
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--fixtures', help='folder of PDFs to sample pages from')
+    parser.add_argument('--pages', type=int, default=5, help='synthetic pages (without --fixtures)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if args.fixtures:
+            pdf_paths = [os.path.join(args.fixtures, name) for name in sorted(os.listdir(args.fixtures))
+                         if name.lower().endswith('.pdf')]
+        else:
+            pdf_paths = [make_scanned_pdf(os.path.join(temp_dir, 'scanned.pdf'), args.pages, angle=1)]
+        images = load_page_images(pdf_paths)
+
+    print(f"{'page':<24} {'tesseract':>18} {'thumbnail':>24}")
+    totals = [0.0, 0.0]
+    for name, image in images:
+        start = time.perf_counter()
+        old_language = detect_language_with_tesseract(image)
+        old_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        new_language, detected_by = detect_script(image)
+        new_seconds = time.perf_counter() - start
+        totals[0] += old_seconds
+        totals[1] += new_seconds
+        print(f"{name:<24} {old_language:>8} {old_seconds:>8.3f}s "
+              f"{new_language:>8} {detected_by:>10} {new_seconds:>6.3f}s")
+    print(f"\nPer page: tesseract {totals[0] / len(images):.3f}s, thumbnail {totals[1] / len(images):.3f}s "
+          f"({totals[0] / max(totals[1], 1e-9):.0f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
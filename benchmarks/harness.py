@@ -0,0 +1,205 @@
+"""
+Benchmark and regression harness for the extraction pipelines
+
+Usage:
+    python benchmarks/harness.py --pages 20
+    python benchmarks/harness.py --corpora digital_english,bijoy --methods no_ocr,genai --pages 200
+    python benchmarks/harness.py --pages 20 --strict   # exit 1 on a regression (for CI)
+
+Synthetic corpora (digital English, digital Bijoy, Unicode Bangla,
+scanned and mixed) are generated with a fixed seed, then every method runs
+on every corpus in a fresh subprocess, so peak RSS is measured per run
+(resource module: Linux/macOS only). GenAI runs against a stand-in model,
+so no API key or network is needed.
+
+Each run records wall time, pages/sec, peak RSS and the SHA-256 of the
+output, and the whole session is appended to a JSON Lines history
+(--history). Results are compared with the last recorded run of the same
+corpus, method and page count: a drop in pages/sec beyond --tolerance, or
+a changed output checksum, is reported as a regression. Runs that fail
+(e.g. OCR without tesseract installed) are recorded with their error.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(REPO_DIR)
+
+from synthetic import (make_bangla_pdf, make_bijoy_pdf, make_digital_pdf, make_mixed_pdf, make_scanned_pdf,
+                       FakeGeminiModel)
+from methods import get_method, method_names
+
+CORPORA = {
+    'digital_english': make_digital_pdf,
+    'bijoy': make_bijoy_pdf,
+    'unicode_bangla': make_bangla_pdf,
+    'scanned': lambda pdf_path, pages: make_scanned_pdf(pdf_path, pages, dpi=200),
+    'mixed': make_mixed_pdf,
+}
+METHODS = tuple(method_names())
+DEFAULT_METHODS = ('no_ocr', 'ocr', 'genai')
+DEFAULT_HISTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'history.jsonl')
+
+
+def run_method(method, pdf_path, output_path, genai_latency=0.0):
+    """Run one processing method the way the web app does"""
+    method = get_method(method)
+    if method.requires_api_key:
+        # Gemini methods get the stand-in model instead of an API key
+        method.run(pdf_path, output_path, 'txt', model=FakeGeminiModel(genai_latency), requests_per_minute=10 ** 9)
+    else:
+        method.run(pdf_path, output_path, 'txt')
+
+
+def run_child(method, pdf_path, output_path, genai_latency):
+    """Child process: run one method and print its measurements as JSON"""
+    start = time.perf_counter()
+    run_method(method, pdf_path, output_path, genai_latency)
+    seconds = time.perf_counter() - start
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':
+        peak_rss *= 1024  # Linux reports KiB
+    digest = hashlib.sha256()
+    with open(output_path, 'rb') as f:
+        digest.update(f.read())
+    print(json.dumps({'seconds': seconds, 'peak_rss': peak_rss, 'sha256': digest.hexdigest()}))
+
+
+def measure(method, pdf_path, output_path, genai_latency):
+    """Run one method in a fresh subprocess; returns a result dict with 'status' 'ok' or 'error'"""
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--run', method, pdf_path, output_path,
+         '--genai-latency', str(genai_latency)],
+        capture_output=True, text=True, env=dict(os.environ, PDF_LOG_LEVEL='ERROR')
+    )
+    lines = process.stdout.strip().splitlines()
+    if process.returncode != 0 or not lines:
+        error = (process.stderr.strip().splitlines() or ['no output'])[-1]
+        return {'status': 'error', 'error': error}
+    result = json.loads(lines[-1])
+    result['status'] = 'ok'
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_path):
+    """Sessions recorded so far, oldest first"""
+    if not os.path.exists(history_path):
+        return []
+    sessions = []
+    with open(history_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                sessions.append(json.loads(line))
+            except ValueError:
+                continue
+    return sessions
+
+
+def find_baseline(sessions, result):
+    """The last successful result of the same corpus, method and page count"""
+    for session in reversed(sessions):
+        for earlier in session['results']:
+            if (earlier['status'] == 'ok' and earlier['corpus'] == result['corpus']
+                    and earlier['method'] == result['method'] and earlier['pages'] == result['pages']):
+                return earlier
+    return None
+
+
+def compare(result, baseline, tolerance):
+    """List of regressions of result against baseline"""
+    if baseline is None or result['status'] != 'ok':
+        return []
+    regressions = []
+    if result['pages_per_sec'] < baseline['pages_per_sec'] * (1 - tolerance):
+        regressions.append(f"{result['pages_per_sec']:.1f} pages/s, was {baseline['pages_per_sec']:.1f}")
+    if result['sha256'] != baseline['sha256']:
+        regressions.append("output changed")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, default=20, help='pages in each synthetic PDF')
+    parser.add_argument('--corpora', default=','.join(CORPORA), help='comma-separated corpus names')
+    parser.add_argument('--methods', default=','.join(DEFAULT_METHODS), help=f"comma-separated, from {METHODS}")
+    parser.add_argument('--genai-latency', type=float, default=0.0, help='seconds per stand-in Gemini request')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON Lines file the session is appended to')
+    parser.add_argument('--no-record', action='store_true', help='compare only, do not append to the history')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed pages/sec drop (0.2 = 20%%)')
+    parser.add_argument('--strict', action='store_true', help='exit with status 1 if there is a regression')
+    parser.add_argument('--run', nargs=3, metavar=('METHOD', 'PDF', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_child(*args.run, args.genai_latency)
+        return
+
+    corpora = [name for name in args.corpora.split(',') if name]
+    methods = [name for name in args.methods.split(',') if name]
+    for name in corpora:
+        if name not in CORPORA:
+            parser.error(f"unknown corpus: {name}")
+    for name in methods:
+        if name not in METHODS:
+            parser.error(f"unknown method: {name}")
+
+    sessions = load_history(args.history)
+    results = []
+    regressions = 0
+    with tempfile.TemporaryDirectory() as temp_dir:
+        print(f"{'corpus':<16} {'method':<9} {'seconds':>8} {'pages/s':>8} {'RSS MB':>7} {'sha256':<12}  vs last run")
+        for corpus in corpora:
+            pdf_path = CORPORA[corpus](os.path.join(temp_dir, f'{corpus}.pdf'), args.pages)
+            for method in methods:
+                result = {'corpus': corpus, 'method': method, 'pages': args.pages}
+                result.update(measure(method, pdf_path, os.path.join(temp_dir, f'{corpus}_{method}.txt'),
+                                      args.genai_latency))
+                if result['status'] != 'ok':
+                    print(f"{corpus:<16} {method:<9} error: {result['error']}")
+                    results.append(result)
+                    continue
+                result['pages_per_sec'] = args.pages / result['seconds']
+                baseline = find_baseline(sessions, result)
+                found = compare(result, baseline, args.tolerance)
+                regressions += bool(found)
+                verdict = 'REGRESSION: ' + '; '.join(found) if found else ('ok' if baseline else 'no baseline')
+                print(f"{corpus:<16} {method:<9} {result['seconds']:>8.2f} {result['pages_per_sec']:>8.1f} "
+                      f"{result['peak_rss'] / 1e6:>7.1f} {result['sha256'][:12]:<12}  {verdict}")
+                results.append(result)
+
+    if not args.no_record:
+        session = {
+            'timestamp': time.time(),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }
+        with open(args.history, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(session) + '\n')
+        print(f"Recorded in {args.history}")
+    if regressions:
+        print(f"{regressions} regression(s) against the last recorded runs")
+        if args.strict:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
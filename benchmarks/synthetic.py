@@ -0,0 +1,285 @@
+"""
+Synthetic PDFs and texts, and a stand-in Gemini model, for the benchmark scripts
+
+Run any benchmark from the repository root, e.g.:
+    python benchmarks/bench_ocr_workers.py --pages 32
+"""
+import hashlib
+import io
+import os
+import random
+import threading
+import time
+import fitz  # PyMuPDF
+from PIL import Image
+
+SAMPLE_ENGLISH = (
+    "The quick brown fox jumps over the lazy dog. Government circular number {page} "
+    "regarding the annual budget allocation for the fiscal year. All offices are "
+    "requested to submit their reports before the deadline mentioned below."
+)
+
+SAMPLE_BANGLA = (
+    "সরকারি পরিপত্র নম্বর {page}: আগামী অর্থবছরের বাজেট বরাদ্দ সংক্রান্ত। সকল দপ্তরকে "
+    "নির্ধারিত সময়ের মধ্যে প্রতিবেদন জমা দেওয়ার জন্য অনুরোধ করা হলো।"
+)
+
+# Bijoy (ASCII-encoded Bangla) building blocks for make_bijoy_text
+BIJOY_CONSONANTS = 'KLMNOPQRSTUVWXYZ_`abcdefghijklmnopq' + '°±³µ¶·¸»¼½¾ÀÁÂÃÄÅÆÇÈÉÊËÌÎÏ×ØÙÚÛÜÝÞßàáâãäåçéêëìíîïðòóôõö÷ùûüýþÿ'
+BIJOY_CONJUNCTS = ('”Q', 'K¡', '¯Œ', 'Mœ', 'š—', '¯Í', 'š’', 'mœ', '¯^', 'Av', 'nè', '›U', '›`')
+BIJOY_VOWELS = 'ABCDEFGHIJ'
+BIJOY_PRE_KARS = 'w‡†‰ˆ'
+BIJOY_POST_KARS = 'vxyz~„'
+BIJOY_FOLAS = ('¨', '«', 'ª', 'ø')
+BIJOY_SEPARATORS = [' '] * 12 + [', ', '| ', '\n', ' (', ') ', ' - ', '  ', ' 12 ']
+
+
+def _bijoy_word(rng):
+    letters = [rng.choice(BIJOY_VOWELS)] if rng.random() < 0.1 else []
+    for _ in range(rng.randint(1, 4)):
+        letter = rng.choice(BIJOY_CONJUNCTS) if rng.random() < 0.08 else rng.choice(BIJOY_CONSONANTS)
+        if rng.random() < 0.1:
+            letter += rng.choice(BIJOY_FOLAS)
+        if rng.random() < 0.06:
+            letter += '©'  # reph
+        kar = rng.random()
+        if kar < 0.25:
+            letter = rng.choice(BIJOY_PRE_KARS) + letter + ('v' if rng.random() < 0.3 else '')
+        elif kar < 0.55:
+            letter += rng.choice(BIJOY_POST_KARS)
+        letters.append(letter)
+    if rng.random() < 0.1:
+        letters.append(rng.choice('stu'))
+    return ''.join(letters)
+
+
+def make_bijoy_text(chars, seed=0):
+    """
+    Random Bijoy-encoded text: words with pre- and post-base kars, folas, reph and conjuncts
+
+    Args:
+        chars: Approximate length of the text
+        seed: Random seed, so runs are repeatable
+    """
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < chars:
+        part = _bijoy_word(rng) + rng.choice(BIJOY_SEPARATORS)
+        parts.append(part)
+        length += len(part)
+    return ''.join(parts)
+
+
+def make_digital_pdf(pdf_path, pages, text=SAMPLE_ENGLISH, lines_per_page=30):
+    """
+    Create a PDF with embedded (selectable) text
+
+    Args:
+        pdf_path: Where to save the PDF
+        pages: Number of pages
+        text: Text template for each line; '{page}' is replaced with the page number
+        lines_per_page: Number of text lines written on each page
+
+    Returns:
+        pdf_path
+    """
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        page = doc.new_page()  # A4-ish default size
+        line = text.format(page=page_number)
+        y = 50
+        for _ in range(lines_per_page):
+            page.insert_text((40, y), line[:90], fontsize=10)
+            y += 24
+    doc.save(pdf_path)
+    doc.close()
+    return pdf_path
+
+
+def _write_lines(page, lines, font, fontsize=10):
+    """Write lines of any Unicode text with a TextWriter (the text layer keeps every character)"""
+    writer = fitz.TextWriter(page.rect)
+    y = 50
+    for line in lines:
+        writer.append((40, y), line, font=font, fontsize=fontsize)
+        y += 24
+    writer.write_text(page)
+
+
+def _save_subset(doc, pdf_path):
+    doc.subset_fonts()  # Only the glyphs used, instead of the whole fallback font
+    doc.save(pdf_path, garbage=3, deflate=True)
+    doc.close()
+    return pdf_path
+
+
+def make_bijoy_pdf(pdf_path, pages, lines_per_page=30, seed=0):
+    """
+    Create a PDF whose text layer is Bijoy-encoded Bangla, like documents typed with SutonnyMJ
+
+    Every page gets different random Bijoy text (see make_bijoy_text), so the
+    No-OCR method detects Bangla and converts it to Unicode page by page.
+
+    Returns:
+        pdf_path
+    """
+    font = fitz.Font('cjk')  # Built-in font with the Windows-1252 characters Bijoy uses
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        text = make_bijoy_text(lines_per_page * 80, seed=seed + page_number).replace('\n', ' ')
+        lines = [text[i:i + 80] for i in range(0, lines_per_page * 80, 80)]
+        _write_lines(doc.new_page(), lines, font)
+    return _save_subset(doc, pdf_path)
+
+
+def make_bangla_pdf(pdf_path, pages, text=SAMPLE_BANGLA, lines_per_page=30):
+    """
+    Create a PDF with a Unicode Bangla text layer
+
+    PyMuPDF ships no Bengali font, so the glyphs render as boxes while the
+    text layer is exact: fine for text extraction, meaningless for OCR.
+
+    Returns:
+        pdf_path
+    """
+    font = fitz.Font('cjk')
+    doc = fitz.open()
+    for page_number in range(1, pages + 1):
+        line = text.format(page=page_number)
+        _write_lines(doc.new_page(), [line[:60]] * lines_per_page, font)
+    return _save_subset(doc, pdf_path)
+
+
+def make_scanned_pdf(pdf_path, pages, dpi=150, text=SAMPLE_ENGLISH, lines_per_page=30, angle=0):
+    """
+    Create an image-only PDF, like the output of a scanner
+
+    Each page is rendered from a digital page and embedded as a picture,
+    so it has no text layer and must be OCR'd.
+
+    Args:
+        angle: Rotate the scan by this many degrees, like a page fed in crooked
+
+    Returns:
+        pdf_path
+    """
+    source = fitz.open()
+    digital_page = source.new_page()
+    y = 50
+    for _ in range(lines_per_page):
+        digital_page.insert_text((40, y), text.format(page=1)[:90], fontsize=10)
+        y += 24
+    pixmap = digital_page.get_pixmap(dpi=dpi)
+    image_bytes = pixmap.tobytes("png")
+    source.close()
+    if angle:
+        image = Image.open(io.BytesIO(image_bytes)).rotate(angle, fillcolor=(255, 255, 255))
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        image_bytes = buffer.getvalue()
+
+    doc = fitz.open()
+    for _ in range(pages):
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=image_bytes)
+    doc.save(pdf_path)
+    doc.close()
+    return pdf_path
+
+
+def make_mixed_pdf(pdf_path, pages, dpi=150):
+    """
+    Create a PDF cycling through digital English, Bijoy and scanned pages
+
+    Returns:
+        pdf_path
+    """
+    makers = (make_digital_pdf, make_bijoy_pdf, lambda path, count: make_scanned_pdf(path, count, dpi=dpi))
+    kinds = [page_index % len(makers) for page_index in range(pages)]
+    parts = []
+    for kind, make in enumerate(makers):
+        part_path = f"{pdf_path}.part{kind}"
+        count = kinds.count(kind)
+        parts.append(fitz.open(make(part_path, count)) if count else None)
+
+    doc = fitz.open()
+    taken = [0] * len(makers)
+    for kind in kinds:
+        doc.insert_pdf(parts[kind], from_page=taken[kind], to_page=taken[kind])
+        taken[kind] += 1
+    for kind, part in enumerate(parts):
+        if part is not None:
+            part.close()
+            os.remove(f"{pdf_path}.part{kind}")
+    doc.save(pdf_path, garbage=3, deflate=True)
+    doc.close()
+    return pdf_path
+
+
+def make_bundle_pdf(pdf_path, documents, pages_per_document=3, text=SAMPLE_ENGLISH):
+    """
+    Create a bundle of documents the way they come off a scanner: each one is
+    a cover sheet (the same every time), its own pages and a blank separator
+
+    Returns:
+        pdf_path
+    """
+    doc = fitz.open()
+    for document in range(documents):
+        cover = doc.new_page()
+        cover.insert_text((200, 300), "COVER SHEET", fontsize=24)
+        cover.insert_text((200, 340), "Submitted to the records section", fontsize=12)
+        for page_index in range(pages_per_document):
+            page = doc.new_page()
+            line = text.format(page=f"{document + 1}.{page_index + 1}")
+            y = 50
+            for _ in range(30):
+                page.insert_text((40, y), line[:90], fontsize=10)
+                y += 24
+        doc.new_page()
+    doc.save(pdf_path)
+    doc.close()
+    return pdf_path
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeGeminiModel:
+    """
+    Stand-in for a Gemini model: answers after a fixed delay, without network access
+
+    Each image gets a canned text derived from its bytes, so outputs are
+    deterministic. Batched requests (several images) are answered with
+    GenAI_unified.PAGE_MARKER lines, or without them when garble is set.
+
+    Args:
+        latency: Seconds per request
+        per_image: Extra seconds per image in a request
+        garble: Leave the page markers out of batched responses
+    """
+
+    def __init__(self, latency=0.0, per_image=0.0, garble=False):
+        self.latency = latency
+        self.per_image = per_image
+        self.garble = garble
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, **kwargs):
+        from GenAI_unified import PAGE_MARKER
+
+        images = [part for part in contents if isinstance(part, dict)]
+        with self.lock:
+            self.requests += 1
+        time.sleep(self.latency + self.per_image * len(images))
+        texts = [f"Canned text {hashlib.sha1(image['data']).hexdigest()[:12]}\nsecond line" for image in images]
+        if len(images) == 1:
+            return FakeResponse(texts[0])
+        if self.garble:
+            return FakeResponse('\n\n'.join(texts))
+        return FakeResponse(''.join(f"{PAGE_MARKER.format(number=number)}\n{text}\n"
+                                    for number, text in enumerate(texts, start=1)))
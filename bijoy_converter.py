@@ -0,0 +1,202 @@
+import re
+from unicodeconverter import lists
+from unicodeconverter.maps import bijoy_pre_map, bijoy_to_unicode
+
+# Same conversion rules as unicodeconverter.convert_bijoy_to_unicode, compiled once at import.
+# That converter makes a str.replace pass over the whole text per mapping entry (over 500
+# passes), splits the text into a list of one-character segments and deletes list items
+# while reordering them. Here every step is a single pass, so the cost is linear in the
+# length of the text and independent of the size of the mapping.
+
+_PUNCTUATION = '.,!?();:-'
+_SPACES_PATTERN = re.compile('[\r\t\f\v ]{2,}')
+
+# Every Bijoy character that maps to Unicode on its own starts a new segment
+_SEGMENT_CHARS = ''.join(bijoy for bijoy in bijoy_to_unicode if len(bijoy) == 1)
+_SEGMENT_TABLE = str.maketrans({bijoy: '\t' + bijoy for bijoy in _SEGMENT_CHARS})
+_UNICODE_TABLE = str.maketrans({bijoy: bijoy_to_unicode[bijoy] for bijoy in _SEGMENT_CHARS})
+# Two-character entries of the main mapping ('‡v' -> 'ো')
+_MULTI_CHAR_MAP = tuple((bijoy, uni) for bijoy, uni in bijoy_to_unicode.items() if len(bijoy) > 1)
+
+_E_KARS = ('‡', '†')
+_O_KAR_ENDINGS = ('v', 'Š')
+_REPH = '©'
+_PRE_KARS = frozenset(lists.bijoy_pre_kars)
+_FOLAS = frozenset(lists.bijoy_fola)
+# Segments the reordering pass acts on
+_REORDER_TRIGGERS = _PRE_KARS | {_REPH}
+_TRIGGER_PATTERN = re.compile('[' + re.escape(''.join(sorted(_REORDER_TRIGGERS))) + ']')
+
+# A segment longer than one character: its first character plus characters that do not start a segment
+_LONG_SEGMENT_PATTERN = re.compile('([^\t][^\t' + re.escape(_SEGMENT_CHARS) + ']+)')
+# A '›' that is a segment of its own (it is joined to the segment after it)
+_LONE_JOINER_PATTERN = re.compile('(?:^|\t)›(?=[\t' + re.escape(_SEGMENT_CHARS) + ']|$)')
+# Stand-ins for long segments while reordering; the first one not in the text is used
+_PLACEHOLDERS = '\x00\x01\x02\x03\x04\x05\x06\x07'
+
+
+def _compile_pre_map(mapping):
+    """
+    One regex for the multi-character mapping that matches like sequential str.replace calls
+
+    Entries are applied in mapping order, so where two entries overlap the
+    earlier one wins even if the later one starts first. A negative
+    lookahead keeps the later entry from matching in that case, and an
+    entry that contains an earlier entry never matches at all.
+    """
+    keys = list(mapping)
+    alternatives = []
+    for index, key in enumerate(keys):
+        blocked = set()
+        for earlier in keys[:index]:
+            for offset in range(1, len(key)):
+                suffix = key[offset:]
+                if earlier.startswith(suffix):
+                    blocked.add(earlier[len(suffix):])
+                elif earlier in suffix:
+                    blocked.add('')
+        if '' in blocked:
+            continue
+        pattern = re.escape(key)
+        if blocked:
+            pattern += '(?!' + '|'.join(re.escape(rest) for rest in sorted(blocked)) + ')'
+        alternatives.append(pattern)
+    return re.compile('|'.join(alternatives))
+
+
+_PRE_MAP_PATTERN = _compile_pre_map(bijoy_pre_map)
+
+
+def _split_segments(text):
+    """Non-empty segments of text, split exactly like the original converter does"""
+    for bijoy, _ in _MULTI_CHAR_MAP:
+        text = text.replace(bijoy, '\t' + bijoy)
+    parts = text.translate(_SEGMENT_TABLE).strip().split('\t')
+    segments = []
+    i = 0
+    while i < len(parts):
+        if parts[i] == '›' and i + 1 < len(parts):
+            # A lone '›' is joined to the part after it, even an empty one
+            segments.append(parts[i] + parts[i + 1])
+            i += 2
+            continue
+        if parts[i]:
+            segments.append(parts[i])
+        i += 1
+    return segments
+
+
+def _reorder_segments(segments, positions):
+    """
+    Move pre-base kars after their consonant (and fola) and reph before it, in place
+
+    Bijoy stores text in visual order (ি before ক, reph after the consonant);
+    Unicode needs logical order. Only segments in _REORDER_TRIGGERS do
+    anything, and every rule only touches the segments around the current
+    one, so the pass jumps from trigger to trigger.
+
+    Args:
+        segments: List of segments
+        positions: Ascending indexes of the trigger segments
+    """
+    count = len(segments)
+    positions = list(positions)
+    i = 0
+    for position in positions:
+        if position < i or segments[position] not in _REORDER_TRIGGERS:
+            continue  # Already moved by an earlier rule
+        i = position
+        segment = segments[i]
+
+        if segment in _E_KARS:
+            if i < count - 2 and segments[i + 2] in _O_KAR_ENDINGS:
+                # o-kar / ou-kar: e-kar goes after the consonant, next to its ending
+                segments[i], segments[i + 1] = segments[i + 1], segments[i]
+                i += 3
+                continue
+            if i == count - 1:
+                i += 1
+                continue  # Nothing to move past at the end of the text
+        elif segment == _REPH:
+            if i < 2:
+                # At the start of the text the swaps below wrap around to the last segments
+                positions.extend((count - 2, count - 1))
+            if segments[i - 1] in _FOLAS:
+                segments[i], segments[i - 2] = segments[i - 2], segments[i]
+            segments[i], segments[i - 1] = segments[i - 1], segments[i]
+            i += 1
+            continue
+        elif i >= count - 1:
+            i += 1
+            continue
+
+        # Pre-base kar: move it past the consonant, and past a fola on it
+        j = 1
+        if i + 2 < count:
+            if segments[i + 2] == _REPH:
+                segments[i], segments[i + 2] = segments[i + 2], segments[i]
+                i += 3
+                continue
+            if segments[i + 2] in _FOLAS:
+                j = 2
+        for k in range(i, i + j):
+            segments[k], segments[k + 1] = segments[k + 1], segments[k]
+        i += j + 1
+    return segments
+
+
+def _reorder_split(text):
+    segments = _split_segments(text)
+    positions = [k for k, segment in enumerate(segments) if segment in _REORDER_TRIGGERS]
+    return ''.join(_reorder_segments(segments, positions))
+
+
+def _reorder(text):
+    """Put the segments of text in Unicode order and join them again"""
+    placeholder = next((char for char in _PLACEHOLDERS if char not in text), None)
+    if placeholder is None or ('›' in text and _LONE_JOINER_PATTERN.search(text)):
+        return _reorder_split(text)
+
+    # Nearly every segment is a single character. With the longer ones swapped for a
+    # placeholder the text itself is the segment list. Reordering only moves trigger
+    # segments, so the long segments come back out in their original order.
+    parts = _LONG_SEGMENT_PATTERN.split(text)
+    long_segments = parts[1::2]
+    segments = placeholder.join(parts[::2]).replace('\t', '')
+    if _REPH in segments[:2]:
+        return _reorder_split(text)  # Would wrap around to the last segments
+    positions = [match.start() for match in _TRIGGER_PATTERN.finditer(segments)]
+    text = ''.join(_reorder_segments(list(segments), positions))
+
+    if long_segments:
+        parts = text.split(placeholder)
+        text = ''.join(part + segment for part, segment in zip(parts, long_segments)) + parts[-1]
+    return text
+
+
+def convert_bijoy_to_unicode(text):
+    """
+    Convert Bijoy-encoded Bangla text to Unicode
+
+    Gives the same output as unicodeconverter.convert_bijoy_to_unicode, in
+    time linear in the length of the text. Convert a document page by page:
+    pages are independent, so they can also be converted in parallel.
+
+    Args:
+        text: Bijoy text, e.g. the text of one PDF page
+
+    Returns:
+        Unicode text
+    """
+    # Punctuation and line ends start their own segments; runs of spaces collapse to one
+    for char in _PUNCTUATION:
+        text = text.replace(char, '\t' + char)
+    text = _SPACES_PATTERN.sub(' ', text)
+    text = text.replace('\n', '\t\n')
+    # Conjuncts written with several Bijoy characters become one placeholder character
+    text = _PRE_MAP_PATTERN.sub(lambda match: bijoy_pre_map[match.group()], text)
+
+    text = _reorder(text.strip())
+    for bijoy, uni in _MULTI_CHAR_MAP:
+        text = text.replace(bijoy, uni)
+    return text.translate(_UNICODE_TABLE).strip()
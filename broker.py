@@ -0,0 +1,355 @@
+"""
+SQLite-backed broker of page tasks for distributed processing
+
+A job is published as page tasks (a few pages each) to a broker folder
+holding broker.sqlite3 and a copy of the input PDF under inputs/. Worker
+processes (worker.py), on this host or on any host that mounts the same
+folder, lease tasks, keep their lease alive with heartbeats while they
+work and store the text of each page. A task whose lease runs out (the
+worker died or lost the network) is handed to another worker, up to
+MAX_ATTEMPTS times; after that its pages are written as error pages.
+distributed.reduce_job assembles the pages in order into the output.
+
+Every worker host reads the broker folder, so nothing secret is stored in
+it: workers bring their own API key (worker.py --api-key).
+
+The folder must be on a filesystem with working file locks (a local disk,
+or a network filesystem that supports SQLite locking).
+"""
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+DATABASE_NAME = 'broker.sqlite3'
+INPUTS_FOLDER = 'inputs'
+# Seconds a lease lasts without a heartbeat; workers renew it every LEASE_SECONDS / 3
+LEASE_SECONDS = 60
+# Leases a task may get before its pages are given up on (crashes, lost leases and errors all count)
+MAX_ATTEMPTS = 3
+# Workers not seen for this long are dropped from the workers table
+WORKER_FORGET_SECONDS = 24 * 3600
+
+# Task statuses
+TASK_QUEUED = 'queued'
+TASK_LEASED = 'leased'
+TASK_DONE = 'done'
+TASK_FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    method TEXT NOT NULL,
+    pdf_path TEXT NOT NULL,
+    pages TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    pages TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_by_status ON tasks (status, id);
+CREATE INDEX IF NOT EXISTS tasks_by_job ON tasks (job_id);
+CREATE TABLE IF NOT EXISTS pages (
+    job_id TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    failed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (job_id, page_number)
+);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    methods TEXT,
+    alive_until REAL NOT NULL
+);
+"""
+
+
+def error_page_text(page_number, error):
+    """Text written for a page whose task was given up on"""
+    return f"--- ERROR: Page {page_number} could not be processed: {error} ---"
+
+
+class SQLiteBroker:
+    """
+    Page task queue kept in a SQLite database in a shared folder
+
+    Every call opens its own connection, so one broker object can be shared
+    by threads, and any number of processes can use the same folder.
+
+    Args:
+        folder: Broker folder (created if missing)
+        lease_seconds: Lease length given to workers (None = LEASE_SECONDS)
+        max_attempts: Leases per task before giving up (None = MAX_ATTEMPTS)
+    """
+
+    def __init__(self, folder, lease_seconds=None, max_attempts=None):
+        self.folder = folder
+        self.lease_seconds = lease_seconds or LEASE_SECONDS
+        self.max_attempts = max_attempts or MAX_ATTEMPTS
+        self.path = os.path.join(folder, DATABASE_NAME)
+        os.makedirs(os.path.join(folder, INPUTS_FOLDER), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit mode: writes that must be atomic open their own BEGIN IMMEDIATE transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def publish(self, method, pdf_path, page_numbers, pages_per_task=1, job_id=None):
+        """
+        Publish a job as page tasks
+
+        Args:
+            method: Processing method name (see methods.py)
+            pdf_path: Input PDF; a copy is kept in the broker folder for the workers
+            page_numbers: 1-based pages to process, in order
+            pages_per_task: Pages leased together (more pages = less overhead per page)
+            job_id: Job id (None = a new one)
+
+        Returns:
+            The job id
+        """
+        job_id = job_id or uuid.uuid4().hex
+        page_numbers = list(page_numbers)
+        pages_per_task = max(1, pages_per_task)
+        job_pdf = os.path.join(self.folder, INPUTS_FOLDER, f"{job_id}.pdf")
+        shutil.copyfile(pdf_path, job_pdf)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT INTO jobs (id, method, pdf_path, pages, created_at) VALUES (?, ?, ?, ?, ?)',
+                         (job_id, method, os.path.relpath(job_pdf, self.folder), json.dumps(page_numbers), now))
+            conn.executemany(
+                'INSERT INTO tasks (job_id, pages, status, updated_at) VALUES (?, ?, ?, ?)',
+                [(job_id, json.dumps(page_numbers[i:i + pages_per_task]), TASK_QUEUED, now)
+                 for i in range(0, len(page_numbers), pages_per_task)]
+            )
+            conn.execute('COMMIT')
+        tasks = -(-len(page_numbers) // pages_per_task)
+        logger.info(f"Published job {job_id}: {len(page_numbers)} pages in {tasks} tasks",
+                    extra={'job_id': job_id, 'method': method, 'pages': len(page_numbers), 'tasks': tasks})
+        metrics.inc('pdf_broker_tasks_total', tasks, result='published')
+        return job_id
+
+    def get_job(self, job_id):
+        """Job dict (id, method, pdf_path, pages), or None"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'id': row['id'],
+            'method': row['method'],
+            'pdf_path': os.path.join(self.folder, row['pdf_path']),
+            'pages': json.loads(row['pages']),
+        }
+
+    def _give_up(self, conn, task_id, job_id, pages, error):
+        # Pages of a task that will not be retried become error pages, so the job can still finish
+        conn.execute('UPDATE tasks SET status = ?, error = ?, worker = NULL, lease_expires = NULL, updated_at = ? '
+                     'WHERE id = ?', (TASK_FAILED, error, time.time(), task_id))
+        conn.executemany('INSERT OR REPLACE INTO pages (job_id, page_number, text, failed) VALUES (?, ?, ?, 1)',
+                         [(job_id, page_number, error_page_text(page_number, error)) for page_number in pages])
+        logger.error(f"Giving up on pages {pages} of job {job_id}: {error}", extra={'job_id': job_id, 'pages': pages})
+        metrics.inc('pdf_broker_tasks_total', result=TASK_FAILED)
+
+    def _seen(self, conn, worker, methods, now):
+        # Record that a worker is alive (see live_workers); it polls or heartbeats well within a lease
+        conn.execute('INSERT OR REPLACE INTO workers (id, methods, alive_until) VALUES (?, ?, ?)',
+                     (worker, None if methods is None else json.dumps(list(methods)), now + self.lease_seconds))
+
+    def lease(self, worker, methods=None):
+        """
+        Lease the oldest waiting task, or a task whose lease ran out
+
+        Every call also records the worker as alive for a lease period.
+
+        Args:
+            worker: Name of the worker taking the task
+            methods: Only lease tasks of these methods (None = any)
+
+        Returns:
+            Task dict (id, job_id, pages, attempts, lease_expires), or None if there is nothing to do
+        """
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            self._seen(conn, worker, methods, now)
+            conn.execute('DELETE FROM workers WHERE alive_until < ?', (now - WORKER_FORGET_SECONDS,))
+            expired = conn.execute('SELECT id, job_id, pages, attempts, worker FROM tasks '
+                                   'WHERE status = ? AND lease_expires < ?', (TASK_LEASED, now)).fetchall()
+            for row in expired:
+                logger.warning(f"Lease of task {row['id']} held by {row['worker']} expired",
+                               extra={'task': row['id'], 'worker': row['worker']})
+                metrics.inc('pdf_broker_tasks_total', result='expired')
+                if row['attempts'] >= self.max_attempts:
+                    self._give_up(conn, row['id'], row['job_id'], json.loads(row['pages']),
+                                  f"lease lost {row['attempts']} times")
+                else:
+                    conn.execute('UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, updated_at = ? '
+                                 'WHERE id = ?', (TASK_QUEUED, now, row['id']))
+            query = 'SELECT tasks.id, tasks.job_id, tasks.pages, tasks.attempts FROM tasks'
+            params = [TASK_QUEUED]
+            if methods is not None:
+                methods = list(methods)
+                query += f" JOIN jobs ON jobs.id = tasks.job_id AND jobs.method IN ({','.join('?' * len(methods))})"
+                params = methods + params
+            row = conn.execute(query + ' WHERE tasks.status = ? ORDER BY tasks.id LIMIT 1', params).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            lease_expires = now + self.lease_seconds
+            conn.execute('UPDATE tasks SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, '
+                         'updated_at = ? WHERE id = ?', (TASK_LEASED, worker, lease_expires, now, row['id']))
+            conn.execute('COMMIT')
+        metrics.inc('pdf_broker_tasks_total', result='leased')
+        return {
+            'id': row['id'],
+            'job_id': row['job_id'],
+            'pages': json.loads(row['pages']),
+            'attempts': row['attempts'] + 1,
+            'lease_expires': lease_expires,
+        }
+
+    def heartbeat(self, task_id, worker):
+        """
+        Extend the lease of a task
+
+        Returns:
+            False if the worker no longer holds the lease (it expired and was handed on)
+        """
+        now = time.time()
+        with self._connect() as conn:
+            cursor = conn.execute('UPDATE tasks SET lease_expires = ?, updated_at = ? '
+                                  'WHERE id = ? AND worker = ? AND status = ?',
+                                  (now + self.lease_seconds, now, task_id, worker, TASK_LEASED))
+            conn.execute('UPDATE workers SET alive_until = ? WHERE id = ?', (now + self.lease_seconds, worker))
+        return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, page_texts, failed_pages=()):
+        """
+        Store the page texts of a finished task
+
+        Args:
+            task_id: Leased task
+            worker: Worker holding the lease
+            page_texts: Dict of page number -> text
+            failed_pages: Pages the method could not process (their text is an error message)
+
+        Returns:
+            False if the lease was lost meanwhile; the texts are then dropped
+        """
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT job_id FROM tasks WHERE id = ? AND worker = ? AND status = ?',
+                               (task_id, worker, TASK_LEASED)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return False
+            failed_pages = set(failed_pages)
+            conn.executemany('INSERT OR REPLACE INTO pages (job_id, page_number, text, failed) VALUES (?, ?, ?, ?)',
+                             [(row['job_id'], page_number, text, int(page_number in failed_pages))
+                              for page_number, text in page_texts.items()])
+            conn.execute('UPDATE tasks SET status = ?, lease_expires = NULL, updated_at = ? WHERE id = ?',
+                         (TASK_DONE, time.time(), task_id))
+            conn.execute('COMMIT')
+        metrics.inc('pdf_broker_tasks_total', result=TASK_DONE)
+        return True
+
+    def fail(self, task_id, worker, error):
+        """Report a task that raised an error; it is queued again until it runs out of attempts"""
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT job_id, pages, attempts FROM tasks WHERE id = ? AND worker = ? AND status = ?',
+                               (task_id, worker, TASK_LEASED)).fetchone()
+            if row is not None:
+                if row['attempts'] >= self.max_attempts:
+                    self._give_up(conn, task_id, row['job_id'], json.loads(row['pages']), error)
+                else:
+                    conn.execute('UPDATE tasks SET status = ?, worker = NULL, lease_expires = NULL, error = ?, '
+                                 'updated_at = ? WHERE id = ?', (TASK_QUEUED, error, time.time(), task_id))
+                    metrics.inc('pdf_broker_tasks_total', result='retried')
+            conn.execute('COMMIT')
+
+    def get_pages(self, job_id, page_numbers):
+        """
+        Finished pages of a job
+
+        Returns:
+            Dict of page number -> (text, failed) for the pages of page_numbers that are finished
+        """
+        page_numbers = list(page_numbers)
+        pages = {}
+        with self._connect() as conn:
+            # Stay below SQLite's limit on query parameters
+            for i in range(0, len(page_numbers), 500):
+                chunk = page_numbers[i:i + 500]
+                rows = conn.execute(f"SELECT page_number, text, failed FROM pages WHERE job_id = ? "
+                                    f"AND page_number IN ({','.join('?' * len(chunk))})", [job_id] + chunk)
+                for row in rows:
+                    pages[row['page_number']] = (row['text'], bool(row['failed']))
+        return pages
+
+    def live_workers(self, method=None):
+        """
+        Workers that polled or sent a heartbeat within their lease period
+
+        Args:
+            method: Only workers that take tasks of this method (None = all)
+
+        Returns:
+            Sorted worker names
+        """
+        with self._connect() as conn:
+            rows = conn.execute('SELECT id, methods FROM workers WHERE alive_until >= ?', (time.time(),)).fetchall()
+        return sorted(row['id'] for row in rows
+                      if method is None or row['methods'] is None or method in json.loads(row['methods']))
+
+    def job_summary(self, job_id):
+        """Task counts per status, retries and the workers that finished tasks of a job"""
+        with self._connect() as conn:
+            rows = conn.execute('SELECT status, attempts, worker FROM tasks WHERE job_id = ?', (job_id,)).fetchall()
+        statuses = [row['status'] for row in rows]
+        return {
+            'tasks': len(rows),
+            'tasks_by_status': {status: statuses.count(status) for status in sorted(set(statuses))},
+            'retries': sum(max(0, row['attempts'] - 1) for row in rows),
+            'workers': sorted({row['worker'] for row in rows if row['worker'] and row['status'] == TASK_DONE}),
+        }
+
+    def delete_job(self, job_id):
+        """Remove a job, its tasks, pages and input copy (after it was assembled, or to cancel it)"""
+        job = self.get_job(job_id)
+        with self._connect() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for table, column in (('pages', 'job_id'), ('tasks', 'job_id'), ('jobs', 'id')):
+                conn.execute(f'DELETE FROM {table} WHERE {column} = ?', (job_id,))
+            conn.execute('COMMIT')
+        if job is not None and os.path.exists(job['pdf_path']):
+            os.remove(job['pdf_path'])
+
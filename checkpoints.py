@@ -0,0 +1,295 @@
+"""
+Page-level checkpoints for long OCR and GenAI jobs
+
+A checkpoint is a folder holding manifest.json (method, processing options,
+selected pages and the status of every finished page) and the text of each
+finished page under pages/. Pages are saved as soon as they are written to
+the output, so a job that dies part way through keeps the pages it
+finished. Their status is appended to pages.log, which is folded into the
+manifest when the next run starts, so a long job writes each page once
+instead of the whole manifest per page. Running it again with the same
+checkpoint only processes the pages that are missing or failed.
+
+Checkpoints are named after the result cache key, so identical jobs share
+one; a job holds it (Checkpoint.acquire) from its cache lookup until it is
+done, and an identical job started meanwhile waits for it.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# Page statuses in the manifest
+PAGE_DONE = 'done'
+PAGE_FAILED = 'failed'
+
+MANIFEST_NAME = 'manifest.json'
+# One JSON line per page saved since the manifest was written
+PAGES_LOG_NAME = 'pages.log'
+# Copy of the input PDF kept with a checkpoint whose job failed or has failed pages, for retries
+SOURCE_NAME = 'source.pdf'
+
+
+def _write_atomic(path, data):
+    # Readers (and a resumed job after a crash) never see a half-written file
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+# Checkpoint folders held by running jobs of this process: folder -> [lock, jobs holding or waiting for it]
+_folder_locks = {}
+_folder_locks_lock = threading.Lock()
+
+
+class Checkpoint:
+    """
+    Per-page results of one job, saved to a folder as each page completes
+
+    Args:
+        folder: Folder of this checkpoint (created when the job starts)
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.manifest = None
+
+    @property
+    def id(self):
+        return os.path.basename(os.path.normpath(self.folder))
+
+    @property
+    def source_path(self):
+        return os.path.join(self.folder, SOURCE_NAME)
+
+    def _page_path(self, page_number):
+        return os.path.join(self.folder, 'pages', f"{page_number:05d}.txt")
+
+    def acquire(self):
+        """Wait until no other job of this process holds the checkpoint, then hold it until release()"""
+        key = os.path.abspath(self.folder)
+        with _folder_locks_lock:
+            entry = _folder_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        entry[0].acquire()
+
+    def release(self):
+        """Let the next job waiting for the checkpoint have it"""
+        key = os.path.abspath(self.folder)
+        with _folder_locks_lock:
+            entry = _folder_locks[key]
+            entry[0].release()
+            entry[1] -= 1
+            if not entry[1]:
+                del _folder_locks[key]
+
+    def _save(self):
+        # The manifest now holds every page status of the log, which starts over
+        self.manifest['updated_at'] = time.time()
+        _write_atomic(os.path.join(self.folder, MANIFEST_NAME), json.dumps(self.manifest).encode('utf-8'))
+        try:
+            os.remove(os.path.join(self.folder, PAGES_LOG_NAME))
+        except FileNotFoundError:
+            pass
+
+    def load(self):
+        """
+        Read the manifest of an earlier run, with the pages it logged after the manifest was written
+
+        Returns:
+            Manifest dict, or None if there is no readable checkpoint
+        """
+        try:
+            with open(os.path.join(self.folder, MANIFEST_NAME), encoding='utf-8') as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+        try:
+            with open(os.path.join(self.folder, PAGES_LOG_NAME), encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # Partial line from a crash
+                    self.manifest['page_status'][str(entry['page'])] = entry['status']
+        except FileNotFoundError:
+            pass
+        return self.manifest
+
+    def start(self, method, options, page_numbers, **info):
+        """
+        Start a run, resuming the checkpoint if an earlier run left one
+
+        Pages saved by a run of another method or with other options are
+        discarded, since they would not match the output of this one.
+
+        Args:
+            method: Processing method name
+            options: Options that change the page texts (the method's get_cache_options())
+            page_numbers: Pages of this run, in order
+            **info: Extra fields stored in the manifest (e.g. the output format)
+
+        Returns:
+            The pages of page_numbers still to be processed (missing or failed), in order
+        """
+        # Compare the options the way they come back from the manifest
+        options = json.loads(json.dumps(options, default=str))
+        manifest = self.load()
+        if manifest is not None and (manifest.get('method') != method or manifest.get('options') != options):
+            logger.info(f"Checkpoint {self.id} was written with other options, starting over",
+                        extra={'checkpoint': self.id})
+            manifest = None
+        if manifest is None:
+            shutil.rmtree(os.path.join(self.folder, 'pages'), ignore_errors=True)
+            manifest = {'method': method, 'options': options, 'page_status': {}, 'created_at': time.time()}
+        manifest.update(info)
+        manifest['pages'] = list(page_numbers)
+        # Pages marked done whose text file is gone (e.g. removed by hand) are processed again
+        lost = [page_number for page_number in page_numbers
+                if manifest['page_status'].get(str(page_number)) == PAGE_DONE
+                and not os.path.exists(self._page_path(page_number))]
+        for page_number in lost:
+            del manifest['page_status'][str(page_number)]
+        if lost:
+            logger.warning(f"Checkpoint {self.id} is missing the text of pages {lost}, processing them again",
+                           extra={'checkpoint': self.id, 'pages': lost})
+        self.manifest = manifest
+        os.makedirs(os.path.join(self.folder, 'pages'), exist_ok=True)
+        self._save()
+
+        pending = self.pending_pages(page_numbers)
+        reused = len(manifest['pages']) - len(pending)
+        if reused:
+            logger.info(f"Resuming from checkpoint {self.id}: {reused} pages already done",
+                        extra={'checkpoint': self.id, 'pages': reused})
+            metrics.inc('pdf_checkpoint_pages_total', reused, result='reused')
+        return pending
+
+    def page_status(self, page_number):
+        """PAGE_DONE, PAGE_FAILED or None for a page not processed yet"""
+        return self.manifest['page_status'].get(str(page_number)) if self.manifest else None
+
+    def pending_pages(self, page_numbers):
+        """Pages of page_numbers that are missing or failed"""
+        return [page_number for page_number in page_numbers if self.page_status(page_number) != PAGE_DONE]
+
+    def failed_pages(self):
+        """Page numbers whose last attempt failed"""
+        if not self.manifest:
+            return []
+        return sorted(int(page) for page, status in self.manifest['page_status'].items() if status == PAGE_FAILED)
+
+    def get_page(self, page_number):
+        """Return the saved text of a finished page, or None"""
+        if self.page_status(page_number) != PAGE_DONE:
+            return None
+        try:
+            with open(self._page_path(page_number), encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_page(self, page_number, text, failed=False):
+        """Save the text of a page (failed pages are only recorded, and redone on resume)"""
+        if not failed:
+            _write_atomic(self._page_path(page_number), text.encode('utf-8'))
+        status = PAGE_FAILED if failed else PAGE_DONE
+        self.manifest['page_status'][str(page_number)] = status
+        # Logged after the text is in place, so a page logged as done always has its text
+        with open(os.path.join(self.folder, PAGES_LOG_NAME), 'a', encoding='utf-8') as log:
+            log.write(json.dumps({'page': page_number, 'status': status}) + '\n')
+        # FolderCleaner ages checkpoints by the folder's mtime, which appending does not change
+        os.utime(self.folder)
+        metrics.inc('pdf_checkpoint_pages_total', result=PAGE_FAILED if failed else 'saved')
+
+    def summary(self):
+        """Checkpoint state for the job metadata"""
+        statuses = list(self.manifest['page_status'].values()) if self.manifest else []
+        return {
+            'id': self.id,
+            'pages_done': statuses.count(PAGE_DONE),
+            'pages_failed': statuses.count(PAGE_FAILED),
+        }
+
+    def keep_source(self, pdf_path):
+        """Move the input PDF into the checkpoint so the job can be retried later"""
+        if os.path.abspath(pdf_path) == os.path.abspath(self.source_path) or not os.path.exists(pdf_path):
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        shutil.move(pdf_path, self.source_path)
+
+    def discard(self):
+        """Remove the checkpoint folder (after a run without failed pages)"""
+        shutil.rmtree(self.folder, ignore_errors=True)
+        self.manifest = None
+
+
+def iter_checkpointed_pages(page_numbers, checkpoint, results, is_failed):
+    """
+    Merge saved pages with newly processed ones, in page order, saving the new ones
+
+    Args:
+        page_numbers: Every page of the run, in order
+        checkpoint: Checkpoint the run was started with (see Checkpoint.start)
+        results: Iterable of (page_number, text) for the pending pages only, in page order
+        is_failed: Callable(page_number, text) returning True when text is an error placeholder
+
+    Yields:
+        Tuples of (page_number, text) for every page of page_numbers
+
+    Raises:
+        RuntimeError: If a saved page can no longer be read or results do not match the pending pages
+    """
+    results = iter(results)
+    for page_number in page_numbers:
+        # Pages of this run are saved in order, so a page already done here was done by an earlier run
+        if checkpoint.page_status(page_number) == PAGE_DONE:
+            text = checkpoint.get_page(page_number)
+            if text is None:
+                raise RuntimeError(f"Page {page_number} of checkpoint {checkpoint.id} could not be read")
+        else:
+            try:
+                result_page, text = next(results)
+            except StopIteration:
+                raise RuntimeError(f"No result for page {page_number} of checkpoint {checkpoint.id}") from None
+            if result_page != page_number:
+                raise RuntimeError(f"Got page {result_page} while page {page_number} of checkpoint "
+                                   f"{checkpoint.id} was expected")
+            checkpoint.put_page(page_number, text, failed=is_failed(page_number, text))
+        yield page_number, text
+
+
+def offset_progress(progress_callback, pages_before, pages_total):
+    """
+    Progress callback for the pending pages of a resumed run
+
+    Args:
+        progress_callback: Callable(pages_done, pages_total) of the whole run, or None
+        pages_before: Pages taken from the checkpoint
+        pages_total: Pages of the whole run
+
+    Returns:
+        Callable(pages_done, pages_pending) reporting pages_before + pages_done out of pages_total;
+        pages_before is reported right away
+    """
+    if progress_callback is None or not pages_before:
+        return progress_callback
+    progress_callback(pages_before, pages_total)
+
+    def report(pages_done, pages_pending=None):
+        progress_callback(pages_before + pages_done, pages_total)
+    return report
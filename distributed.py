@@ -0,0 +1,138 @@
+"""
+Distributed processing of one PDF by worker processes on any number of hosts
+
+publish_pdf splits a job into page tasks on a broker (broker.SQLiteBroker);
+worker.py processes run the method on the pages of each task they lease;
+reduce_job writes the finished pages in page order into the TXT/DOCX output
+as they arrive, with the same layout the method uses when run locally.
+Methods that need an API key use the key of the worker (worker.py --api-key);
+keys are never written to the broker.
+
+Example:
+    broker = SQLiteBroker('/mnt/shared/broker')
+    # on each worker host: python worker.py /mnt/shared/broker --methods ocr
+    process_distributed_pdf(broker, 'ocr', 'in.pdf', 'out.docx', 'docx')
+"""
+import time
+from methods import get_method
+from output_writers import open_output_writer
+from page_source import get_page_count, select_pages
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# Pages leased together; a few pages per task keep broker round trips small next to the work per task
+PAGES_PER_TASK = 2
+# Seconds between checks for newly finished pages while reducing
+POLL_INTERVAL = 0.5
+
+
+class NoWorkersError(RuntimeError):
+    """No live worker takes tasks of the job's method"""
+
+
+def publish_pdf(broker, method, pdf_path, page_numbers=None, pages_per_task=None):
+    """
+    Publish a PDF as page tasks of a processing method
+
+    Args:
+        broker: SQLiteBroker shared with the workers
+        method: Processing method name (see methods.py)
+        pdf_path: Input PDF (copied into the broker folder)
+        page_numbers: Pages to process, as a selection like '1-5,12,20-' or 1-based page numbers (None = all)
+        pages_per_task: Pages per task (None = PAGES_PER_TASK)
+
+    Returns:
+        The job id
+    """
+    method = get_method(method)
+    selected = select_pages(page_numbers, get_page_count(pdf_path, renderer='pymupdf'))
+    return broker.publish(method.name, pdf_path, selected, pages_per_task or PAGES_PER_TASK)
+
+
+def reduce_job(broker, job_id, output_path, output_format='txt', progress_callback=None, page_callback=None,
+               metadata=None, poll_interval=None, timeout=None):
+    """
+    Wait for the pages of a job and write them in page order, then remove the job from the broker
+
+    Pages are written as soon as every page before them is finished, so the
+    output grows (and page_callback streams pages) while workers are still busy.
+    The job fails as soon as no live worker takes tasks of its method, instead
+    of waiting for the timeout.
+
+    Args:
+        broker: SQLiteBroker the job was published to
+        job_id: Job id returned by publish_pdf
+        output_path: Path to save the output file
+        output_format: 'txt' or 'docx'
+        progress_callback: Optional callable(pages_done, pages_total) called after each page
+        page_callback: Optional callable(page_number, text) called as each page is written, in page order
+        metadata: Optional dict that receives 'pages', 'has_errors' and 'distributed' (task counts,
+                  retries and the workers that did the work)
+        poll_interval: Seconds between checks for finished pages (None = POLL_INTERVAL)
+        timeout: Seconds to wait for the job before giving up (None = no limit)
+
+    Returns:
+        Path to the output file
+
+    Raises:
+        TimeoutError: If the pages are not finished within timeout
+        NoWorkersError: If no worker polled the broker for tasks of the method within a lease period
+    """
+    job = broker.get_job(job_id)
+    if job is None:
+        raise ValueError(f"Unknown distributed job: {job_id}")
+    poll_interval = poll_interval or POLL_INTERVAL
+    page_numbers = job['pages']
+    deadline = None if timeout is None else time.monotonic() + timeout
+    has_errors = False
+    written = 0
+    try:
+        # The method's own page layout, so the output matches a local run
+        with open_output_writer(output_path, output_format, page_callback=page_callback,
+                                **get_method(job['method']).output_layout()) as writer:
+            while written < len(page_numbers):
+                pages = broker.get_pages(job_id, page_numbers[written:])
+                # Write the run of finished pages that follows the last page written
+                while written < len(page_numbers) and page_numbers[written] in pages:
+                    page_number = page_numbers[written]
+                    text, failed = pages[page_number]
+                    has_errors = has_errors or failed
+                    writer.write_page(page_number, text)
+                    written += 1
+                    if progress_callback:
+                        progress_callback(written, len(page_numbers))
+                if written < len(page_numbers):
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise TimeoutError(f"Distributed job {job_id} not finished after {timeout}s "
+                                           f"({written}/{len(page_numbers)} pages)")
+                    if not broker.live_workers(job['method']):
+                        raise NoWorkersError(f"No worker is running for the {job['method']} method "
+                                             f"({written}/{len(page_numbers)} pages done); start worker.py")
+                    time.sleep(poll_interval)
+        summary = broker.job_summary(job_id)
+        logger.info(f"Assembled job {job_id}: {written} pages from {len(summary['workers'])} workers",
+                    extra={'job_id': job_id, 'pages': written, 'retries': summary['retries']})
+        if metadata is not None:
+            metadata['pages'] = written
+            metadata['has_errors'] = has_errors
+            metadata['distributed'] = summary
+    finally:
+        broker.delete_job(job_id)
+    return output_path
+
+
+def process_distributed_pdf(broker, method, pdf_path, output_path, output_format='txt', progress_callback=None,
+                            metadata=None, page_callback=None, page_numbers=None, pages_per_task=None,
+                            timeout=None):
+    """
+    Process a PDF on the broker's workers: publish it as page tasks and assemble the output
+
+    Takes the arguments of the process_*_pdf functions; see publish_pdf and reduce_job.
+
+    Returns:
+        Path to the output file
+    """
+    job_id = publish_pdf(broker, method, pdf_path, page_numbers, pages_per_task)
+    return reduce_job(broker, job_id, output_path, output_format, progress_callback=progress_callback,
+                      page_callback=page_callback, metadata=metadata, timeout=timeout)
@@ -0,0 +1,232 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+
+# Job states
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class JobQueueFull(Exception):
+    """Raised when a method's queue already holds the maximum number of pending jobs"""
+
+
+class Job:
+    """
+    A single PDF processing job and its progress
+
+    Args:
+        method: Processing method name ('no_ocr', 'ocr', 'genai')
+        output_filename: Name of the file the job writes in the upload folder
+        files: Names of other upload folder entries the job uses (its input)
+    """
+
+    def __init__(self, method, output_filename=None, files=()):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.output_filename = output_filename
+        self.files = tuple(files)
+        self.status = JOB_QUEUED
+        self.pages_done = 0
+        self.pages_total = None
+        self.error = None
+        # Filled in by the processing function (page count, language, per-page routing, ...)
+        self.metadata = {}
+        # (page_number, text) of the pages written so far, in page order
+        self.pages = []
+        # (func, args, kwargs) the job runs, so it can be queued again by JobManager.retry
+        self.call = None
+        # Id of the job this one retries
+        self.retry_of = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = threading.Condition()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def update_progress(self, pages_done, pages_total=None):
+        """Progress callback handed to the process_*_pdf functions"""
+        self.pages_done = pages_done
+        if pages_total is not None:
+            self.pages_total = pages_total
+        self._notify()
+
+    def add_page(self, page_number, text):
+        """Page callback handed to the process_*_pdf functions"""
+        self.pages.append((page_number, text))
+        self._notify()
+
+    def set_status(self, status):
+        self.status = status
+        self._notify()
+
+    def state(self):
+        """Status and progress, to tell whether anything changed since an earlier call"""
+        return self.status, self.pages_done, self.pages_total
+
+    def wait_for_update(self, pages_seen, state, timeout=None):
+        """
+        Block until pages beyond the first pages_seen are written or state() differs from state
+
+        Returns:
+            True if something changed, False if the timeout ran out first
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.pages) > pages_seen or self.state() != state, timeout)
+
+    @property
+    def finished(self):
+        return self.status in (JOB_DONE, JOB_FAILED)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'method': self.method,
+            'status': self.status,
+            'pages_done': self.pages_done,
+            'pages_total': self.pages_total,
+            'output_filename': self.output_filename if self.status == JOB_DONE else None,
+            'error': self.error,
+            'metadata': self.metadata,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'retry_of': self.retry_of,
+        }
+
+
+class JobManager:
+    """
+    Runs processing jobs on bounded per-method thread pools
+
+    Heavy methods (OCR, GenAI) get small pools so that a burst of uploads
+    queues up instead of running every job at once, while each pool's
+    queue is capped so the server can refuse work it cannot get to.
+
+    Args:
+        pool_sizes: Dict of method name -> number of concurrent jobs
+        default_pool_size: Pool size for methods missing from pool_sizes
+        max_queued: Maximum pending (queued or running) jobs per method
+        retention_seconds: How long finished jobs are kept for status polling
+    """
+
+    def __init__(self, pool_sizes=None, default_pool_size=1, max_queued=100, retention_seconds=3600):
+        self.pool_sizes = dict(pool_sizes or {})
+        self.default_pool_size = default_pool_size
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._executors = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self, method):
+        executor = self._executors.get(method)
+        if executor is None:
+            size = self.pool_sizes.get(method, self.default_pool_size)
+            executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix=f"job-{method}")
+            self._executors[method] = executor
+        return executor
+
+    def _prune_finished(self):
+        cutoff = time.time() - self.retention_seconds
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _pending_count(self, method):
+        return sum(1 for job in self._jobs.values()
+                   if job.method == method and not job.finished)
+
+    def submit(self, method, func, *args, output_filename=None, files=(), **kwargs):
+        """
+        Queue func(*args, progress_callback=..., page_callback=..., metadata=..., **kwargs) on the method's pool
+
+        Returns:
+            The queued Job
+
+        Raises:
+            JobQueueFull: If the method already has max_queued pending jobs
+        """
+        job = Job(method, output_filename, files)
+        job.call = (func, args, kwargs)
+        with self._lock:
+            self._prune_finished()
+            if self._pending_count(method) >= self.max_queued:
+                raise JobQueueFull(f"Too many pending '{method}' jobs, please try again later")
+            self._jobs[job.id] = job
+            executor = self._get_executor(method)
+        executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        job.started_at = time.time()
+        job.set_status(JOB_RUNNING)
+        try:
+            func(*args, progress_callback=job.update_progress, page_callback=job.add_page, metadata=job.metadata,
+                 **kwargs)
+            status = JOB_DONE
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}", extra={'job_id': job.id, 'method': job.method})
+            job.error = str(e)
+            status = JOB_FAILED
+        # Set the finish time before the status so pruning never sees a finished job without one
+        job.finished_at = time.time()
+        job.set_status(status)
+        
+        seconds = job.finished_at - job.started_at
+        metrics.inc('pdf_jobs_total', method=job.method, status=status)
+        metrics.observe('pdf_job_seconds', seconds, method=job.method)
+        if job.pages_total:
+            metrics.inc('pdf_job_pages_total', job.pages_total, method=job.method)
+        logger.info(f"Job {job.id} {status}", extra={
+            'job_id': job.id, 'method': job.method, 'status': status, 'seconds': round(seconds, 3),
+            'queued_seconds': round(job.started_at - job.created_at, 3), 'pages': job.pages_total,
+        })
+
+    def retry(self, job_id):
+        """
+        Queue a finished job again with the same arguments
+
+        The new job writes the same output file. Processing functions that
+        checkpoint their pages only redo the pages the first run did not finish.
+
+        Returns:
+            The queued Job, or None if there is no finished job with that id
+
+        Raises:
+            JobQueueFull: If the method already has max_queued pending jobs
+        """
+        job = self.get(job_id)
+        if job is None or not job.finished:
+            return None
+        func, args, kwargs = job.call
+        retry = self.submit(job.method, func, *args, output_filename=job.output_filename, files=job.files, **kwargs)
+        retry.retry_of = job.id
+        retry.pages_total = job.pages_total
+        return retry
+
+    def get(self, job_id):
+        """Return the Job with the given id, or None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def files_in_use(self):
+        """Names of the upload folder entries used by queued and running jobs"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if not job.finished]
+        return {name for job in jobs for name in job.files + (job.output_filename,) if name}
+
+    def shutdown(self, wait=True):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
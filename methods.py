@@ -0,0 +1,181 @@
+"""
+Registry of the processing methods
+
+Every method is declared here with the module and function implementing it,
+the optional arguments it accepts and the packages it needs. Its module is
+imported the first time the method is used, so a process that only runs
+No-OCR never loads tesseract, Gemini or pdf2image. Adding a method is one
+register() call; the web app and batch.py pick it up from here.
+
+Example:
+    method = get_method('ocr')
+    method.run('in.pdf', 'out.txt', 'txt', workers=2, api_key=None)  # api_key is dropped, OCR takes none
+"""
+import importlib
+import importlib.util
+import threading
+import time
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# Optional arguments a method may accept, besides the ones every method takes
+# (progress_callback, metadata, page_callback, page_numbers)
+OPTIONAL_ARGUMENTS = ('api_key', 'workers', 'result_cache', 'pdf_hash', 'checkpoint', 'page_store')
+
+
+class ProcessingMethod:
+    """
+    A processing method, imported on first use
+
+    Args:
+        name: Method key used by the upload form, job pools, cache keys and batch.py
+        module: Module implementing the method
+        function: Its process_*_pdf(pdf_path, output_path, output_format, ...) function
+        label: Name shown to users
+        options: Arguments of OPTIONAL_ARGUMENTS the function accepts; run() drops the others
+        dependencies: Third-party modules the method imports, checked by missing_dependencies()
+                      without importing them
+    """
+
+    def __init__(self, name, module, function, label, options=(), dependencies=()):
+        unknown = set(options) - set(OPTIONAL_ARGUMENTS)
+        if unknown:
+            raise ValueError(f"Unknown options for method {name}: {sorted(unknown)}")
+        self.name = name
+        self.module_name = module
+        self.function_name = function
+        self.label = label
+        self.options = tuple(options)
+        self.dependencies = tuple(dependencies)
+        self._module = None
+        self._lock = threading.Lock()
+
+    @property
+    def requires_api_key(self):
+        return 'api_key' in self.options
+
+    @property
+    def uses_checkpoints(self):
+        return 'checkpoint' in self.options
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def module(self):
+        """Import the method's module (once) and return it"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.perf_counter()
+                    module = importlib.import_module(self.module_name)
+                    seconds = time.perf_counter() - start
+                    metrics.record_stage('import_method', seconds)
+                    logger.info(f"Loaded processing method {self.name} in {seconds:.2f}s",
+                                extra={'method': self.name, 'seconds': round(seconds, 3)})
+                    self._module = module
+        return self._module
+
+    def processor(self):
+        """The method's process_*_pdf function"""
+        return getattr(self.module(), self.function_name)
+
+    def cache_options(self):
+        """Options that change the method's output, used in result cache keys"""
+        return self.module().get_cache_options()
+
+    def output_layout(self):
+        """Keyword arguments of output_writers.open_output_writer the method writes its pages with"""
+        return dict(getattr(self.module(), 'OUTPUT_LAYOUT', {}))
+
+    def missing_dependencies(self):
+        """Dependencies that are not installed, found without importing anything"""
+        missing = []
+        for name in self.dependencies:
+            try:
+                found = importlib.util.find_spec(name) is not None
+            except (ImportError, ValueError):
+                found = False
+            if not found:
+                missing.append(name)
+        return missing
+
+    def run(self, pdf_path, output_path, output_format='txt', **kwargs):
+        """
+        Run the method, passing on only the optional arguments it accepts
+
+        Arguments of OPTIONAL_ARGUMENTS the method does not declare are dropped,
+        so callers can pass e.g. api_key or checkpoint to any method.
+
+        Returns:
+            Path to the output file
+        """
+        for name in OPTIONAL_ARGUMENTS:
+            if name in kwargs and (name not in self.options or kwargs[name] is None):
+                del kwargs[name]
+        return self.processor()(pdf_path, output_path, output_format, **kwargs)
+
+
+_methods = {}
+
+
+def register(method):
+    """Add a method to the registry (replacing one of the same name)"""
+    _methods[method.name] = method
+    return method
+
+
+def get_method(name):
+    """
+    Registered method by name
+
+    Raises:
+        ValueError: for an unknown method
+    """
+    try:
+        return _methods[name]
+    except KeyError:
+        raise ValueError(f"Unknown processing method: {name}")
+
+
+def method_names():
+    """Names of the registered methods, in registration order"""
+    return list(_methods)
+
+
+def preload(names=None):
+    """
+    Import the modules of some methods up front, e.g. in a worker process that only serves them
+
+    Args:
+        names: Method names (None = every registered method)
+    """
+    for name in names if names is not None else method_names():
+        get_method(name).module()
+
+
+register(ProcessingMethod(
+    'no_ocr', 'No_OCR_unified', 'process_no_ocr_pdf', 'No OCR',
+    dependencies=('fitz', 'PyPDF2', 'unicodeconverter'),
+))
+register(ProcessingMethod(
+    'ocr', 'OCR_unified', 'process_ocr_pdf', 'OCR Based',
+    options=('workers', 'checkpoint', 'page_store'),
+    dependencies=('fitz', 'pytesseract', 'pdf2image', 'PIL'),
+))
+register(ProcessingMethod(
+    'genai', 'GenAI_unified', 'process_genai_pdf', 'GenAI Based',
+    options=('api_key', 'result_cache', 'pdf_hash', 'checkpoint', 'page_store'),
+    dependencies=('fitz', 'google.generativeai', 'pdf2image', 'PIL'),
+))
+register(ProcessingMethod(
+    'auto', 'Auto_unified', 'process_auto_pdf', 'Auto (Hybrid)',
+    options=('workers',),
+    dependencies=('fitz', 'PyPDF2', 'unicodeconverter', 'pytesseract', 'pdf2image', 'PIL'),
+))
+register(ProcessingMethod(
+    'ocr+genai', 'OCR_GenAI_unified', 'process_ocr_genai_pdf', 'OCR + GenAI',
+    options=('api_key', 'workers'),
+    dependencies=('fitz', 'pytesseract', 'google.generativeai', 'pdf2image', 'PIL'),
+))
@@ -0,0 +1,236 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+
+# Set PDF_METRICS=0 to turn off metric collection; stage() then costs one flag check
+METRICS_ENABLED = os.environ.get('PDF_METRICS', '1') != '0'
+# Log level for the JSON logs (PDF_LOG_LEVEL=DEBUG also logs every page)
+LOG_LEVEL = os.environ.get('PDF_LOG_LEVEL', 'INFO')
+
+# Histogram bucket upper bounds, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Help text for the exported metrics
+METRIC_HELP = {
+    'pdf_stage_seconds': 'Duration of a processing stage (per page or per call)',
+    'pdf_stage_errors_total': 'Processing stages that raised an error',
+    'pdf_pages_total': 'Pages handled by a processing stage',
+    'pdf_jobs_total': 'Finished jobs by method and status',
+    'pdf_job_seconds': 'Job duration from start to finish',
+    'pdf_job_pages_total': 'Pages in finished jobs',
+    'pdf_upload_bytes_total': 'Bytes of uploaded PDFs',
+    'pdf_output_bytes_total': 'Bytes of text written to output files',
+    'pdf_cache_requests_total': 'Result cache lookups by kind and result',
+    'pdf_genai_retries_total': 'Gemini requests retried after a retryable error',
+    'pdf_genai_upload_bytes_total': 'Bytes of page images sent to Gemini',
+    'pdf_genai_batch_requests_total': 'Gemini requests carrying several pages',
+    'pdf_genai_batch_fallbacks_total': 'Batched Gemini requests retried one page per request',
+    'pdf_script_detections_total': 'Pages whose script was detected, by language and method',
+    'pdf_ocr_pages_resubmitted_total': 'OCR pages sent to a fresh process pool after a worker process died',
+    'pdf_batch_files_total': 'Files finished by batch runs, by method and status',
+    'pdf_pages_skipped_total': 'Blank and duplicate pages skipped by OCR and GenAI, by method and reason',
+    'pdf_checkpoint_pages_total': 'Job checkpoint pages saved, failed or reused from an earlier run',
+    'pdf_routed_pages_total': 'Pages of the ocr+genai method kept from OCR or extracted with Gemini, by reason',
+    'pdf_broker_tasks_total': 'Distributed page tasks published, leased, expired, retried, done or failed',
+}
+
+_STANDARD_LOG_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class MetricsRegistry:
+    """
+    Thread-safe counters and histograms, exported in Prometheus text format
+
+    Metrics are identified by name plus a set of label values, e.g.
+    inc('pdf_jobs_total', method='ocr', status='done').
+    """
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        """Add value to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one observation (e.g. a duration in seconds) in a histogram"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                # Per-bucket counts, then count and sum
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0, 0.0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += value
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    @staticmethod
+    def _format_labels(labels, extra=()):
+        labels = tuple(labels) + tuple(extra)
+        if not labels:
+            return ''
+        parts = []
+        for key, value in labels:
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{value}"')
+        return '{' + ','.join(parts) + '}'
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, ([*h[0]], h[1], h[2])) for key, h in self._histograms.items())
+
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, 'counter')
+            lines.append(f"{name}{self._format_labels(labels)} {value}")
+        for (name, labels), (bucket_counts, count, total) in histograms:
+            header(name, 'histogram')
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{self._format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{name}_bucket{self._format_labels(labels, [('le', '+Inf')])} {count}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {total}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def inc(name, value=1, **labels):
+    """Add value to a counter in the global registry (no-op when metrics are disabled)"""
+    if METRICS_ENABLED:
+        registry.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """Record a histogram observation in the global registry (no-op when metrics are disabled)"""
+    if METRICS_ENABLED:
+        registry.observe(name, value, **labels)
+
+
+class _NullStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _TimedStage:
+    __slots__ = ('name', 'pages', 'start')
+
+    def __init__(self, name, pages):
+        self.name = name
+        self.pages = pages
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record_stage(self.name, time.perf_counter() - self.start, self.pages, exc_type is not None)
+        return False
+
+
+def stage(name, pages=0):
+    """
+    Time a block of work as one processing stage
+
+    Example:
+        with metrics.stage('rasterize', pages=4):
+            images = convert_from_path(...)
+
+    Args:
+        name: Stage name ('rasterize', 'tesseract', 'gemini', 'bijoy', 'write', ...)
+        pages: Number of pages the block handles, added to pdf_pages_total
+
+    Returns:
+        Context manager; errors raised inside it are counted per stage
+    """
+    if not METRICS_ENABLED:
+        return _NULL_STAGE
+    return _TimedStage(name, pages)
+
+
+def record_stage(name, seconds, pages=0, error=False):
+    """Record a stage that was timed elsewhere, e.g. in an OCR worker process"""
+    if not METRICS_ENABLED:
+        return
+    registry.observe('pdf_stage_seconds', seconds, stage=name)
+    if pages:
+        registry.inc('pdf_pages_total', pages, stage=name)
+    if error:
+        registry.inc('pdf_stage_errors_total', stage=name)
+
+
+def render_prometheus():
+    return registry.render_prometheus()
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats log records as one JSON object per line, including any extra= fields"""
+
+    def format(self, record):
+        entry = {
+            'time': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_LOG_FIELDS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_root_logger = logging.getLogger('pdf_processor')
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(JsonFormatter())
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(LOG_LEVEL)
+    _root_logger.propagate = False
+
+
+def get_logger(name):
+    """
+    Logger writing structured JSON lines to stderr
+
+    Pass fields with extra=, e.g. logger.info("Page done", extra={'page': 3, 'seconds': 1.2})
+
+    Args:
+        name: Module name, usually __name__
+    """
+    return _root_logger.getChild(name)
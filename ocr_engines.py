@@ -0,0 +1,212 @@
+import queue
+import shlex
+import threading
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+
+def parse_tesseract_config(config):
+    """
+    Split a tesseract command-line config into its parts
+
+    Example:
+        parse_tesseract_config('--oem 3 --psm 6 -c preserve_interword_spaces=1')
+        -> (3, 6, {'preserve_interword_spaces': '1'})
+
+    Returns:
+        Tuple of (oem or None, psm or None, dict of -c variables)
+    """
+    oem = psm = None
+    variables = {}
+    args = shlex.split(config or '')
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == '--oem' and value is not None:
+            oem = int(value)
+            i += 1
+        elif arg == '--psm' and value is not None:
+            psm = int(value)
+            i += 1
+        elif arg == '-c' and value is not None and '=' in value:
+            key, _, variable = value.partition('=')
+            variables[key] = variable
+            i += 1
+        i += 1
+    return oem, psm, variables
+
+
+def text_from_data(data):
+    """
+    Rebuild page text from tesseract's word table (image_to_data output)
+
+    Words are joined with spaces, lines with newlines and paragraphs with an
+    empty line, the way tesseract's own text output lays them out.
+
+    Returns:
+        Tuple of (text, list of word confidences from 0 to 100)
+    """
+    lines = []
+    confidences = []
+    last_line = last_paragraph = None
+    for i, word in enumerate(data['text']):
+        conf = float(data['conf'][i])
+        if conf < 0 or not str(word).strip():
+            continue
+        paragraph = (data['page_num'][i], data['block_num'][i], data['par_num'][i])
+        line = paragraph + (data['line_num'][i],)
+        if line != last_line:
+            if last_paragraph is not None and paragraph != last_paragraph:
+                lines.append('')
+            lines.append(str(word))
+            last_line, last_paragraph = line, paragraph
+        else:
+            lines[-1] += ' ' + str(word)
+        confidences.append(conf)
+    return '\n'.join(lines) + ('\n' if lines else ''), confidences
+
+
+class PytesseractEngine:
+    """
+    Runs the tesseract binary through pytesseract
+
+    Every call starts a tesseract process, writes the image to a temporary
+    file and loads the language models again. Works everywhere tesseract is
+    installed.
+    """
+
+    name = 'pytesseract'
+
+    def image_to_string(self, image, lang, config=''):
+        return pytesseract.image_to_string(image, config=f'{config} -l {lang}'.strip())
+
+    def image_to_string_with_confidences(self, image, lang, config=''):
+        data = pytesseract.image_to_data(image, config=f'{config} -l {lang}'.strip(),
+                                         output_type=pytesseract.Output.DICT)
+        return text_from_data(data)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """
+    Keeps tesseract loaded in-process through the tesserocr bindings
+
+    One tesseract instance is created per language/config combination and
+    reused for every later page, so the traineddata is loaded once per
+    process instead of once per page, and images are handed over in memory.
+    Instances are pooled, so concurrent threads each get their own.
+
+    Args:
+        tessdata_path: Folder with the traineddata files (None = tesseract's default)
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self, tessdata_path=None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        self.tessdata_path = tessdata_path
+        self._pools = {}
+        self._all = []
+        self._lock = threading.Lock()
+
+    def _create(self, lang, config):
+        oem, psm, variables = parse_tesseract_config(config)
+        kwargs = {'lang': lang}
+        if self.tessdata_path:
+            kwargs['path'] = self.tessdata_path
+        if oem is not None:
+            kwargs['oem'] = oem
+        if psm is not None:
+            kwargs['psm'] = psm
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for key, value in variables.items():
+            api.SetVariable(key, value)
+        with self._lock:
+            self._all.append(api)
+        return api
+
+    def _pool(self, lang, config):
+        key = (lang, config)
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = queue.SimpleQueue()
+        return pool
+
+    def _recognize(self, image, lang, config, with_confidences):
+        pool = self._pool(lang, config)
+        try:
+            api = pool.get_nowait()
+        except queue.Empty:
+            api = self._create(lang, config)
+        try:
+            api.SetImage(image)
+            text = api.GetUTF8Text()
+            if not with_confidences:
+                return text
+            # Confidences of the words recognised by GetUTF8Text, no second pass
+            return text, [float(conf) for conf in api.AllWordConfidences()]
+        finally:
+            api.Clear()
+            pool.put(api)
+
+    def image_to_string(self, image, lang, config=''):
+        return self._recognize(image, lang, config, False)
+
+    def image_to_string_with_confidences(self, image, lang, config=''):
+        return self._recognize(image, lang, config, True)
+
+    def close(self):
+        with self._lock:
+            for api in self._all:
+                api.End()
+            self._all = []
+            self._pools = {}
+
+
+ENGINES = {
+    'pytesseract': PytesseractEngine,
+    'tesserocr': TesserocrEngine,
+}
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def resolve_engine_name(name='auto'):
+    """Engine name 'auto' stands for in this process: 'tesserocr' when installed, else 'pytesseract'"""
+    if name == 'auto':
+        return 'tesserocr' if tesserocr is not None else 'pytesseract'
+    return name
+
+
+def get_engine(name='auto'):
+    """
+    Shared OCR engine instance for this process
+
+    Args:
+        name: 'tesserocr', 'pytesseract', or 'auto' (tesserocr when installed, else pytesseract)
+
+    Returns:
+        Engine with image_to_string(image, lang, config) and
+        image_to_string_with_confidences(image, lang, config), which returns
+        (text, list of word confidences from 0 to 100)
+    """
+    name = resolve_engine_name(name)
+    with _engines_lock:
+        engine = _engines.get(name)
+        if engine is None:
+            try:
+                engine_class = ENGINES[name]
+            except KeyError:
+                raise ValueError(f"Unknown OCR engine: {name}")
+            engine = _engines[name] = engine_class()
+        return engine
@@ -0,0 +1,205 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+import metrics
+
+# Characters that are not allowed in XML 1.0 (DOCX) documents
+INVALID_XML_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+_PACKAGE_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCUMENT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults>'
+    '<w:rPrDefault><w:rPr><w:rFonts w:ascii="Calibri" w:hAnsi="Calibri" w:eastAsia="Calibri"/>'
+    '<w:sz w:val="22"/><w:szCs w:val="22"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:spacing w:after="200" w:line="276" w:lineRule="auto"/></w:pPr></w:pPrDefault>'
+    '</w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '</w:styles>'
+)
+
+_DOCUMENT_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+)
+
+_DOCUMENT_END = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440" '
+    'w:header="720" w:footer="720" w:gutter="0"/></w:sectPr>'
+    '</w:body></w:document>'
+)
+
+_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+class TxtWriter:
+    """
+    Writes a UTF-8 text file page by page, flushing after each page
+
+    Args:
+        output_path: Path of the text file
+        page_header: Written before each page; '{page}' is replaced with the page number
+        page_separator: Written between pages
+        page_callback: Optional callable(page_number, text) called after each page is written
+    """
+
+    def __init__(self, output_path, page_header='', page_separator='', page_callback=None):
+        self.output_path = output_path
+        self.page_header = page_header
+        self.page_separator = page_separator
+        self.page_callback = page_callback
+        self.pages_written = 0
+        self._file = open(output_path, 'w', encoding='utf-8')
+
+    def write_page(self, page_number, text):
+        with metrics.stage('write_txt', pages=1):
+            if self.pages_written and self.page_separator:
+                self._file.write(self.page_separator)
+            if self.page_header:
+                self._file.write(self.page_header.format(page=page_number))
+            self._file.write(text)
+            # Make the page visible to readers of the partial file right away
+            self._file.flush()
+        metrics.inc('pdf_output_bytes_total', len(text.encode('utf-8')), format='txt')
+        self.pages_written += 1
+        if self.page_callback:
+            self.page_callback(page_number, text)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class DocxWriter:
+    """
+    Writes a Word document page by page without keeping it in memory
+
+    The document XML is streamed straight into the .docx zip archive, so
+    memory use does not grow with the number of pages.
+
+    Args:
+        output_path: Path of the .docx file
+        layout: 'lines' adds one paragraph per non-empty line;
+                'page' adds each page as one paragraph followed by a page break
+        page_callback: Optional callable(page_number, text) called after each page is written
+    """
+
+    def __init__(self, output_path, layout='lines', page_callback=None):
+        self.output_path = output_path
+        self.layout = layout
+        self.page_callback = page_callback
+        self.pages_written = 0
+        self._zip = zipfile.ZipFile(output_path, 'w', compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr('[Content_Types].xml', _CONTENT_TYPES_XML)
+        self._zip.writestr('_rels/.rels', _PACKAGE_RELS_XML)
+        self._zip.writestr('word/_rels/document.xml.rels', _DOCUMENT_RELS_XML)
+        self._zip.writestr('word/styles.xml', _STYLES_XML)
+        self._document = self._zip.open('word/document.xml', 'w', force_zip64=True)
+        self._write(_DOCUMENT_START)
+
+    def _write(self, xml):
+        self._document.write(xml.encode('utf-8'))
+
+    @staticmethod
+    def _paragraph(text):
+        """Paragraph XML for text; newlines become line breaks and tabs become tab stops"""
+        text = INVALID_XML_CHARS.sub('', text)
+        runs = []
+        for i, line in enumerate(text.split('\n')):
+            if i:
+                runs.append('<w:br/>')
+            for j, part in enumerate(line.split('\t')):
+                if j:
+                    runs.append('<w:tab/>')
+                if part:
+                    runs.append(f'<w:t xml:space="preserve">{escape(part)}</w:t>')
+        return f'<w:p><w:r>{"".join(runs)}</w:r></w:p>'
+
+    def write_page(self, page_number, text):
+        with metrics.stage('write_docx', pages=1):
+            if self.layout == 'page':
+                self._write(self._paragraph(text))
+                self._write(_PAGE_BREAK)
+            else:
+                for line in text.splitlines():
+                    if line.strip():  # Only add non-empty lines
+                        self._write(self._paragraph(line))
+        metrics.inc('pdf_output_bytes_total', len(text.encode('utf-8')), format='docx')
+        self.pages_written += 1
+        if self.page_callback:
+            self.page_callback(page_number, text)
+
+    def close(self):
+        if self._zip is None:
+            return
+        self._write(_DOCUMENT_END)
+        self._document.close()
+        self._zip.close()
+        self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_output_writer(output_path, output_format, page_header='', page_separator='', docx_layout='lines',
+                       page_callback=None):
+    """
+    Open a streaming writer for the requested output format
+
+    Args:
+        output_path: Path to save the output file
+        output_format: 'txt' or 'docx'
+        page_header: TXT only - written before each page ('{page}' = page number)
+        page_separator: TXT only - written between pages
+        docx_layout: DOCX only - 'lines' or 'page' (see DocxWriter)
+        page_callback: Optional callable(page_number, text) called after each page is written,
+                       e.g. to stream pages to a client while the job runs
+
+    Returns:
+        A writer with write_page(page_number, text) and close(), usable as a context manager
+    """
+    if output_format == 'txt':
+        return TxtWriter(output_path, page_header, page_separator, page_callback)
+    elif output_format == 'docx':
+        return DocxWriter(output_path, docx_layout, page_callback)
+    raise ValueError(f"Unsupported output format: {output_format}")
@@ -0,0 +1,254 @@
+"""
+Blank and duplicate page detection
+
+Before a page is OCR'd or sent to Gemini, a thumbnail of it is checked.
+Pages with almost no ink are skipped. Earlier pages of the same document
+whose difference hash (dHash) is within DUPLICATE_MAX_DISTANCE bits and
+whose thumbnail ink matches are duplicate candidates. At thumbnail size,
+pages differing in one character can look the same, so a candidate is only
+taken for a duplicate when the full-resolution pixels of both pages are
+identical (same SHA-256). A duplicate gets the text of the earlier page.
+With a page store (a ResultCache), pages whose full-resolution pixels match
+a page of an earlier document reuse its text too.
+"""
+import hashlib
+import json
+import time
+from collections import deque
+from PIL import Image
+from preprocessing import CROP_INK_THRESHOLD, to_grayscale
+from result_cache import make_cache_key
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# Width of the thumbnail the checks run on
+THUMBNAIL_WIDTH = 256
+# Pages with a smaller share of ink pixels on the thumbnail are blank. A page number alone
+# is about 0.00005; a single word like 'Annex' at 10pt is about 0.0003
+BLANK_INK_RATIO = 0.0001
+# Side of the dHash grid; the hash has HASH_SIZE * HASH_SIZE bits
+HASH_SIZE = 16
+# Pages whose hashes differ in at most this many bits (and whose thumbnail ink is the same)
+# are duplicate candidates, confirmed on the full-resolution pixels
+DUPLICATE_MAX_DISTANCE = 4
+
+# Why a page was skipped
+SKIP_BLANK = 'blank'
+SKIP_DUPLICATE = 'duplicate'
+SKIP_STORED = 'stored'
+
+
+def page_thumbnail(image, width=THUMBNAIL_WIDTH):
+    """Small grayscale copy of a page image"""
+    image = to_grayscale(image)
+    if image.width <= width:
+        return image
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.BOX)
+
+
+def ink_ratio(image):
+    """Share of pixels darker than preprocessing.CROP_INK_THRESHOLD"""
+    histogram = to_grayscale(image).histogram()
+    return sum(histogram[:CROP_INK_THRESHOLD]) / (sum(histogram) or 1)
+
+
+def ink_mask(image):
+    """1-bit image of the ink (see ink_ratio)"""
+    return to_grayscale(image).point(lambda p: 255 if p < CROP_INK_THRESHOLD else 0, mode='1')
+
+
+def pixel_digest(image):
+    """SHA-256 of the mode, size and pixels of an image at full resolution"""
+    digest = hashlib.sha256(f"{image.mode} {image.width}x{image.height}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image, hash_size=HASH_SIZE):
+    """
+    Difference hash of an image: one bit per pair of horizontally adjacent cells
+
+    Returns:
+        Integer of hash_size * hash_size bits
+    """
+    cells = to_grayscale(image).resize((hash_size + 1, hash_size), Image.BOX).tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for column in range(hash_size):
+            value = (value << 1) | (cells[offset + column] > cells[offset + column + 1])
+    return value
+
+
+def hash_distance(first, second):
+    """Number of bits two hashes (or two equally sized 1-bit images, as bytes) differ in"""
+    if isinstance(first, bytes):
+        first, second = int.from_bytes(first, 'big'), int.from_bytes(second, 'big')
+    return bin(first ^ second).count('1')
+
+
+class PageDeduplicator:
+    """
+    Skips blank pages and reuses the text of repeated pages
+
+    Run the rendered pages through filter() before processing and the
+    processed results through merge(), which puts the skipped pages back in
+    page order.
+
+    Args:
+        method: Processing method name, part of the page store keys
+        blank_text: Callable(page_number) returning the text written for a blank page
+        copy_text: Callable(text, from_page, page_number) adapting the text of one
+                   page to another (e.g. its page header); None = use the text as is
+        is_failed: Callable(page_number, text) returning True for error placeholders,
+                   which are never stored
+        skip_blank: Skip blank pages
+        reuse_duplicates: Reuse the text of earlier identical pages
+        page_store: Optional ResultCache keeping page texts across documents
+        options: Processing options of the method, part of the page store keys
+    """
+
+    def __init__(self, method, blank_text, copy_text=None, is_failed=None, skip_blank=True, reuse_duplicates=True,
+                 page_store=None, options=None):
+        self.method = method
+        self.blank_text = blank_text
+        self.copy_text = copy_text or (lambda text, from_page, page_number: text)
+        self.is_failed = is_failed or (lambda page_number, text: False)
+        self.skip_blank = skip_blank
+        self.reuse_duplicates = reuse_duplicates
+        self.page_store = page_store
+        self.options = options or {}
+        self.check_seconds = 0.0
+        self.processed = 0
+        self.process_seconds = 0.0
+        self._hashes = {}        # Page number -> (dHash, ink mask bytes, pixel digest) of pages that are not duplicates
+        self._texts = {}         # Page number -> text of the processed (or stored) pages
+        self._skipped = deque()  # (page_number, reason, text or original page number), in page order
+        self._reasons = {}       # Page number -> (reason, original page number), for the summary
+
+    def _store_key(self, page_hash):
+        return make_cache_key('page-image', self.method, page_hash[2], **self.options)
+
+    def _find_duplicate(self, page_hash):
+        value, mask, digest = page_hash
+        for page_number, (earlier_value, earlier_mask, earlier_digest) in self._hashes.items():
+            # The thumbnail only finds candidates; the full-resolution pixels decide
+            if (hash_distance(value, earlier_value) <= DUPLICATE_MAX_DISTANCE and mask == earlier_mask
+                    and digest == earlier_digest):
+                return page_number
+        return None
+
+    def _check(self, page_number, image):
+        """Reason and payload if the page can be skipped, otherwise None"""
+        thumbnail = page_thumbnail(image)
+        if self.skip_blank and ink_ratio(thumbnail) < BLANK_INK_RATIO:
+            return SKIP_BLANK, self.blank_text(page_number)
+        if not self.reuse_duplicates:
+            return None
+        mask = ink_mask(thumbnail)
+        page_hash = (dhash(thumbnail), (mask.size, mask.tobytes()), pixel_digest(image))
+        original = self._find_duplicate(page_hash)
+        if original is not None:
+            return SKIP_DUPLICATE, original
+        self._hashes[page_number] = page_hash
+        if self.page_store is not None:
+            stored = self.page_store.get_page(self._store_key(page_hash))
+            if stored is not None:
+                stored = json.loads(stored)
+                # Later duplicates of this page copy it from here
+                self._texts[page_number] = self.copy_text(stored['text'], stored['page'], page_number)
+                return SKIP_STORED, self._texts[page_number]
+        return None
+
+    def filter(self, pages):
+        """
+        Pass on the pages that need processing
+
+        Args:
+            pages: Iterable of (page_number, PIL Image), in page order
+
+        Yields:
+            The (page_number, PIL Image) tuples of pages that are not skipped
+        """
+        for page_number, image in pages:
+            start = time.perf_counter()
+            skipped = self._check(page_number, image)
+            seconds = time.perf_counter() - start
+            self.check_seconds += seconds
+            metrics.record_stage('page_check', seconds, pages=1)
+            if skipped is None:
+                yield page_number, image
+                continue
+            reason, payload = skipped
+            logger.info(f"Skipping {reason} page {page_number}", extra={'page': page_number, 'reason': reason})
+            metrics.inc('pdf_pages_skipped_total', method=self.method, reason=reason)
+            self._skipped.append((page_number, reason, payload))
+            self._reasons[page_number] = (reason, payload) if reason == SKIP_DUPLICATE else (reason, None)
+            del image
+
+    def _skipped_before(self, page_number):
+        # filter() has decided on every page before one that came out of processing
+        while self._skipped and (page_number is None or self._skipped[0][0] < page_number):
+            skipped_page, reason, payload = self._skipped.popleft()
+            if reason == SKIP_DUPLICATE:
+                payload = self.copy_text(self._texts[payload], payload, skipped_page)
+            yield skipped_page, payload
+
+    def merge(self, results, progress_callback=None, total=None):
+        """
+        Put the skipped pages back among the processed ones
+
+        Args:
+            results: Iterable of (page_number, text) of the pages filter() passed on, in page order
+            progress_callback: Optional callable(pages_done, total), called for every page
+            total: Number of pages, processed and skipped
+
+        Yields:
+            Tuples of (page_number, text) of every page, in page order
+        """
+        pages_done = 0
+        pages = iter(results)
+        while True:
+            # Time spent waiting for processed pages, for the estimate of time saved
+            waited = time.perf_counter()
+            item = next(pages, None)
+            self.process_seconds += time.perf_counter() - waited
+            for page in self._skipped_before(item[0] if item else None):
+                pages_done += 1
+                if progress_callback:
+                    progress_callback(pages_done, total)
+                yield page
+            if item is None:
+                break
+            page_number, text = item
+            self.processed += 1
+            self._texts[page_number] = text
+            if self.page_store is not None and page_number in self._hashes and not self.is_failed(page_number, text):
+                self.page_store.put_page(self._store_key(self._hashes[page_number]),
+                                         json.dumps({'page': page_number, 'text': text}))
+            pages_done += 1
+            if progress_callback:
+                progress_callback(pages_done, total)
+            yield page_number, text
+
+    def summary(self):
+        """
+        Pages skipped and the time saved, for the job metadata
+
+        The time saved is estimated from the average time the processed pages
+        took, less the time spent checking every page.
+        """
+        skipped = len(self._reasons)
+        process_seconds = max(0.0, self.process_seconds - self.check_seconds)
+        seconds_per_page = process_seconds / self.processed if self.processed else 0.0
+        return {
+            'pages_skipped': skipped,
+            'blank_pages': sorted(page for page, (reason, _) in self._reasons.items() if reason == SKIP_BLANK),
+            'duplicate_pages': {str(page): original for page, (reason, original) in sorted(self._reasons.items())
+                                if reason == SKIP_DUPLICATE},
+            'stored_pages': sorted(page for page, (reason, _) in self._reasons.items() if reason == SKIP_STORED),
+            'check_seconds': round(self.check_seconds, 3),
+            'estimated_seconds_saved': round(skipped * seconds_per_page - self.check_seconds, 3),
+        }
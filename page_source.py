@@ -0,0 +1,237 @@
+import queue
+import threading
+import fitz  # PyMuPDF
+from PIL import Image
+import metrics
+
+# Rasterizers: 'pdf2image' runs poppler's pdftoppm, 'pymupdf' renders in-process
+RENDERERS = ('pdf2image', 'pymupdf')
+DEFAULT_RENDERER = 'pdf2image'
+
+# Pages rendered per pdf2image call (per hand-over to the consumer with PyMuPDF)
+DEFAULT_WINDOW = 4
+# Rendered windows buffered ahead of the consumer
+DEFAULT_PREFETCH = 1
+
+_DONE = object()
+
+
+def get_page_count(pdf_path, poppler_path=None, renderer=DEFAULT_RENDERER):
+    """
+    Get the number of pages in a PDF without rendering it
+
+    Args:
+        pdf_path: Path to the PDF file
+        poppler_path: Poppler binaries folder (None = use PATH)
+        renderer: With 'pymupdf' the count is read without poppler
+
+    Returns:
+        Number of pages
+    """
+    if renderer == 'pymupdf':
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+    # Imported here so processes that only render with PyMuPDF never load pdf2image
+    from pdf2image import pdfinfo_from_path
+    info = pdfinfo_from_path(pdf_path, poppler_path=poppler_path)
+    return int(info['Pages'])
+
+
+def parse_page_ranges(spec):
+    """
+    Parse a page selection such as '1-5,12,20-'
+
+    Pages are 1-based; '20-' runs to the end of the document and '-3' starts at page 1.
+
+    Args:
+        spec: Comma-separated page numbers and ranges
+
+    Returns:
+        List of (first_page, last_page) tuples; last_page is None for open-ended ranges
+
+    Raises:
+        ValueError: If the selection is empty or malformed
+    """
+    ranges = []
+    for part in spec.replace(' ', '').split(','):
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        try:
+            first_page = int(first) if first else 1
+            last_page = (int(last) if last else None) if dash else first_page
+        except ValueError:
+            raise ValueError(f"Invalid page range: '{part}'")
+        if first_page < 1 or (last_page is not None and last_page < first_page):
+            raise ValueError(f"Invalid page range: '{part}'")
+        ranges.append((first_page, last_page))
+    if not ranges:
+        raise ValueError("No pages selected")
+    return ranges
+
+
+def select_pages(pages, page_count):
+    """
+    Resolve a page selection to the page numbers to process
+
+    Args:
+        pages: None for every page, a selection string (see parse_page_ranges)
+               or an iterable of 1-based page numbers
+        page_count: Number of pages in the document
+
+    Returns:
+        Sorted list of distinct page numbers; pages past the end are dropped
+
+    Raises:
+        ValueError: If no selected page exists in the document
+    """
+    if pages is None:
+        return list(range(1, page_count + 1))
+    if isinstance(pages, str):
+        selected = set()
+        for first_page, last_page in parse_page_ranges(pages):
+            selected.update(range(first_page, min(last_page or page_count, page_count) + 1))
+    else:
+        selected = {page_number for page_number in pages if 1 <= page_number <= page_count}
+    if not selected:
+        raise ValueError(f"No selected page exists in this {page_count}-page document")
+    return sorted(selected)
+
+
+def _put(buffer, item, stop):
+    """Put an item in the buffer, giving up if the consumer went away"""
+    while not stop.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _page_windows(page_numbers, window, dpi, page_dpis=None):
+    """
+    Split sorted page numbers into (first_page, last_page, dpi) runs of at most
+    `window` consecutive pages rendered at the same resolution
+    """
+    windows = []
+    for page_number in page_numbers:
+        page_dpi = page_dpis.get(page_number, dpi) if page_dpis else dpi
+        if windows:
+            first_page, last_page, window_dpi = windows[-1]
+            if page_number == last_page + 1 and last_page - first_page + 1 < window and page_dpi == window_dpi:
+                windows[-1] = (first_page, page_number, window_dpi)
+                continue
+        windows.append((page_number, page_number, page_dpi))
+    return windows
+
+
+def render_page_pymupdf(page, dpi):
+    """
+    Render one PyMuPDF page straight into an RGB PIL Image
+
+    No subprocess and no intermediate image file: the pixmap's pixels are
+    copied into the image once.
+    """
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False)
+    return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+
+
+def _render_windows(pdf_path, windows, poppler_path, buffer, stop, renderer=DEFAULT_RENDERER):
+    """Background thread: render the PDF window by window into the buffer"""
+    doc = None
+    try:
+        if renderer == 'pymupdf':
+            doc = fitz.open(pdf_path)
+        else:
+            from pdf2image import convert_from_path
+        for first_page, last_page, dpi in windows:
+            if stop.is_set():
+                return
+            with metrics.stage('rasterize', pages=last_page - first_page + 1):
+                if doc is not None:
+                    images = [render_page_pymupdf(doc[page_number - 1], dpi)
+                              for page_number in range(first_page, last_page + 1)]
+                else:
+                    images = convert_from_path(
+                        pdf_path,
+                        dpi=dpi,
+                        first_page=first_page,
+                        last_page=last_page,
+                        poppler_path=poppler_path
+                    )
+            if not _put(buffer, (first_page, images), stop):
+                return
+        _put(buffer, _DONE, stop)
+    except Exception as e:
+        _put(buffer, e, stop)
+    finally:
+        if doc is not None:
+            doc.close()
+
+
+def iter_pdf_pages(pdf_path, dpi=300, window=DEFAULT_WINDOW, prefetch=DEFAULT_PREFETCH,
+                   poppler_path=None, page_count=None, page_numbers=None, page_dpis=None,
+                   renderer=DEFAULT_RENDERER):
+    """
+    Lazily render PDF pages as images
+
+    Pages are rendered `window` at a time (with pdf2image's first_page/last_page
+    options, or page by page with PyMuPDF) on a background thread, which stays
+    at most `prefetch` windows ahead of the consumer. Peak memory is therefore
+    bounded by the window size, not by the number of pages in the document.
+
+    Args:
+        pdf_path: Path to the PDF file
+        dpi: Rendering resolution
+        window: Number of pages rendered per pdf2image call
+        prefetch: Number of rendered windows buffered ahead of the consumer
+        poppler_path: Poppler binaries folder (None = use PATH)
+        page_count: Number of pages, if already known
+        page_numbers: Only render these pages (1-based); None renders every page
+        page_dpis: Optional dict of page number -> DPI overriding dpi for those pages
+                   (see preprocessing.choose_page_dpis)
+        renderer: 'pdf2image' or 'pymupdf' (see RENDERERS)
+
+    Yields:
+        Tuples of (page_number, PIL Image), page numbers starting at 1
+    """
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {renderer}")
+    if page_numbers is None:
+        if page_count is None:
+            page_count = get_page_count(pdf_path, poppler_path, renderer)
+        page_numbers = range(1, page_count + 1)
+    windows = _page_windows(sorted(set(page_numbers)), max(1, window), dpi, page_dpis)
+
+    buffer = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    render_thread = threading.Thread(
+        target=_render_windows,
+        args=(pdf_path, windows, poppler_path, buffer, stop, renderer),
+        daemon=True
+    )
+    render_thread.start()
+
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            first_page, images = item
+            for offset in range(len(images)):
+                # Hand each page over and drop our reference so it can be freed once used
+                image = images[offset]
+                images[offset] = None
+                yield first_page + offset, image
+    finally:
+        # Stop the renderer if the consumer stopped early
+        stop.set()
+        while True:
+            try:
+                buffer.get_nowait()
+            except queue.Empty:
+                break
+        render_thread.join()
@@ -0,0 +1,215 @@
+import fitz  # PyMuPDF
+from PIL import Image, ImageOps
+
+# Resolution limits for adaptive DPI
+MIN_DPI = 150
+MAX_DPI = 400
+# Adaptive DPI is rounded to a multiple of this, so neighbouring pages share render windows
+DPI_STEP = 50
+# Rendered height, in pixels, aimed for the body text (tesseract reads best at ~20-40 px)
+TARGET_TEXT_HEIGHT_PX = 32
+# Images covering less than this share of the page are ignored when reading the scan resolution
+MIN_IMAGE_AREA_RATIO = 0.25
+
+# Deskew search range and step, in degrees
+DESKEW_MAX_ANGLE = 5.0
+DESKEW_STEP = 0.5
+# Width of the thumbnail used to find the skew angle
+DESKEW_THUMBNAIL_WIDTH = 800
+# Pixels darker than this count as ink when cropping margins
+CROP_INK_THRESHOLD = 200
+# Blank border kept around the cropped content, in pixels
+CROP_PADDING = 16
+
+
+def _round_dpi(dpi):
+    dpi = int(round(dpi / DPI_STEP)) * DPI_STEP
+    return max(MIN_DPI, min(MAX_DPI, dpi))
+
+
+def choose_page_dpi(page, default_dpi=300):
+    """
+    Pick a rendering resolution for one page
+
+    Scanned pages are rendered at the resolution of their largest embedded
+    image (rendering a 200 DPI scan at 300 DPI only adds interpolated pixels).
+    Pages with a text layer are rendered so the median font size comes out
+    at about TARGET_TEXT_HEIGHT_PX. Other pages use default_dpi.
+
+    Args:
+        page: PyMuPDF page
+        default_dpi: Resolution used when the page gives no hint
+
+    Returns:
+        DPI between MIN_DPI and MAX_DPI
+    """
+    page_area = abs(page.rect) or 1
+    best_image = None
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox']) & page.rect
+        if abs(bbox) / page_area < MIN_IMAGE_AREA_RATIO or not bbox.width:
+            continue
+        if best_image is None or abs(bbox) > abs(best_image[0]):
+            best_image = (bbox, info['width'])
+    if best_image is not None:
+        bbox, pixel_width = best_image
+        return _round_dpi(pixel_width / (bbox.width / 72))
+
+    sizes = []
+    for block in page.get_text('dict')['blocks']:
+        for line in block.get('lines', ()):
+            for span in line['spans']:
+                if span['text'].strip():
+                    sizes.append(span['size'])
+    if sizes:
+        sizes.sort()
+        median_size = sizes[len(sizes) // 2]
+        return _round_dpi(TARGET_TEXT_HEIGHT_PX * 72 / median_size)
+
+    return _round_dpi(default_dpi)
+
+
+def choose_page_dpis(pdf_path, page_numbers=None, default_dpi=300):
+    """
+    Pick a rendering resolution for each page of a PDF
+
+    Args:
+        pdf_path: Path to the PDF file
+        page_numbers: 1-based pages to inspect (None = all pages)
+        default_dpi: Resolution used when a page gives no hint
+
+    Returns:
+        Dict of page number -> DPI
+    """
+    with fitz.open(pdf_path) as doc:
+        if page_numbers is None:
+            page_numbers = range(1, len(doc) + 1)
+        return {page_number: choose_page_dpi(doc[page_number - 1], default_dpi) for page_number in page_numbers}
+
+
+def to_grayscale(image):
+    """Drop colour information; tesseract binarizes internally anyway"""
+    return image if image.mode == 'L' else image.convert('L')
+
+
+def otsu_threshold(image):
+    """Threshold between ink and paper for a grayscale image (Otsu's method)"""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(i * count for i, count in enumerate(histogram))
+    sum_background = 0
+    weight_background = 0
+    best_threshold, best_variance = 127, 0.0
+    for i, count in enumerate(histogram):
+        weight_background += count
+        if not weight_background:
+            continue
+        weight_foreground = total - weight_background
+        if not weight_foreground:
+            break
+        sum_background += i * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+    return best_threshold
+
+
+def binarize(image):
+    """Black and white image using Otsu's threshold"""
+    image = to_grayscale(image)
+    threshold = otsu_threshold(image)
+    return image.point(lambda p: 255 if p > threshold else 0, mode='1').convert('L')
+
+
+def _row_profile_score(image):
+    # Mean darkness of each row; straight text lines give sharp peaks and a high variance
+    rows = image.resize((1, image.height), Image.BOX).tobytes()
+    mean = sum(rows) / len(rows)
+    return sum((row - mean) ** 2 for row in rows)
+
+
+def find_skew_angle(image):
+    """
+    Estimate the skew of a page from its horizontal projection profile
+
+    Returns:
+        Angle in degrees to rotate the image by (counter-clockwise) to straighten it
+    """
+    thumbnail = ImageOps.invert(to_grayscale(image))
+    if thumbnail.width > DESKEW_THUMBNAIL_WIDTH:
+        height = max(1, round(thumbnail.height * DESKEW_THUMBNAIL_WIDTH / thumbnail.width))
+        thumbnail = thumbnail.resize((DESKEW_THUMBNAIL_WIDTH, height), Image.BILINEAR)
+
+    scores = {0.0: _row_profile_score(thumbnail)}
+
+    def score(angle):
+        if angle not in scores:
+            scores[angle] = _row_profile_score(thumbnail.rotate(angle, resample=Image.BILINEAR, fillcolor=0))
+        return scores[angle]
+
+    # Coarse search at twice the step, then check the neighbours of the best angle.
+    # Smaller angles come first, so ties (e.g. a blank page) keep the page as it is.
+    coarse_steps = int(DESKEW_MAX_ANGLE / (2 * DESKEW_STEP))
+    angles = sorted((i * 2 * DESKEW_STEP for i in range(-coarse_steps, coarse_steps + 1)), key=abs)
+    best_angle = max(angles, key=score)
+    return max((best_angle, best_angle - DESKEW_STEP, best_angle + DESKEW_STEP), key=score)
+
+
+def deskew(image):
+    """Rotate the page so its text lines are horizontal"""
+    angle = find_skew_angle(image)
+    if not angle:
+        return image
+    fill = 255 if image.mode == 'L' else (255,) * len(image.getbands())
+    return image.rotate(angle, resample=Image.BICUBIC, expand=True, fillcolor=fill)
+
+
+def crop_margins(image):
+    """Crop blank borders, keeping CROP_PADDING pixels around the content"""
+    ink = to_grayscale(image).point(lambda p: 255 if p < CROP_INK_THRESHOLD else 0)
+    bbox = ink.getbbox()
+    if bbox is None:
+        return image  # Blank page
+    left, top, right, bottom = bbox
+    return image.crop((
+        max(0, left - CROP_PADDING),
+        max(0, top - CROP_PADDING),
+        min(image.width, right + CROP_PADDING),
+        min(image.height, bottom + CROP_PADDING),
+    ))
+
+
+# Preprocessing steps by name; add your own with register_step
+STEPS = {
+    'grayscale': to_grayscale,
+    'binarize': binarize,
+    'deskew': deskew,
+    'crop_margins': crop_margins,
+}
+
+
+def register_step(name, func):
+    """Make func(image) -> image available as a preprocessing step"""
+    STEPS[name] = func
+
+
+def preprocess_image(image, steps):
+    """
+    Run a page image through preprocessing steps in order
+
+    Args:
+        image: PIL Image
+        steps: Sequence of step names from STEPS (empty = return the image unchanged)
+
+    Returns:
+        Processed PIL Image
+    """
+    for name in steps or ():
+        try:
+            step = STEPS[name]
+        except KeyError:
+            raise ValueError(f"Unknown preprocessing step: {name}")
+        image = step(image)
+    return image
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+# Read size used when hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+# Minimum seconds between eviction scans triggered by new entries
+EVICT_INTERVAL = 60
+
+
+def hash_file(path):
+    """
+    SHA-256 of a file's contents
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(*parts, **options):
+    """
+    Build a cache key from positional parts and processing options
+
+    Example:
+        make_cache_key(pdf_hash, 'ocr', 'txt', dpi=300, lang='ben+eng')
+
+    Returns:
+        Hex digest identifying the combination
+    """
+    payload = json.dumps([parts, options], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    Content-addressed disk cache for processing results
+
+    Whole output files are stored under results/ and individual page texts
+    under pages/, both named by their cache key. Entries expire after
+    ttl_seconds, and once the cache grows past max_bytes the least recently
+    used entries are removed (a hit refreshes an entry's modification time).
+
+    Args:
+        cache_dir: Folder holding the cache
+        max_bytes: Size limit for all cached files
+        ttl_seconds: Maximum age of an entry since it was last used
+    """
+
+    def __init__(self, cache_dir, max_bytes=1024 * 1024 * 1024, ttl_seconds=7 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._last_evict = 0
+        os.makedirs(os.path.join(cache_dir, 'results'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'pages'), exist_ok=True)
+
+    def _path(self, kind, key):
+        return os.path.join(self.cache_dir, kind, key[:2], key)
+
+    def _lookup(self, kind, key):
+        path = self._path(kind, key)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        if self.ttl_seconds and time.time() - mtime > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            # Mark as recently used
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def _store(self, kind, key, write):
+        path = self._path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+            # Atomic, so readers never see a half-written entry
+            os.replace(temp_path, path)
+        except Exception:
+            self._remove(temp_path)
+            raise
+        if time.time() - self._last_evict >= EVICT_INTERVAL:
+            self.evict()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_result(self, key, output_path):
+        """
+        Copy a cached output file to output_path
+
+        Returns:
+            True on a cache hit, False otherwise
+        """
+        path = self._lookup('results', key)
+        if path is None:
+            return False
+        try:
+            shutil.copyfile(path, output_path)
+        except OSError:
+            return False
+        return True
+
+    def put_result(self, key, output_path):
+        """Store a finished output file under key"""
+        def write(f):
+            with open(output_path, 'rb') as source:
+                shutil.copyfileobj(source, f)
+        self._store('results', key, write)
+
+    def get_page(self, key):
+        """Return the cached text of a page, or None"""
+        path = self._lookup('pages', key)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put_page(self, key, text):
+        """Store the text of a single page under key"""
+        self._store('pages', key, lambda f: f.write(text.encode('utf-8')))
+
+    def evict(self):
+        """Remove expired entries, then least recently used ones until under max_bytes"""
+        with self._lock:
+            now = time.time()
+            self._last_evict = now
+            entries = []
+            total = 0
+            for kind in ('results', 'pages'):
+                for root, _, files in os.walk(os.path.join(self.cache_dir, kind)):
+                    for name in files:
+                        if name.startswith('.tmp-'):
+                            continue
+                        path = os.path.join(root, name)
+                        try:
+                            stat = os.stat(path)
+                        except OSError:
+                            continue
+                        if self.ttl_seconds and now - stat.st_mtime > self.ttl_seconds:
+                            self._remove(path)
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, path))
+                        total += stat.st_size
+
+            if not self.max_bytes or total <= self.max_bytes:
+                return
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
@@ -0,0 +1,129 @@
+import re
+from PIL import Image
+from preprocessing import otsu_threshold, to_grayscale
+from ocr_engines import get_engine
+
+# Width of the thumbnail the text lines are measured on
+THUMBNAIL_WIDTH = 1200
+# Text lines shorter than this (in thumbnail pixels) are rules or noise
+MIN_LINE_HEIGHT = 4
+# A line has a Bangla headline (matra) when its darkest row is inked across this share of the line...
+HEADLINE_MIN_COVERAGE = 0.75
+# ...and sits in the upper part of the line; Latin lines peak well below this coverage
+LATIN_MAX_COVERAGE = 0.65
+# Share of classified lines needed to call the page Bangla or English
+PAGE_SCRIPT_RATIO = 0.7
+# Text lines OCR'd when the headline test is not conclusive
+SAMPLE_LINES = 3
+
+BANGLA_PATTERN = re.compile(r'[\u0980-\u09FF]')
+ENGLISH_PATTERN = re.compile(r'[a-zA-Z]')
+
+
+def _find_text_lines(ink):
+    """(top, bottom) rows of each text line in a binarized ink image (ink = 255)"""
+    profile = ink.resize((1, ink.height), Image.BOX).tobytes()
+    lines = []
+    top = None
+    for y, value in enumerate(profile):
+        if value and top is None:
+            top = y
+        elif not value and top is not None:
+            if y - top >= MIN_LINE_HEIGHT:
+                lines.append((top, y))
+            top = None
+    if top is not None and ink.height - top >= MIN_LINE_HEIGHT:
+        lines.append((top, ink.height))
+    return lines
+
+
+def _classify_line(line):
+    """'bangla', 'latin' or None for one text line crop (ink = 255)"""
+    bbox = line.getbbox()
+    if bbox is None:
+        return None
+    line = line.crop((bbox[0], 0, bbox[2], line.height))
+    rows = line.resize((1, line.height), Image.BOX).tobytes()
+    peak = max(rows)
+    coverage = peak / 255
+    position = rows.index(peak) / len(rows)
+    if coverage >= HEADLINE_MIN_COVERAGE and position <= 0.5:
+        return 'bangla'
+    if coverage < LATIN_MAX_COVERAGE:
+        return 'latin'
+    return None
+
+
+def _ocr_sample(image, lines, scale, engine):
+    """Decide the script by OCR'ing a few text lines instead of the whole page"""
+    crops = []
+    for top, bottom in lines[:SAMPLE_LINES]:
+        crops.append(image.crop((0, int(top / scale), image.width, int(bottom / scale) + 1)))
+    sample = Image.new('L', (image.width, sum(crop.height for crop in crops) + 20 * len(crops)), 255)
+    y = 10
+    for crop in crops:
+        sample.paste(crop, (0, y))
+        y += crop.height + 20
+
+    text = engine.image_to_string(sample, 'ben+eng', '--psm 6')
+    bangla_count = len(BANGLA_PATTERN.findall(text))
+    english_count = len(ENGLISH_PATTERN.findall(text))
+    if bangla_count > english_count:
+        return 'bangla'
+    elif english_count > bangla_count:
+        return 'english'
+    return 'mixed'
+
+
+def detect_script(image, engine=None):
+    """
+    Detect whether a page image is Bangla, English or mixed, cheaply
+
+    Bangla letters hang from a headline (matra), so a Bangla text line has
+    one row inked almost end to end near its top; Latin lines never do.
+    Each line of a downscaled, binarized copy of the page is checked for
+    this. Only when the lines disagree or are unclear are a few of them
+    cropped and OCR'd, which is still far cheaper than OCR'ing the page.
+
+    Args:
+        image: PIL Image of the page
+        engine: OCR engine for the sampled lines (None = ocr_engines.get_engine())
+
+    Returns:
+        Tuple of ('bangla' | 'english' | 'mixed', how it was decided:
+        'headline', 'sample_ocr', 'blank' or 'default' if sample OCR failed)
+    """
+    gray = to_grayscale(image)
+    scale = 1.0
+    if gray.width > THUMBNAIL_WIDTH:
+        scale = THUMBNAIL_WIDTH / gray.width
+        thumbnail = gray.resize((THUMBNAIL_WIDTH, max(1, round(gray.height * scale))), Image.BILINEAR)
+    else:
+        thumbnail = gray
+    threshold = otsu_threshold(thumbnail)
+    ink = thumbnail.point(lambda p: 255 if p <= threshold else 0)
+
+    lines = _find_text_lines(ink)
+    if not lines:
+        return 'mixed', 'blank'
+
+    votes = {'bangla': 0, 'latin': 0, None: 0}
+    for top, bottom in lines:
+        votes[_classify_line(ink.crop((0, top, ink.width, bottom)))] += 1
+    if votes['bangla'] >= PAGE_SCRIPT_RATIO * len(lines):
+        return 'bangla', 'headline'
+    if votes['latin'] >= PAGE_SCRIPT_RATIO * len(lines):
+        return 'english', 'headline'
+    if votes[None] < (1 - PAGE_SCRIPT_RATIO) * len(lines):
+        # Clear Bangla lines and clear Latin lines on the same page
+        return 'mixed', 'headline'
+
+    try:
+        return _ocr_sample(gray, lines, scale, engine or get_engine()), 'sample_ocr'
+    except Exception:
+        return 'mixed', 'default'
+
+
+def lang_config_for(language):
+    """Tesseract language string for a detected language (primary language first)"""
+    return 'eng+ben' if language == 'english' else 'ben+eng'
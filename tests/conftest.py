@@ -0,0 +1,15 @@
+"""
+Shared setup for the test suite
+
+Run from the repository root:
+    python -m pytest -q tests
+
+The modules live at the repository root; the synthetic PDFs and the
+stand-in Gemini model come from benchmarks/synthetic.py.
+"""
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
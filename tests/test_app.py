@@ -0,0 +1,131 @@
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+import pytest
+
+import app as app_module
+from result_cache import ResultCache
+from synthetic import make_digital_pdf
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    config = app_module.app.config
+    monkeypatch.setitem(config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(config, 'CHECKPOINT_FOLDER', str(tmp_path / 'checkpoints'))
+    monkeypatch.setitem(config, 'BATCH_WORKERS', 1)
+    monkeypatch.setattr(app_module, 'result_cache', ResultCache(str(tmp_path / 'cache')))
+    os.makedirs(config['UPLOAD_FOLDER'])
+    config['TESTING'] = True
+    with app_module.app.test_client() as client:
+        yield client
+
+
+def pdf_bytes(tmp_path, name, pages=1):
+    with open(make_digital_pdf(str(tmp_path / name), pages), 'rb') as f:
+        return f.read()
+
+
+def wait_for_job(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f'/jobs/{job_id}').get_json()
+        if job['status'] in ('done', 'failed'):
+            return job
+        time.sleep(0.05)
+    raise TimeoutError(job)
+
+
+def post_batch(client, files):
+    data = {'processing_method': 'no_ocr', 'output_format': 'txt',
+            'pdf_files': [(io.BytesIO(content), name) for name, content in files]}
+    return client.post('/batch', data=data, content_type='multipart/form-data',
+                       headers={'Accept': 'application/json'})
+
+
+def batch_manifest(client, job):
+    archive = client.get(f"/direct-download/{job['output_filename']}")
+    with zipfile.ZipFile(io.BytesIO(archive.data)) as result:
+        return [json.loads(line) for line in result.read('manifest.jsonl').decode().splitlines()]
+
+
+def parse_events(chunks):
+    # Split a server-sent event stream into (event, id, data) tuples and keep-alive comments
+    events = []
+    for block in ''.join(chunks).split('\n\n'):
+        if block.startswith(':'):
+            events.append(block)
+        elif block:
+            fields = dict(line.split(': ', 1) for line in block.split('\n'))
+            events.append((fields['event'], fields.get('id'), json.loads(fields['data'])))
+    return events
+
+
+def publish_pages(pdf_path, pages=3, gate=None, progress_callback=None, page_callback=None, metadata=None):
+    if gate is not None:
+        gate.wait(5)
+    for page_number in range(1, pages + 1):
+        page_callback(page_number, f"পৃষ্ঠা {page_number}")
+        progress_callback(page_number, pages)
+
+
+def test_events_stream_pages_then_the_final_status(client):
+    job = app_module.job_manager.submit('no_ocr', publish_pages, 'a.pdf', output_filename='a.txt')
+    events = parse_events(client.get(f'/jobs/{job.id}/events').get_data(as_text=True))
+    pages = [event for event in events if event[0] == 'page']
+    assert pages == [('page', str(n), {'page': n, 'text': f"পৃষ্ঠা {n}"}) for n in (1, 2, 3)]
+    assert all(event[0] in ('page', 'progress') for event in events[:-1])
+    event, event_id, data = events[-1]
+    assert (event, event_id, data['status']) == ('done', None, 'done')
+    assert data['result_url'] == f'/jobs/{job.id}/result'
+
+
+def test_events_resume_after_the_last_event_id(client):
+    job = app_module.job_manager.submit('no_ocr', publish_pages, 'a.pdf')
+    wait_for_job(client, job.id)
+    response = client.get(f'/jobs/{job.id}/events', headers={'Last-Event-ID': '2'})
+    events = parse_events(response.get_data(as_text=True))
+    assert [event[:2] for event in events] == [('page', '3'), ('done', None)]
+
+
+def test_idle_events_stream_sends_keep_alives(client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, 'EVENTS_KEEPALIVE_SECONDS', 0.05)
+    gate = threading.Event()
+    job = app_module.job_manager.submit('no_ocr', publish_pages, 'a.pdf', pages=1, gate=gate)
+    response = client.get(f'/jobs/{job.id}/events', buffered=False)
+    chunks = []
+    for chunk in response.response:
+        chunks.append(chunk.decode() if isinstance(chunk, bytes) else chunk)
+        if chunks[-1] == ': keep-alive\n\n':
+            gate.set()
+    events = parse_events(chunks)
+    assert ': keep-alive' in events
+    assert [event[0] for event in events if event != ': keep-alive'][-2:] == ['page', 'done']
+
+
+def test_events_for_unknown_jobs_are_not_found(client):
+    assert client.get('/jobs/unknown/events').status_code == 404
+
+
+def test_batch_keeps_files_with_the_same_or_non_ascii_names(client, tmp_path):
+    pdf = pdf_bytes(tmp_path, 'a.pdf')
+    response = post_batch(client, [('report.pdf', pdf), ('report.pdf', pdf), ('ফাইল.pdf', pdf), ('দলিল.pdf', pdf)])
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()['id'])
+    assert job['status'] == 'done'
+    records = batch_manifest(client, job)
+    assert sorted(record['file'] for record in records) == [
+        '0001_report.pdf', '0002_report.pdf', '0003_document.pdf', '0004_document.pdf']
+    assert all(record['status'] == 'done' for record in records)
+
+
+def test_batch_rejects_files_that_are_not_pdfs(client, tmp_path):
+    response = post_batch(client, [('good.pdf', pdf_bytes(tmp_path, 'a.pdf')), ('bad.pdf', b'not a pdf')])
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'bad.pdf: The file is not a PDF'
+    assert os.listdir(app_module.app.config['UPLOAD_FOLDER']) == []
@@ -0,0 +1,71 @@
+import re
+
+import fitz
+
+import Auto_unified
+from OCR_unified import _error_page_text
+from synthetic import SAMPLE_BANGLA, SAMPLE_ENGLISH, make_bangla_pdf, make_mixed_pdf
+
+
+def failing_ocr(pages, lang_config, total, workers=None, progress_callback=None, **kwargs):
+    # Stand-in for iter_ocr_pages: tesseract fails on every page sent to OCR
+    for page_number, _ in pages:
+        yield page_number, _error_page_text(page_number)
+
+
+def no_render(pdf_path, dpi=300, page_numbers=None, **kwargs):
+    for page_number in page_numbers:
+        yield page_number, None
+
+
+def run(pdf_path, tmp_path, page_numbers=None):
+    metadata = {}
+    output_path = str(tmp_path / 'out.txt')
+    Auto_unified.process_auto_pdf(pdf_path, output_path, metadata=metadata, page_numbers=page_numbers)
+    with open(output_path, encoding='utf-8') as f:
+        return f.read(), metadata
+
+
+def page_texts(text):
+    # Output text split into page number -> page body
+    pages = re.split(r'^--- Page (\d+) ---\n', text, flags=re.M)[1:]
+    return {int(number): body for number, body in zip(pages[::2], pages[1::2])}
+
+
+def test_only_bijoy_pages_are_converted(tmp_path):
+    # Pages 1 and 4 are digital English, 2 and 5 Bijoy, 3 and 6 scanned
+    pdf_path = make_mixed_pdf(str(tmp_path / 'mixed.pdf'), 5)
+    text, metadata = run(pdf_path, tmp_path, '1,2,4,5')
+    pages = page_texts(text)
+    for page_number in (1, 4):
+        assert SAMPLE_ENGLISH.format(page=1)[:60] in pages[page_number]
+    with fitz.open(pdf_path) as doc:
+        for page_number in (2, 5):
+            assert doc[page_number - 1].get_text().split()[0] not in pages[page_number]
+            assert re.search('[\u0980-\u09ff]', pages[page_number])
+    routing = {decision['page']: decision for decision in metadata['routing']}
+    assert [routing[n]['language'] for n in (1, 2, 4, 5)] == ['english', 'bangla', 'english', 'bangla']
+    assert [routing[n]['bijoy'] for n in (1, 2, 4, 5)] == [False, True, False, True]
+    assert metadata['language'] == 'mixed'
+
+
+def test_unicode_bangla_pages_are_not_converted(tmp_path):
+    text, metadata = run(make_bangla_pdf(str(tmp_path / 'bangla.pdf'), 2), tmp_path)
+    assert SAMPLE_BANGLA.format(page=1)[:20] in text
+    assert metadata['language'] == 'bangla'
+    assert not any(decision['bijoy'] for decision in metadata['routing'])
+
+
+def test_failed_ocr_pages_are_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(Auto_unified, 'iter_ocr_pages', failing_ocr)
+    monkeypatch.setattr(Auto_unified, 'iter_pdf_pages', no_render)
+    text, metadata = run(make_mixed_pdf(str(tmp_path / 'mixed.pdf'), 6), tmp_path)
+    assert metadata['has_errors'] is True
+    assert metadata['failed_pages'] == [3, 6]
+    assert text.count('Error extracting text') == 2
+
+
+def test_text_only_document_has_no_errors(tmp_path):
+    _, metadata = run(make_mixed_pdf(str(tmp_path / 'mixed.pdf'), 2), tmp_path)
+    assert metadata['has_errors'] is False
+    assert metadata['failed_pages'] == []
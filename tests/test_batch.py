@@ -0,0 +1,68 @@
+import json
+import os
+import zipfile
+
+import pytest
+
+import batch
+from synthetic import make_digital_pdf
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    with open(make_digital_pdf(str(tmp_path / 'source.pdf'), 1), 'rb') as f:
+        return f.read()
+
+
+def make_zip(path, members):
+    with zipfile.ZipFile(path, 'w') as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    return path
+
+
+def test_safe_pdf_filename():
+    assert batch.safe_pdf_filename('annual report.PDF') == 'annual_report.pdf'
+    assert batch.safe_pdf_filename('ফাইল.pdf') == 'document.pdf'
+    assert batch.safe_pdf_filename('../../etc/passwd.pdf') == 'etc_passwd.pdf'
+
+
+def test_zip_members_with_colliding_names_are_all_extracted(tmp_path, pdf):
+    zip_path = make_zip(str(tmp_path / 'upload.zip'), [
+        ('ফাইল.pdf', pdf), ('দলিল.pdf', pdf), ('document.pdf', pdf),
+        ('চিঠি/report.pdf', pdf), ('report.pdf', pdf), ('../escape.pdf', pdf), ('notes.txt', b'x'),
+    ])
+    target_dir = tmp_path / 'input'
+    assert batch.extract_pdfs_from_zip(zip_path, str(target_dir)) == 6
+    assert batch.find_pdfs(str(target_dir)) == [
+        'document.pdf', 'document_2.pdf', 'document_3.pdf', 'escape.pdf', 'report.pdf', 'report_2.pdf']
+
+
+def test_zip_larger_than_the_limit_is_not_extracted(tmp_path):
+    # Zeros compress to almost nothing, like a ZIP bomb
+    members = [(f'{n}.pdf', b'\0' * 1024 * 1024) for n in range(5)]
+    with zipfile.ZipFile(str(tmp_path / 'bomb.zip'), 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members:
+            archive.writestr(name, data)
+    target_dir = tmp_path / 'input'
+    with pytest.raises(batch.ArchiveTooLarge):
+        batch.extract_pdfs_from_zip(str(tmp_path / 'bomb.zip'), str(target_dir), max_bytes=4 * 1024 * 1024)
+    assert not target_dir.exists() or batch.find_pdfs(str(target_dir)) == []
+
+
+def test_retry_failed_reprocesses_failed_and_partial_files(tmp_path, pdf):
+    source_dir = tmp_path / 'input'
+    source_dir.mkdir()
+    for name in ('done.pdf', 'partial.pdf', 'failed.pdf'):
+        (source_dir / name).write_bytes(pdf)
+    output_dir = tmp_path / 'output'
+    output_dir.mkdir()
+    with open(output_dir / batch.MANIFEST_NAME, 'w') as manifest:
+        for name, status in (('done.pdf', 'done'), ('partial.pdf', 'partial'), ('failed.pdf', 'failed')):
+            manifest.write(json.dumps({'file': name, 'status': status, 'output': None}) + '\n')
+
+    records = batch.run_batch(str(source_dir), str(output_dir), 'no_ocr', workers=1, retry_failed=True)
+    redone = sorted(record['file'] for record in records if record.get('finished_at'))
+    assert redone == ['failed.pdf', 'partial.pdf']
+    assert all(record['status'] == 'done' for record in records)
+    assert os.path.exists(output_dir / 'partial.txt')
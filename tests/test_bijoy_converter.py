@@ -0,0 +1,87 @@
+import random
+import string
+
+import pytest
+import unicodeconverter
+from unicodeconverter.maps import bijoy_pre_map, bijoy_to_unicode
+
+from bijoy_converter import convert_bijoy_to_unicode
+from synthetic import make_bijoy_text
+
+
+def reference(text):
+    return unicodeconverter.convert_bijoy_to_unicode(text)
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Kg©', 'কর্ম'),
+    ('Kvh©', 'কার্য'),
+    ('©K', 'র্ক'),
+])
+def test_reph(text, expected):
+    assert convert_bijoy_to_unicode(text) == reference(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('wKQz', 'কিছু'),
+    ('‡Kvb', 'কোন'),
+    ('‡KŠ', 'ক\u09c7\u09d7'),  # e-kar + au length mark, as Bijoy writes it
+    ('‰K', 'কৈ'),
+    ('ˆK', 'কৈ'),
+    ('w', 'ি'),
+    ('wK¬', 'ক্লি'),
+    ('†K«v', 'ক্র\u09c7\u09be'),  # e-kar + aa-kar, around the ra-fola
+])
+def test_pre_base_vowel_signs(text, expected):
+    assert convert_bijoy_to_unicode(text) == reference(text) == expected
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('K¡', 'ক্ব'),
+    ('¯Œ', 'স্ক্র'),
+    ('Mœ', 'গ্ন'),
+    ('š—', 'ন্ত'),
+    ('ÿ', 'ক্ষ'),
+    ('µ', 'ক্র'),
+    ('›U', 'ন্ট'),
+    ('‡Kš¿', 'কেন্ত্র'),
+    ('¯^vaxbZv', 'স্বাধীনতা'),
+])
+def test_conjuncts(text, expected):
+    assert convert_bijoy_to_unicode(text) == reference(text) == expected
+
+
+def test_ascii_passthrough():
+    # Punctuation and symbols Bijoy does not remap come out unchanged
+    kept = ''.join(char for char in string.punctuation if reference(char) == char)
+    assert kept
+    assert convert_bijoy_to_unicode(kept) == kept
+    assert convert_bijoy_to_unicode('12.5%, (evsjv)') == reference('12.5%, (evsjv)') == '১২.৫%, (বাংলা)'
+
+
+def test_empty_and_whitespace():
+    for text in ('', ' ', '\n', 'evsjv  \t evsjv\n'):
+        assert convert_bijoy_to_unicode(text) == reference(text)
+
+
+def test_random_strings_match_reference():
+    alphabet = sorted(set(''.join(bijoy_to_unicode)) | set(''.join(bijoy_pre_map)))
+    alphabet += list(' \t\n\r.,-()›/"') * 2 + list('‡†w©¨«vŠ') * 4
+    rng = random.Random(0)
+    compared = 0
+    for _ in range(20000):
+        text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        try:
+            expected = reference(text)
+        except Exception:
+            # Inputs unicodeconverter itself cannot convert
+            continue
+        assert convert_bijoy_to_unicode(text) == expected, text
+        compared += 1
+    assert compared > 15000
+
+
+def test_synthetic_pages_match_reference():
+    for seed in range(20):
+        text = make_bijoy_text(4000, seed=seed)
+        assert convert_bijoy_to_unicode(text) == reference(text)
@@ -0,0 +1,98 @@
+import os
+import threading
+import time
+
+import pytest
+
+from checkpoints import MANIFEST_NAME, PAGE_DONE, PAGES_LOG_NAME, Checkpoint, iter_checkpointed_pages
+
+
+def is_failed(page_number, text):
+    return text.startswith('--- ERROR')
+
+
+def run(checkpoint, page_numbers, process):
+    # A job: start the checkpoint, process the pending pages, merge them with the saved ones
+    pending = checkpoint.start('ocr', {'dpi': 300}, page_numbers)
+    results = ((page_number, process(page_number)) for page_number in pending)
+    return pending, list(iter_checkpointed_pages(page_numbers, checkpoint, results, is_failed))
+
+
+def test_resume_redoes_missing_and_failed_pages(tmp_path):
+    folder = str(tmp_path / 'job')
+    _, pages = run(Checkpoint(folder), [1, 2, 3, 4],
+                   lambda n: '--- ERROR: page 3 ---' if n == 3 else f"first run {n}")
+    assert pages[2] == (3, '--- ERROR: page 3 ---')
+
+    pending, pages = run(Checkpoint(folder), [1, 2, 3, 4], lambda n: f"second run {n}")
+    assert pending == [3]
+    assert pages == [(1, 'first run 1'), (2, 'first run 2'), (3, 'second run 3'), (4, 'first run 4')]
+
+
+def test_page_whose_text_file_is_gone_is_processed_again(tmp_path):
+    folder = str(tmp_path / 'job')
+    run(Checkpoint(folder), [1, 2, 3], lambda n: f"first run {n}")
+    os.remove(os.path.join(folder, 'pages', '00002.txt'))
+
+    checkpoint = Checkpoint(folder)
+    pending, pages = run(checkpoint, [1, 2, 3], lambda n: f"second run {n}")
+    assert pending == [2]
+    assert pages == [(1, 'first run 1'), (2, 'second run 2'), (3, 'first run 3')]
+    assert checkpoint.summary()['pages_done'] == 3
+
+
+def test_results_for_the_wrong_page_are_refused(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'job'))
+    checkpoint.start('ocr', {}, [1, 2])
+    with pytest.raises(RuntimeError):
+        list(iter_checkpointed_pages([1, 2], checkpoint, iter([(2, 'two')]), is_failed))
+
+
+def test_missing_results_are_refused_with_the_page_number(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / 'job'))
+    checkpoint.start('ocr', {}, [1, 2, 3])
+    with pytest.raises(RuntimeError, match='No result for page 2'):
+        list(iter_checkpointed_pages([1, 2, 3], checkpoint, iter([(1, 'one')]), is_failed))
+
+
+def test_page_saves_append_to_the_log_instead_of_rewriting_the_manifest(tmp_path):
+    folder = str(tmp_path / 'job')
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    checkpoint = Checkpoint(folder)
+    checkpoint.start('ocr', {}, list(range(1, 101)))
+    with open(manifest_path, 'rb') as f:
+        manifest = f.read()
+    for page_number in range(1, 51):
+        checkpoint.put_page(page_number, f"page {page_number}", failed=page_number == 7)
+    with open(manifest_path, 'rb') as f:
+        assert f.read() == manifest
+    with open(os.path.join(folder, PAGES_LOG_NAME), 'a') as log:
+        log.write('{"page": 51, "sta')  # Torn line of a crash
+
+    # The job died here; the next run folds the log into the manifest
+    resumed = Checkpoint(folder)
+    assert resumed.start('ocr', {}, list(range(1, 101))) == [7] + list(range(51, 101))
+    assert not os.path.exists(os.path.join(folder, PAGES_LOG_NAME))
+    assert Checkpoint(folder).load()['page_status']['50'] == PAGE_DONE
+
+
+def test_identical_jobs_take_turns(tmp_path):
+    folder = str(tmp_path / 'job')
+    first = Checkpoint(folder)
+    first.acquire()
+    events = []
+
+    def second_job():
+        second = Checkpoint(folder)
+        second.acquire()
+        events.append('second started')
+        second.release()
+
+    thread = threading.Thread(target=second_job)
+    thread.start()
+    time.sleep(0.1)
+    events.append('first done')
+    first.discard()
+    first.release()
+    thread.join()
+    assert events == ['first done', 'second started']
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+
+from broker import SQLiteBroker, DATABASE_NAME
+from distributed import NoWorkersError, publish_pdf, reduce_job
+from synthetic import make_digital_pdf, FakeGeminiModel
+from worker import run_worker
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    return make_digital_pdf(str(tmp_path / 'doc.pdf'), 4, lines_per_page=3)
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return SQLiteBroker(str(tmp_path / 'broker'), lease_seconds=1, max_attempts=2)
+
+
+def finish_job(broker, worker, failed_pages=()):
+    # Complete every task of the broker, newest first, as a worker would
+    tasks = []
+    while True:
+        task = broker.lease(worker)
+        if task is None:
+            break
+        tasks.append(task)
+    for task in reversed(tasks):
+        texts = {page_number: f"text of page {page_number}" for page_number in task['pages']}
+        assert broker.complete(task['id'], worker, texts, [n for n in task['pages'] if n in failed_pages])
+
+
+def test_reduce_writes_pages_in_order(broker, pdf_path, tmp_path):
+    job_id = publish_pdf(broker, 'no_ocr', pdf_path, pages_per_task=3)
+    finish_job(broker, 'w')
+    metadata = {}
+    output_path = str(tmp_path / 'out.txt')
+    reduce_job(broker, job_id, output_path, metadata=metadata, poll_interval=0.01)
+
+    assert open(output_path, encoding='utf-8').read() == ''.join(f"text of page {n}" for n in range(1, 5))
+    assert metadata['pages'] == 4
+    assert metadata['has_errors'] is False
+    assert metadata['distributed']['tasks_by_status'] == {'done': 2}
+    assert broker.get_job(job_id) is None
+
+
+def test_failed_pages_are_flagged_per_page(broker, pdf_path):
+    job_id = publish_pdf(broker, 'no_ocr', pdf_path, pages_per_task=2)
+    finish_job(broker, 'w', failed_pages={2})
+    pages = broker.get_pages(job_id, [1, 2, 3, 4])
+    assert {page_number: failed for page_number, (text, failed) in pages.items()} == \
+        {1: False, 2: True, 3: False, 4: False}
+
+
+def test_expired_lease_is_handed_to_another_worker(broker, pdf_path):
+    job_id = publish_pdf(broker, 'no_ocr', pdf_path, '1-2', pages_per_task=2)
+    lost = broker.lease('dead')
+    time.sleep(1.1)
+    task = broker.lease('alive')
+    assert task['id'] == lost['id'] and task['attempts'] == 2
+    assert broker.complete(task['id'], 'alive', {1: 'a', 2: 'b'})
+    # The late result of the first worker is dropped
+    assert not broker.complete(lost['id'], 'dead', {1: 'x', 2: 'y'})
+    assert broker.get_pages(job_id, [1, 2]) == {1: ('a', False), 2: ('b', False)}
+
+
+def test_task_is_given_up_after_max_attempts(broker, pdf_path):
+    job_id = publish_pdf(broker, 'no_ocr', pdf_path, '3', pages_per_task=1)
+    for worker in ('w1', 'w2'):
+        broker.lease(worker)
+        time.sleep(1.1)
+    assert broker.lease('w3') is None
+    text, failed = broker.get_pages(job_id, [3])[3]
+    assert failed and text.startswith('--- ERROR: Page 3')
+
+
+def test_reduce_fails_fast_without_workers(broker, pdf_path, tmp_path):
+    job_id = publish_pdf(broker, 'no_ocr', pdf_path)
+    start = time.monotonic()
+    with pytest.raises(NoWorkersError):
+        reduce_job(broker, job_id, str(tmp_path / 'out.txt'), poll_interval=0.01, timeout=60)
+    assert time.monotonic() - start < 5
+    assert broker.get_job(job_id) is None
+
+
+def test_workers_without_api_key_skip_genai(broker):
+    stop = threading.Event()
+    thread = threading.Thread(target=run_worker, args=(broker, 'no-key'), kwargs={'stop': stop, 'poll_interval': 0.01})
+    thread.start()
+    try:
+        while not broker.live_workers():
+            time.sleep(0.01)
+        assert broker.live_workers('genai') == []
+        assert broker.live_workers('no_ocr') == ['no-key']
+    finally:
+        stop.set()
+        thread.join()
+
+
+def test_genai_job_never_stores_the_api_key(pdf_path, tmp_path):
+    # A longer lease than the fixture's, so a slow heartbeat on a busy machine does not look like a dead worker
+    broker = SQLiteBroker(str(tmp_path / 'broker'), lease_seconds=10)
+    api_key = 'secret-key-1234'
+    stop = threading.Event()
+    options = {'model': FakeGeminiModel(), 'requests_per_minute': 10 ** 9}
+    thread = threading.Thread(target=run_worker, args=(broker, 'w'),
+                              kwargs={'api_key': api_key, 'stop': stop, 'poll_interval': 0.01, 'method_options': options})
+    thread.start()
+    try:
+        while not broker.live_workers('genai'):
+            time.sleep(0.01)
+        job_id = publish_pdf(broker, 'genai', pdf_path)
+        metadata = {}
+        reduce_job(broker, job_id, str(tmp_path / 'out.txt'), metadata=metadata, poll_interval=0.01, timeout=60)
+    finally:
+        stop.set()
+        thread.join()
+    assert metadata['pages'] == 4 and not metadata['has_errors']
+    # The database and its write-ahead log
+    for path in (tmp_path / 'broker').glob(DATABASE_NAME + '*'):
+        assert api_key.encode() not in path.read_bytes()
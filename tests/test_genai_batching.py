@@ -0,0 +1,116 @@
+import pytest
+from PIL import Image, ImageDraw
+
+import GenAI_unified
+from GenAI_unified import PAGE_MARKER, extract_batch_genai, extract_page_genai, iter_pages_genai, \
+    split_batch_response
+from synthetic import FakeGeminiModel, FakeResponse
+
+
+def marked(*texts):
+    return ''.join(f"{PAGE_MARKER.format(number=number)}\n{text}\n" for number, text in enumerate(texts, start=1))
+
+
+def page_images(count):
+    images = []
+    for number in range(count):
+        image = Image.new('RGB', (200, 200), 'white')
+        ImageDraw.Draw(image).text((20, 20), f"page {number}", fill='black')
+        images.append(image)
+    return images
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_BASE', 0.001)
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_MAX', 0.01)
+
+
+def test_split_on_markers():
+    assert split_batch_response(marked('first', 'second\n\nparagraph', ''), 3) == ['first', 'second\n\nparagraph', '']
+
+
+def test_split_allows_blank_lines_and_spaces_around_markers():
+    text = "\n  <<<PAGE 1>>>  \nfirst\n\n<<<PAGE 2>>>\nsecond"
+    assert split_batch_response(text, 2) == ['first', 'second']
+
+
+@pytest.mark.parametrize('text', [
+    None,
+    'no markers at all',
+    marked('only one'),
+    marked('a', 'b', 'c'),
+    "<<<PAGE 2>>>\nsecond\n<<<PAGE 1>>>\nfirst\n",
+    "<<<PAGE 1>>>\nfirst\n<<<PAGE 1>>>\nagain\n",
+    "Here is the text:\n" + marked('a', 'b'),
+    "<<<PAGE 1>>> first <<<PAGE 2>>> second",
+])
+def test_split_rejects_missing_or_out_of_order_markers(text):
+    assert split_batch_response(text, 2) is None
+
+
+def test_batch_is_one_request():
+    model = FakeGeminiModel()
+    images = page_images(3)
+    texts = extract_batch_genai(images, [4, 5, 6], model, page_deadline=5)
+    assert model.requests == 1
+    # The same texts as one request per page
+    assert texts == [extract_page_genai(image, number, FakeGeminiModel(), page_deadline=5)
+                     for image, number in zip(images, [4, 5, 6])]
+
+
+def test_garbled_batch_falls_back_to_one_page_per_request():
+    model = FakeGeminiModel(garble=True)
+    images = page_images(3)
+    texts = extract_batch_genai(images, [1, 2, 3], model, page_deadline=5)
+    assert model.requests == 1 + 3
+    assert texts == [extract_page_genai(image, number, FakeGeminiModel(), page_deadline=5)
+                     for image, number in zip(images, [1, 2, 3])]
+
+
+def test_rejected_batch_falls_back_to_one_page_per_request():
+    class RejectsBatches(FakeGeminiModel):
+        def generate_content(self, contents, **kwargs):
+            if sum(isinstance(part, dict) for part in contents) > 1:
+                raise ValueError('request too large')
+            return super().generate_content(contents, **kwargs)
+
+    texts = extract_batch_genai(page_images(2), [1, 2], RejectsBatches(), page_deadline=5)
+    assert all(text.startswith('Canned text') for text in texts)
+
+
+def test_batch_that_keeps_failing_becomes_error_pages(monkeypatch):
+    monkeypatch.setattr(GenAI_unified, 'GENAI_MAX_RETRIES', 1)
+
+    class Overloaded:
+        requests = 0
+
+        def generate_content(self, contents, **kwargs):
+            Overloaded.requests += 1
+            raise ConnectionError('overloaded')
+
+    texts = extract_batch_genai(page_images(2), [8, 9], Overloaded(), page_deadline=5)
+    # Retryable errors are not sent again page by page
+    assert Overloaded.requests == 2
+    assert texts == [f"--- ERROR: Exception during extraction for page {number}: overloaded ---" for number in (8, 9)]
+
+
+def test_batches_with_out_of_order_markers_come_out_in_page_order():
+    class Reversed(FakeGeminiModel):
+        # Answers with the pages of a batch in reverse order
+        def generate_content(self, contents, **kwargs):
+            response = super().generate_content(contents, **kwargs)
+            pages = split_batch_response(response.text, sum(isinstance(part, dict) for part in contents))
+            if pages is None:
+                return response
+            return FakeResponse(''.join(f"{PAGE_MARKER.format(number=len(pages) - index)}\n{text}\n"
+                                        for index, text in enumerate(reversed(pages))))
+
+    images = page_images(5)
+    model = Reversed()
+    results = list(iter_pages_genai(list(enumerate(images, start=1)), model, 5, batch_size=2, preprocessing=()))
+    assert [number for number, _ in results] == [1, 2, 3, 4, 5]
+    # The two full batches were sent again page by page; the last page went alone
+    assert model.requests == 2 * 3 + 1
+    assert [text for _, text in results] == [extract_page_genai(image, number, FakeGeminiModel(), page_deadline=5)
+                                             for number, image in enumerate(images, start=1)]
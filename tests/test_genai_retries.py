@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from PIL import Image
+
+import GenAI_unified
+from GenAI_unified import TokenBucket, extract_page_genai, generate_with_retries, get_rate_limiter
+from synthetic import FakeResponse
+
+
+class ApiError(Exception):
+    """Error carrying an HTTP status code, like the Gemini client's errors"""
+
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+
+class ScriptedModel:
+    """Raises the scripted errors in turn, then answers 'ok'"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    def generate_content(self, contents, **kwargs):
+        self.calls.append(kwargs)
+        if self.errors:
+            raise self.errors.pop(0)
+        return FakeResponse('ok')
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_BASE', 0.001)
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_MAX', 0.01)
+
+
+@pytest.mark.parametrize('error', [ApiError(429), ApiError(500), ApiError(503), ConnectionError('reset')])
+def test_retryable_errors_are_retried(error):
+    model = ScriptedModel(error, error)
+    assert generate_with_retries(model, ['prompt']).text == 'ok'
+    assert len(model.calls) == 3
+
+
+@pytest.mark.parametrize('error', [ApiError(400), ApiError(403), ValueError('bad request')])
+def test_other_errors_are_not_retried(error):
+    model = ScriptedModel(error)
+    with pytest.raises(type(error)):
+        generate_with_retries(model, ['prompt'])
+    assert len(model.calls) == 1
+
+
+def test_retries_run_out():
+    model = ScriptedModel(*[ApiError(429)] * 4)
+    with pytest.raises(ApiError):
+        generate_with_retries(model, ['prompt'], max_retries=2)
+    assert len(model.calls) == 3
+
+
+def test_passed_deadline_sends_nothing():
+    model = ScriptedModel()
+    with pytest.raises(TimeoutError):
+        generate_with_retries(model, ['prompt'], deadline=time.monotonic() - 1)
+    assert model.calls == []
+
+
+def test_backoff_never_sleeps_past_the_deadline(monkeypatch):
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_BASE', 60.0)
+    monkeypatch.setattr(GenAI_unified, 'GENAI_BACKOFF_MAX', 60.0)
+    monkeypatch.setattr(GenAI_unified.random, 'uniform', lambda low, high: high)
+    model = ScriptedModel(ApiError(503))
+    start = time.monotonic()
+    with pytest.raises(ApiError):
+        generate_with_retries(model, ['prompt'], deadline=start + 1)
+    assert time.monotonic() - start < 1
+    # The time left is passed on as the request timeout
+    assert 0 < model.calls[0]['request_options']['timeout'] <= 1
+
+
+def test_rate_limit_wait_stops_at_the_deadline():
+    limiter = TokenBucket(1)
+    assert limiter.acquire()
+    model = ScriptedModel()
+    with pytest.raises(TimeoutError):
+        generate_with_retries(model, ['prompt'], rate_limiter=limiter, deadline=time.monotonic() + 0.1)
+    assert model.calls == []
+
+
+def test_failed_page_becomes_an_error_page():
+    image = Image.new('RGB', (200, 200), 'white')
+    text = extract_page_genai(image, 3, ScriptedModel(ApiError(400)), page_deadline=5)
+    assert text == "--- ERROR: Exception during extraction for page 3: HTTP 400 ---"
+
+
+def test_response_without_text_becomes_an_error_page():
+    class EmptyModel:
+        def generate_content(self, contents, **kwargs):
+            return type('Response', (), {'parts': []})()
+
+    image = Image.new('RGB', (200, 200), 'white')
+    assert extract_page_genai(image, 7, EmptyModel(), page_deadline=5) == \
+        "--- ERROR: Could not parse response for page 7 ---"
+
+
+def test_rate_limiters_are_shared_per_key_and_bounded(monkeypatch):
+    monkeypatch.setattr(GenAI_unified, 'GENAI_MAX_RATE_LIMITERS', 2)
+    monkeypatch.setattr(GenAI_unified, '_rate_limiters', GenAI_unified.OrderedDict())
+    first = get_rate_limiter('key-a', 60)
+    assert get_rate_limiter('key-a', 60) is first
+    get_rate_limiter('key-b', 60)
+    get_rate_limiter('key-a', 60)
+    get_rate_limiter('key-c', 60)
+    assert len(GenAI_unified._rate_limiters) == 2
+    # key-b was the least recently used
+    assert get_rate_limiter('key-a', 60) is first
+    assert ('key-b', 60) not in GenAI_unified._rate_limiters
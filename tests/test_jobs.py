@@ -0,0 +1,100 @@
+import threading
+import time
+
+import pytest
+
+from jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobManager, JobQueueFull
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(pool_sizes={'ocr': 1}, max_queued=2)
+    yield manager
+    manager.shutdown()
+
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished:
+        assert time.monotonic() < deadline, job.to_dict()
+        job.wait_for_update(len(job.pages), job.state(), 0.05)
+
+
+def process(pdf_path, pages=2, progress_callback=None, page_callback=None, metadata=None, gate=None):
+    # Stand-in processing function with the callbacks of the process_*_pdf functions
+    if gate is not None:
+        gate.wait(5)
+    for page_number in range(1, pages + 1):
+        page_callback(page_number, f"text of {pdf_path} page {page_number}")
+        progress_callback(page_number, pages)
+    metadata['pages'] = pages
+
+
+def test_submitted_job_reports_pages_and_progress(manager):
+    job = manager.submit('ocr', process, 'a.pdf', pages=3, output_filename='a.txt', files=('a.pdf',))
+    wait_until_finished(job)
+    assert job.status == JOB_DONE
+    assert (job.pages_done, job.pages_total) == (3, 3)
+    assert job.pages == [(n, f"text of a.pdf page {n}") for n in (1, 2, 3)]
+    assert job.to_dict()['output_filename'] == 'a.txt'
+    assert job.metadata == {'pages': 3}
+    assert manager.get(job.id) is job
+
+
+def test_failed_job_keeps_the_error(manager):
+    def fail(progress_callback=None, page_callback=None, metadata=None):
+        raise ValueError('damaged PDF')
+
+    job = manager.submit('ocr', fail)
+    wait_until_finished(job)
+    assert job.status == JOB_FAILED
+    assert job.error == 'damaged PDF'
+    assert job.to_dict()['output_filename'] is None
+
+
+def test_queue_is_bounded_per_method_and_files_stay_in_use(manager):
+    gate = threading.Event()
+    first = manager.submit('ocr', process, 'a.pdf', gate=gate, output_filename='a.txt', files=('a.pdf',))
+    second = manager.submit('ocr', process, 'b.pdf', gate=gate, output_filename='b.txt', files=('b.pdf',))
+    with pytest.raises(JobQueueFull):
+        manager.submit('ocr', process, 'c.pdf')
+    # Other methods have their own pool and queue
+    other = manager.submit('no_ocr', process, 'd.pdf')
+    assert manager.files_in_use() == {'a.pdf', 'a.txt', 'b.pdf', 'b.txt'}
+    assert first.status in (JOB_QUEUED, JOB_RUNNING) and second.status == JOB_QUEUED
+
+    gate.set()
+    for job in (first, second, other):
+        wait_until_finished(job)
+    assert manager.files_in_use() == set()
+
+
+def test_retry_runs_the_same_call_again(manager):
+    calls = []
+
+    def flaky(pdf_path, progress_callback=None, page_callback=None, metadata=None):
+        calls.append(pdf_path)
+        if len(calls) == 1:
+            raise RuntimeError('worker died')
+        progress_callback(4, 4)
+
+    job = manager.submit('ocr', flaky, 'a.pdf', output_filename='a.txt', files=('a.pdf',))
+    wait_until_finished(job)
+    assert job.status == JOB_FAILED
+
+    retry = manager.retry(job.id)
+    wait_until_finished(retry)
+    assert retry.status == JOB_DONE
+    assert calls == ['a.pdf', 'a.pdf']
+    assert (retry.retry_of, retry.output_filename, retry.files) == (job.id, 'a.txt', ('a.pdf',))
+    assert manager.retry('unknown') is None
+
+
+def test_finished_jobs_are_forgotten_after_the_retention_period():
+    manager = JobManager(retention_seconds=0)
+    job = manager.submit('ocr', process, 'a.pdf')
+    wait_until_finished(job)
+    time.sleep(0.01)
+    manager.submit('ocr', process, 'b.pdf')
+    assert manager.get(job.id) is None
+    manager.shutdown()
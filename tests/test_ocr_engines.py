@@ -0,0 +1,22 @@
+import pytest
+
+import Auto_unified
+import OCR_unified
+import ocr_engines
+from result_cache import make_cache_key
+
+
+def cache_key(monkeypatch, engine, options=OCR_unified.get_cache_options):
+    monkeypatch.setattr(OCR_unified, 'OCR_ENGINE', engine)
+    return make_cache_key('pdf-hash', 'ocr', 'txt', **options())
+
+
+@pytest.mark.parametrize('options', [OCR_unified.get_cache_options, Auto_unified.get_cache_options])
+def test_engines_do_not_share_cache_entries(monkeypatch, options):
+    assert cache_key(monkeypatch, 'tesserocr', options) != cache_key(monkeypatch, 'pytesseract', options)
+
+
+def test_auto_engine_is_keyed_by_the_engine_it_resolves_to(monkeypatch):
+    resolved = 'tesserocr' if ocr_engines.tesserocr is not None else 'pytesseract'
+    assert ocr_engines.resolve_engine_name('auto') == resolved
+    assert cache_key(monkeypatch, 'auto') == cache_key(monkeypatch, resolved)
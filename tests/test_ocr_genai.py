@@ -0,0 +1,68 @@
+import pytest
+
+from OCR_GenAI_unified import iter_escalated_pages, route_page, summarize_routing
+from synthetic import FakeGeminiModel, make_digital_pdf
+
+BANGLA_PAGE = "--- Page 1 ---\nসরকারি পরিপত্র নম্বর ১২\n\n"
+LATIN_LOOKALIKE_PAGE = "--- Page 1 ---\nTsl8l3 ntAt3 সরকারি\n\n"
+
+
+@pytest.mark.parametrize('page_text, confidences, language, route, reason', [
+    (BANGLA_PAGE, [92, 88, 95], 'bangla', 'ocr', 'confident'),
+    (BANGLA_PAGE, [62, 58, 71], 'bangla', 'genai', 'low confidence'),
+    (LATIN_LOOKALIKE_PAGE, [90, 91], 'bangla', 'genai', 'few Bangla letters'),
+    # Latin letters are expected on English and mixed pages
+    (LATIN_LOOKALIKE_PAGE, [90, 91], 'mixed', 'ocr', 'confident'),
+    ("--- Page 1 ---\n\n\n", [], 'english', 'genai', 'no words'),
+    ("--- Page 1 ---\n--- ERROR: tesseract failed ---\n\n", None, None, 'genai', 'ocr error'),
+])
+def test_route_page(page_text, confidences, language, route, reason):
+    decision = route_page(1, page_text, confidences, language)
+    assert (decision['route'], decision['reason']) == (route, reason)
+
+
+def test_route_page_measurements_and_thresholds():
+    decision = route_page(3, BANGLA_PAGE, [90, 60, 75], 'bangla')
+    assert decision == {'page': 3, 'route': 'ocr', 'reason': 'confident', 'language': 'bangla', 'words': 3,
+                        'mean_confidence': 75.0, 'low_confidence_words': 1, 'bangla_ratio': 1.0}
+    assert route_page(3, BANGLA_PAGE, [90, 60, 75], 'bangla', min_confidence=80)['reason'] == 'low confidence'
+    assert route_page(1, LATIN_LOOKALIKE_PAGE, [90, 91], 'bangla', min_bangla_ratio=0.2)['route'] == 'ocr'
+
+
+def ocr_pages(count):
+    return [(n, f"--- Page {n} ---\nOCR text {n}\n\n") for n in range(1, count + 1)]
+
+
+def test_only_escalated_pages_go_to_gemini(tmp_path):
+    pdf_path = make_digital_pdf(str(tmp_path / 'a.pdf'), 4)
+    stats = {'page_confidences': {1: [95], 2: [40], 3: [93], 4: [35, 45]},
+             'page_languages': {n: 'english' for n in range(1, 5)}}
+    model = FakeGeminiModel(latency=0.01)
+    routing = []
+    pages = list(iter_escalated_pages(ocr_pages(4), stats, pdf_path, model, max_in_flight=2, routing=routing))
+
+    assert [page_number for page_number, _ in pages] == [1, 2, 3, 4]
+    assert pages[0][1] == "--- Page 1 ---\nOCR text 1\n\n" and pages[2][1] == "--- Page 3 ---\nOCR text 3\n\n"
+    assert all(text.startswith(f"--- Page {n} ---\nCanned text") for n, text in (pages[1], pages[3]))
+    assert model.requests == 2
+    assert [decision['route'] for decision in routing] == ['ocr', 'genai', 'ocr', 'genai']
+
+    summary = summarize_routing(routing)
+    assert summary['escalated'] == 2
+    assert summary['reasons'] == {'confident': 2, 'low confidence': 2}
+    assert summary['confidence_histogram'] == {'40-50': 2, '90-100': 2}
+
+
+class FailingModel:
+    def generate_content(self, contents, **kwargs):
+        raise ValueError('content blocked')
+
+
+def test_page_keeps_its_ocr_text_when_gemini_fails(tmp_path):
+    pdf_path = make_digital_pdf(str(tmp_path / 'a.pdf'), 1)
+    stats = {'page_confidences': {1: [20]}, 'page_languages': {1: 'english'}}
+    routing = []
+    pages = list(iter_escalated_pages(ocr_pages(1), stats, pdf_path, FailingModel(), routing=routing))
+    assert pages == [(1, "--- Page 1 ---\nOCR text 1\n\n")]
+    assert (routing[0]['route'], routing[0]['genai_failed']) == ('ocr', True)
+    assert summarize_routing(routing)['genai_failed'] == 1
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import time
+
+import pytest
+
+import OCR_unified
+
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                                reason='the stand-in OCR function reaches the workers by forking')
+
+CRASH_MARKER = None
+
+
+def crash_once_on_page_3(image, page_number, lang_config, preprocessing, confidences):
+    # Kill the worker process the first time page 3 is OCR'd, like a tesseract segfault
+    if page_number == 3 and not os.path.exists(CRASH_MARKER):
+        open(CRASH_MARKER, 'w').close()
+        os._exit(1)
+    return stand_in_ocr(image, page_number, lang_config, preprocessing, confidences)
+
+
+def always_crash_on_page_3(image, page_number, lang_config, preprocessing, confidences):
+    if page_number == 3:
+        # Late enough that the other pages are done and only page 3 is lost each time
+        time.sleep(0.5)
+        os._exit(1)
+    return stand_in_ocr(image, page_number, lang_config, preprocessing, confidences)
+
+
+def stand_in_ocr(image, page_number, lang_config, preprocessing, confidences):
+    stats = {'tesseract_seconds': 0.0, 'preprocess_seconds': 0.0, 'detection_seconds': 0.0,
+             'language': None, 'detected_by': None}
+    return f"--- Page {page_number} ---\n{image}\n\n", stats
+
+
+@pytest.fixture
+def ocr_pool(monkeypatch, tmp_path):
+    global CRASH_MARKER
+    CRASH_MARKER = str(tmp_path / 'crashed')
+    monkeypatch.setattr(OCR_unified, 'OCR_ENGINE', 'pytesseract')
+    OCR_unified.shutdown_ocr_pools()
+    yield
+    OCR_unified.shutdown_ocr_pools()
+
+
+def ocr(pages):
+    return list(OCR_unified.iter_ocr_pages(((n, f"image {n}") for n in pages), 'eng', len(pages), workers=2))
+
+
+def test_crashed_worker_pages_are_resubmitted(ocr_pool, monkeypatch):
+    monkeypatch.setattr(OCR_unified, '_ocr_page_timed', crash_once_on_page_3)
+    results = ocr(range(1, 9))
+    assert results == [(n, f"--- Page {n} ---\nimage {n}\n\n") for n in range(1, 9)]
+    # The broken pool was replaced, so the next job runs on a working pool
+    assert ocr([1, 2]) == [(1, "--- Page 1 ---\nimage 1\n\n"), (2, "--- Page 2 ---\nimage 2\n\n")]
+
+
+def test_page_that_keeps_crashing_becomes_an_error_page(ocr_pool, monkeypatch):
+    monkeypatch.setattr(OCR_unified, '_ocr_page_timed', always_crash_on_page_3)
+    results = dict(ocr(range(1, 7)))
+    assert results[3] == OCR_unified._error_page_text(3)
+    assert all(results[n] == f"--- Page {n} ---\nimage {n}\n\n" for n in (1, 2, 4, 5, 6))
@@ -0,0 +1,109 @@
+import fitz
+import pytest
+
+from page_dedup import PageDeduplicator
+from page_source import render_page_pymupdf
+from result_cache import ResultCache
+from synthetic import SAMPLE_ENGLISH
+
+
+def render(footer='', fontsize=10, body=True, dpi=300):
+    # A page with a full body of text (or none) and a footer line
+    doc = fitz.open()
+    page = doc.new_page()
+    if body:
+        for line in range(28):
+            page.insert_text((40, 50 + 24 * line), SAMPLE_ENGLISH.format(page=1)[:90], fontsize=10)
+    if footer:
+        page.insert_text((40, 760), footer, fontsize=fontsize)
+    image = render_page_pymupdf(page, dpi)
+    doc.close()
+    return image
+
+
+def run(pages, page_store=None):
+    # Process the pages the deduplicator passes on, returning every page's text and the summary
+    dedup = PageDeduplicator('test', lambda page_number: '<blank>', page_store=page_store)
+    processed = ((page_number, f"text of page {page_number}") for page_number, _ in dedup.filter(enumerate(pages, 1)))
+    return dict(dedup.merge(processed)), dedup.summary()
+
+
+def test_identical_pages_reuse_text():
+    texts, summary = run([render('Ref 1234'), render('Ref 1234')])
+    assert texts == {1: 'text of page 1', 2: 'text of page 1'}
+    assert summary['duplicate_pages'] == {'2': 1}
+
+
+@pytest.mark.parametrize('first, second, fontsize', [
+    ('Ref 1234', 'Ref 1284', 8),
+    ('form', 'farm', 6),
+    ('form', 'farm', 10),
+])
+def test_pages_differing_in_one_character_are_processed(first, second, fontsize):
+    texts, summary = run([render(first, fontsize), render(second, fontsize)])
+    assert texts == {1: 'text of page 1', 2: 'text of page 2'}
+    assert summary['pages_skipped'] == 0
+
+
+@pytest.mark.parametrize('footer, fontsize', [('Annex', 10), ('Annex', 8), ('Note', 10)])
+def test_short_text_page_is_not_blank(footer, fontsize):
+    texts, summary = run([render(footer, fontsize, body=False)])
+    assert texts == {1: 'text of page 1'}
+    assert summary['blank_pages'] == []
+
+
+@pytest.mark.parametrize('footer', ['', '7'])
+def test_empty_and_page_number_only_pages_are_blank(footer):
+    texts, summary = run([render(footer, body=False)])
+    assert texts == {1: '<blank>'}
+    assert summary['blank_pages'] == [1]
+
+
+def test_page_store_only_reuses_identical_pages(tmp_path):
+    store = ResultCache(str(tmp_path))
+    run([render('Ref 1234')], page_store=store)
+    texts, summary = run([render('Ref 1234'), render('Ref 1284', 8), render('Ref 1284')], page_store=store)
+    assert texts[1] == 'text of page 1'
+    assert summary['stored_pages'] == [1]
+    assert texts[2] == 'text of page 2' and texts[3] == 'text of page 3'
+
+
+def test_merge_puts_skipped_pages_back_in_order():
+    pages = [render(body=False), render('Ref 1234'), render(body=False), render('Ref 1234'), render('Ref 5678')]
+    dedup = PageDeduplicator('test', lambda page_number: f'<blank {page_number}>',
+                             copy_text=lambda text, from_page, page_number: text.replace(str(from_page), str(page_number)))
+    processed = [(page_number, f"text of page {page_number}") for page_number, _ in dedup.filter(enumerate(pages, 1))]
+    assert [page_number for page_number, _ in processed] == [2, 5]
+
+    progress = []
+    merged = list(dedup.merge(processed, lambda done, total: progress.append((done, total)), total=5))
+    assert merged == [(1, '<blank 1>'), (2, 'text of page 2'), (3, '<blank 3>'), (4, 'text of page 4'),
+                      (5, 'text of page 5')]
+    assert progress == [(n, 5) for n in range(1, 6)]
+    assert dedup.summary()['pages_skipped'] == 3
+
+
+def test_checks_can_be_turned_off():
+    pages = [render(body=False), render('Ref 1234'), render('Ref 1234')]
+    dedup = PageDeduplicator('test', lambda page_number: '<blank>', skip_blank=False, reuse_duplicates=False)
+    assert [page_number for page_number, _ in dedup.filter(enumerate(pages, 1))] == [1, 2, 3]
+
+
+def test_failed_pages_are_not_stored(tmp_path):
+    store = ResultCache(str(tmp_path))
+    dedup = PageDeduplicator('test', lambda page_number: '<blank>', page_store=store,
+                             is_failed=lambda page_number, text: text.startswith('[Error'))
+    list(dedup.merge((page_number, '[Error processing page]') for page_number, _ in dedup.filter([(1, render('Ref 1234'))])))
+    texts, summary = run([render('Ref 1234')], page_store=store)
+    assert texts == {1: 'text of page 1'}
+    assert summary['stored_pages'] == []
+
+
+def test_stored_pages_depend_on_the_method_options(tmp_path):
+    store = ResultCache(str(tmp_path))
+    stored = []
+    for options in ({'dpi': 300}, {'dpi': 300}, {'dpi': 400}):
+        dedup = PageDeduplicator('test', lambda page_number: '<blank>', page_store=store, options=options)
+        list(dedup.merge((page_number, 'text') for page_number, _ in dedup.filter([(1, render('Ref 1234'))])))
+        stored.append(dedup.summary()['stored_pages'])
+    assert stored == [[], [1], []]
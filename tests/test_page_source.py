@@ -0,0 +1,41 @@
+import pytest
+
+from page_source import _page_windows, iter_pdf_pages, parse_page_ranges, select_pages
+from synthetic import make_digital_pdf
+
+
+def test_parse_page_ranges():
+    assert parse_page_ranges('1-5,12,20-') == [(1, 5), (12, 12), (20, None)]
+    assert parse_page_ranges(' -3 , 7 ,,') == [(1, 3), (7, 7)]
+    assert parse_page_ranges('4-4') == [(4, 4)]
+
+
+@pytest.mark.parametrize('spec', ['', ' , ', '0', '5-2', 'a', '1-b', '2--4'])
+def test_malformed_page_ranges_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_page_ranges(spec)
+
+
+def test_select_pages_merges_ranges_and_drops_pages_past_the_end():
+    assert select_pages(None, 3) == [1, 2, 3]
+    assert select_pages('8-,2,1-3,2', 10) == [1, 2, 3, 8, 9, 10]
+    assert select_pages('4-20', 6) == [4, 5, 6]
+    assert select_pages([5, 0, 2, 2, 99], 6) == [2, 5]
+
+
+@pytest.mark.parametrize('pages', ['7-', '12', [0, 8]])
+def test_selection_without_any_existing_page_is_rejected(pages):
+    with pytest.raises(ValueError, match='6-page document'):
+        select_pages(pages, 6)
+
+
+def test_windows_split_at_gaps_size_and_resolution_changes():
+    assert _page_windows([1, 2, 3, 5, 6], window=2, dpi=300) == [(1, 2, 300), (3, 3, 300), (5, 6, 300)]
+    assert _page_windows([1, 2, 3], window=5, dpi=300, page_dpis={2: 400}) == [
+        (1, 1, 300), (2, 2, 400), (3, 3, 300)]
+
+
+def test_only_selected_pages_are_rendered(tmp_path):
+    pdf_path = make_digital_pdf(str(tmp_path / 'a.pdf'), 5)
+    pages = iter_pdf_pages(pdf_path, dpi=50, window=2, page_numbers=select_pages('2,4-', 5), renderer='pymupdf')
+    assert [page_number for page_number, image in pages] == [2, 4, 5]
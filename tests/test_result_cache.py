@@ -0,0 +1,69 @@
+import os
+import time
+
+from result_cache import ResultCache, hash_file, make_cache_key
+
+
+def age(cache, kind, key, seconds):
+    # Make an entry look last used this many seconds ago
+    path = cache._path(kind, key)
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_results_and_pages_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    output = tmp_path / 'out.txt'
+    output.write_text('--- Page 1 ---\nসরকারি পরিপত্র', encoding='utf-8')
+    cache.put_result('a' * 64, str(output))
+    cache.put_page('b' * 64, 'page text')
+
+    copy = tmp_path / 'copy.txt'
+    assert cache.get_result('a' * 64, str(copy))
+    assert copy.read_text(encoding='utf-8') == '--- Page 1 ---\nসরকারি পরিপত্র'
+    assert cache.get_page('b' * 64) == 'page text'
+    assert not cache.get_result('c' * 64, str(tmp_path / 'missing.txt'))
+    assert cache.get_page('c' * 64) is None
+
+
+def test_cache_keys_depend_on_every_part_but_not_option_order(tmp_path):
+    pdf = tmp_path / 'a.pdf'
+    pdf.write_bytes(b'%PDF-1.4 test')
+    pdf_hash = hash_file(str(pdf))
+    key = make_cache_key(pdf_hash, 'ocr', 'txt', dpi=300, lang='ben+eng')
+    assert key == make_cache_key(pdf_hash, 'ocr', 'txt', lang='ben+eng', dpi=300)
+    assert key != make_cache_key(pdf_hash, 'ocr', 'docx', dpi=300, lang='ben+eng')
+    assert key != make_cache_key(pdf_hash, 'ocr', 'txt', dpi=200, lang='ben+eng')
+
+
+def test_entries_expire_after_the_ttl(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), ttl_seconds=60)
+    cache.put_page('a' * 64, 'old')
+    cache.put_page('b' * 64, 'fresh')
+    age(cache, 'pages', 'a' * 64, 120)
+    assert cache.get_page('a' * 64) is None
+    assert not os.path.exists(cache._path('pages', 'a' * 64))
+    assert cache.get_page('b' * 64) == 'fresh'
+
+
+def test_eviction_removes_expired_then_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=250, ttl_seconds=3600)
+    for key, seconds in (('a', 400), ('b', 300), ('c', 200), ('d', 7200)):
+        cache.put_page(key * 64, 'x' * 100)
+        age(cache, 'pages', key * 64, seconds)
+    # A hit makes 'a' the most recently used entry
+    assert cache.get_page('a' * 64) == 'x' * 100
+
+    cache.evict()
+    # 'd' expired; of the 300 bytes left, the least recently used 'b' goes
+    assert [key for key in 'abcd' if os.path.exists(cache._path('pages', key * 64))] == ['a', 'c']
+
+
+def test_eviction_runs_when_entries_are_stored(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'), max_bytes=150)
+    cache.put_page('a' * 64, 'x' * 100)
+    age(cache, 'pages', 'a' * 64, 10)
+    cache._last_evict = 0
+    cache.put_page('b' * 64, 'x' * 100)
+    assert cache.get_page('a' * 64) is None
+    assert cache.get_page('b' * 64) == 'x' * 100
@@ -0,0 +1,91 @@
+import hashlib
+import os
+import time
+
+import fitz
+import pytest
+
+from synthetic import make_digital_pdf
+from upload_spool import (SPOOL_PREFIX, FolderCleaner, InvalidUpload, SpoolFile, cleanup_folder,
+                          validate_pdf)
+
+
+def make_entry(folder, name, size, age_seconds=0):
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    then = time.time() - age_seconds
+    os.utime(path, (then, then))
+    return path
+
+
+def test_spool_file_hashes_what_is_written(tmp_path):
+    spool = SpoolFile(str(tmp_path))
+    spool.write(b'%PDF-1.4 ')
+    spool.write(b'rest of the upload')
+    spool.seek(0)
+    assert spool.read() == b'%PDF-1.4 rest of the upload'
+    assert spool.size == 27
+    assert spool.sha256 == hashlib.sha256(b'%PDF-1.4 rest of the upload').hexdigest()
+    assert os.path.basename(spool.path).startswith(SPOOL_PREFIX)
+
+    target = str(tmp_path / 'upload.pdf')
+    spool.move_to(target)
+    spool.discard()
+    assert os.listdir(tmp_path) == ['upload.pdf']
+
+
+def test_unclaimed_spool_files_are_discarded(tmp_path):
+    discarded = SpoolFile(str(tmp_path))
+    claimed = SpoolFile(str(tmp_path))
+    claimed.claim()
+    discarded.discard()
+    claimed.discard()
+    assert os.listdir(tmp_path) == [os.path.basename(claimed.path)]
+
+
+def test_validate_pdf_accepts_pdfs(tmp_path):
+    assert validate_pdf(make_digital_pdf(str(tmp_path / 'a.pdf'), 3)) == 3
+
+
+@pytest.mark.parametrize('content, message', [
+    (b'PK\x03\x04 a zip archive', 'not a PDF'),
+    (b'%PDF-1.4\n garbage without any objects', 'could not be opened'),
+])
+def test_validate_pdf_rejects_other_files(tmp_path, content, message):
+    path = tmp_path / 'upload.pdf'
+    path.write_bytes(content)
+    with pytest.raises(InvalidUpload, match=message):
+        validate_pdf(str(path))
+
+
+def test_validate_pdf_rejects_password_protected_pdfs(tmp_path):
+    doc = fitz.open(make_digital_pdf(str(tmp_path / 'a.pdf'), 1))
+    doc.save(str(tmp_path / 'locked.pdf'), encryption=fitz.PDF_ENCRYPT_AES_256, user_pw='secret', owner_pw='owner')
+    doc.close()
+    with pytest.raises(InvalidUpload, match='Password-protected'):
+        validate_pdf(str(tmp_path / 'locked.pdf'))
+
+
+def test_cleanup_removes_old_entries_then_oldest_until_under_the_size_limit(tmp_path):
+    folder = str(tmp_path)
+    make_entry(folder, 'expired.pdf', 10, age_seconds=7200)
+    make_entry(folder, 'old.pdf', 100, age_seconds=300)
+    make_entry(folder, 'older_but_in_use.pdf', 100, age_seconds=400)
+    make_entry(folder, 'new.pdf', 100, age_seconds=100)
+    make_entry(folder, f'{SPOOL_PREFIX}upload', 100, age_seconds=500)
+
+    removed = cleanup_folder(folder, max_age_seconds=3600, max_bytes=350, keep={'older_but_in_use.pdf'})
+    assert removed == 2
+    # Spool files may belong to an upload in progress, so only their age removes them
+    assert sorted(os.listdir(folder)) == ['new.pdf', 'older_but_in_use.pdf', f'{SPOOL_PREFIX}upload']
+
+
+def test_folder_cleaner_runs_at_most_once_per_interval(tmp_path):
+    folder = str(tmp_path)
+    cleaner = FolderCleaner(folder, max_age_seconds=60, interval=300)
+    make_entry(folder, 'first.pdf', 10, age_seconds=120)
+    assert cleaner.maybe_run(keep=lambda: set()) == 1
+    make_entry(folder, 'second.pdf', 10, age_seconds=120)
+    assert cleaner.maybe_run() == 0
+    assert os.listdir(folder) == ['second.pdf']
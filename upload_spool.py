@@ -0,0 +1,261 @@
+"""
+Streaming uploads to per-upload spool files
+
+Werkzeug writes every uploaded file part through a stream it gets from the
+request. SpoolingRequest hands it a SpoolFile instead of its default
+temporary file: a uniquely named file in the spool folder that hashes the
+data as it is written. The upload is on disk and its SHA-256 known as soon
+as the request body has been read, without a second copy or a second pass.
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+import fitz  # PyMuPDF
+from flask import Request, current_app
+
+# Name prefix of spool files; requests still receiving them are never cut short by the size limit
+SPOOL_PREFIX = 'spool_'
+# Bytes at the start of a file searched for the PDF header
+PDF_HEADER_WINDOW = 1024
+# Minimum seconds between folder cleanups triggered by uploads
+CLEANUP_INTERVAL = 300
+
+
+class InvalidUpload(Exception):
+    """Raised when an uploaded file is not a usable PDF"""
+
+
+class SpoolFile:
+    """
+    Writable and readable upload file that hashes what is written to it
+
+    Args:
+        spool_dir: Folder the file is created in
+        suffix: File name suffix
+    """
+
+    def __init__(self, spool_dir, suffix='.upload'):
+        os.makedirs(spool_dir, exist_ok=True)
+        self.path = os.path.join(spool_dir, f"{SPOOL_PREFIX}{uuid.uuid4().hex}{suffix}")
+        self.size = 0
+        self.claimed = False
+        self._digest = hashlib.sha256()
+        self._file = open(self.path, 'w+b')
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def write(self, data):
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name):
+        # read, readline, seek, tell, flush, ... go to the file itself
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+    def close(self):
+        self._file.close()
+
+    def move_to(self, path):
+        """Close the file and move it to path; it is no longer removed with the request"""
+        self._file.close()
+        os.replace(self.path, path)
+        self.path = path
+        self.claimed = True
+        return path
+
+    def claim(self):
+        """Close the file and keep it in place after the request; returns its path"""
+        self._file.close()
+        self.claimed = True
+        return self.path
+
+    def discard(self):
+        """Close and remove the file unless it was claimed"""
+        self._file.close()
+        if not self.claimed:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class SpoolingRequest(Request):
+    """
+    Flask request that streams uploaded files to SpoolFiles in app.config['UPLOAD_FOLDER']
+
+    Files still unclaimed when the request ends are removed by discard_spool_files.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = SpoolFile(current_app.config['UPLOAD_FOLDER'])
+        if not hasattr(self, 'spool_files'):
+            self.spool_files = []
+        self.spool_files.append(spool)
+        return spool
+
+
+def discard_spool_files(request):
+    """Remove the spool files of a finished request that were neither claimed nor moved"""
+    for spool in getattr(request, 'spool_files', ()):
+        spool.discard()
+
+
+def save_upload(file, path):
+    """
+    Save an uploaded file to path, moving its spool file instead of copying it when possible
+
+    Returns:
+        SHA-256 of the file, or None when it was not spooled
+    """
+    if isinstance(file.stream, SpoolFile):
+        file.stream.move_to(path)
+        return file.stream.sha256
+    file.save(path)
+    return None
+
+
+def validate_pdf(path):
+    """
+    Check that a file is a PDF that can be opened, before any work is queued for it
+
+    Args:
+        path: Path to the file
+
+    Returns:
+        Number of pages
+
+    Raises:
+        InvalidUpload: If the header is missing, the file is damaged or encrypted, or has no pages
+    """
+    with open(path, 'rb') as f:
+        if b'%PDF-' not in f.read(PDF_HEADER_WINDOW):
+            raise InvalidUpload('The file is not a PDF')
+    try:
+        with fitz.open(path, filetype='pdf') as doc:
+            if doc.needs_pass:
+                raise InvalidUpload('Password-protected PDFs are not supported')
+            page_count = len(doc)
+    except InvalidUpload:
+        raise
+    except Exception as e:
+        raise InvalidUpload(f'The PDF could not be opened: {e}')
+    if not page_count:
+        raise InvalidUpload('The PDF has no pages')
+    return page_count
+
+
+def _entry_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _remove_entry(path):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+    except OSError:
+        pass
+
+
+def cleanup_folder(folder, max_age_seconds=None, max_bytes=None, keep=()):
+    """
+    Remove old uploads, spool files and results from a folder
+
+    Entries (files, or folders such as batch uploads) older than
+    max_age_seconds are removed first, then the least recently modified
+    ones until the folder is under max_bytes. Spool files are only removed
+    by age, since they may belong to an upload in progress.
+
+    Args:
+        folder: Folder to clean
+        max_age_seconds: Maximum age since last modification (None = no limit)
+        max_bytes: Size limit for the whole folder (None = no limit)
+        keep: Names of entries that must not be removed (files of unfinished jobs)
+
+    Returns:
+        Number of entries removed
+    """
+    now = time.time()
+    keep = set(keep)
+    entries = []
+    total = 0
+    removed = 0
+    try:
+        names = os.listdir(folder)
+    except OSError:
+        return 0
+    for name in names:
+        path = os.path.join(folder, name)
+        try:
+            mtime = os.path.getmtime(path)
+            size = _entry_size(path)
+        except OSError:
+            continue
+        total += size
+        if name in keep:
+            continue
+        if max_age_seconds and now - mtime > max_age_seconds:
+            _remove_entry(path)
+            total -= size
+            removed += 1
+            continue
+        if not name.startswith(SPOOL_PREFIX):
+            entries.append((mtime, size, path))
+
+    if max_bytes and total > max_bytes:
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            _remove_entry(path)
+            total -= size
+            removed += 1
+    return removed
+
+
+class FolderCleaner:
+    """
+    Runs cleanup_folder at most once per interval, however often it is asked to
+
+    Args:
+        folder: Folder to clean
+        max_age_seconds: See cleanup_folder
+        max_bytes: See cleanup_folder
+        interval: Minimum seconds between two cleanups
+    """
+
+    def __init__(self, folder, max_age_seconds=None, max_bytes=None, interval=CLEANUP_INTERVAL):
+        self.folder = folder
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._last_run = 0
+        self._lock = threading.Lock()
+
+    def maybe_run(self, keep=()):
+        """Clean the folder if the interval has passed; keep may be a callable returning the names"""
+        with self._lock:
+            if time.time() - self._last_run < self.interval:
+                return 0
+            self._last_run = time.time()
+            return cleanup_folder(self.folder, self.max_age_seconds, self.max_bytes,
+                                  keep() if callable(keep) else keep)
@@ -0,0 +1,165 @@
+"""
+Worker process for distributed processing
+
+Usage:
+    python worker.py <broker-folder> --methods ocr,genai --ocr-workers 1
+
+Leases page tasks from a broker folder (see broker.py), runs the job's
+processing method on the pages of each task and stores their text. Start
+one worker per CPU core (or per Gemini quota) on as many hosts as needed;
+every host must mount the broker folder. Methods that need an API key
+(genai, ocr+genai) are only served by workers given one; the broker never
+holds keys. While a task runs, a heartbeat thread renews its lease; if the
+worker dies, the lease runs out and another worker takes the task over.
+SIGTERM and Ctrl+C stop the worker after the task it is working on.
+"""
+import argparse
+import os
+import signal
+import socket
+import tempfile
+import threading
+from broker import SQLiteBroker
+from methods import get_method, method_names, preload
+import metrics
+
+logger = metrics.get_logger(__name__)
+
+# Seconds to wait before asking the broker again when there is no task
+POLL_INTERVAL = 1.0
+
+
+def run_task(broker, task, api_key=None, ocr_workers=1, method_options=None):
+    """
+    Run the processing method of a leased task on its pages
+
+    Args:
+        broker: SQLiteBroker the task was leased from
+        task: Task dict returned by broker.lease
+        api_key: API key for methods that need one
+        ocr_workers: OCR processes the method may use for this task
+        method_options: Extra keyword arguments for the method (e.g. a Gemini model)
+
+    Returns:
+        (page texts by page number, pages the method could not process)
+    """
+    job = broker.get_job(task['job_id'])
+    if job is None:
+        raise ValueError(f"Job {task['job_id']} was removed")
+    page_texts = {}
+    metadata = {}
+    # The method writes an output file; the worker only keeps the page texts
+    fd, output_path = tempfile.mkstemp(suffix='.txt', prefix='worker_')
+    os.close(fd)
+    try:
+        get_method(job['method']).run(
+            job['pdf_path'], output_path, 'txt',
+            api_key=api_key, workers=ocr_workers,
+            metadata=metadata, page_numbers=task['pages'],
+            page_callback=lambda page_number, text: page_texts.__setitem__(page_number, text),
+            **(method_options or {})
+        )
+    finally:
+        os.remove(output_path)
+    missing = sorted(set(task['pages']) - set(page_texts))
+    if missing:
+        raise RuntimeError(f"Method {job['method']} returned no text for pages {missing}")
+    return page_texts, metadata.get('failed_pages', [])
+
+
+def _heartbeat(broker, task_id, worker_id, done, lost):
+    # Renew the lease three times per lease period until the task is done
+    while not done.wait(broker.lease_seconds / 3):
+        if not broker.heartbeat(task_id, worker_id):
+            logger.warning(f"Lost the lease of task {task_id}", extra={'task': task_id, 'worker': worker_id})
+            lost.set()
+            return
+
+
+def run_worker(broker, worker_id=None, methods=None, api_key=None, poll_interval=None, max_tasks=None,
+               stop=None, ocr_workers=1, method_options=None):
+    """
+    Lease and run tasks until stopped
+
+    Args:
+        broker: SQLiteBroker to take tasks from
+        worker_id: Name recorded with the tasks (None = hostname-pid)
+        methods: Only take tasks of these methods (None = any)
+        api_key: API key for methods that need one; without it (or a model in method_options)
+                 those methods are not served
+        poll_interval: Seconds between checks for tasks when idle (None = POLL_INTERVAL)
+        max_tasks: Stop after this many tasks (None = no limit)
+        stop: Optional threading.Event; the worker stops after the current task once it is set
+        ocr_workers: OCR processes the method may use per task
+        method_options: Extra keyword arguments for the method, see run_task
+
+    Returns:
+        Number of tasks completed
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    poll_interval = poll_interval or POLL_INTERVAL
+    stop = stop or threading.Event()
+    if not api_key and not (method_options or {}).get('model'):
+        methods = [name for name in (methods or method_names()) if not get_method(name).requires_api_key]
+    completed = 0
+    logger.info(f"Worker {worker_id} started", extra={'worker': worker_id, 'methods': methods})
+    while not stop.is_set() and (max_tasks is None or completed < max_tasks):
+        task = broker.lease(worker_id, methods)
+        if task is None:
+            stop.wait(poll_interval)
+            continue
+        done = threading.Event()
+        lost = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(broker, task['id'], worker_id, done, lost), daemon=True)
+        heartbeat.start()
+        try:
+            with metrics.stage('worker_task', pages=len(task['pages'])):
+                page_texts, failed_pages = run_task(broker, task, api_key, ocr_workers, method_options)
+        except Exception as e:
+            logger.exception(f"Task {task['id']} failed (attempt {task['attempts']}): {e}",
+                             extra={'task': task['id'], 'job_id': task['job_id'], 'worker': worker_id})
+            broker.fail(task['id'], worker_id, str(e))
+            continue
+        finally:
+            done.set()
+            heartbeat.join()
+        if broker.complete(task['id'], worker_id, page_texts, failed_pages):
+            completed += 1
+        else:
+            # Another worker has the task now; its result is kept instead
+            logger.warning(f"Dropped the result of task {task['id']}: the lease was lost",
+                           extra={'task': task['id'], 'worker': worker_id, 'heartbeat_failed': lost.is_set()})
+    logger.info(f"Worker {worker_id} stopped after {completed} tasks", extra={'worker': worker_id, 'tasks': completed})
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('broker', help='broker folder shared with the web app (PDF_BROKER_FOLDER)')
+    parser.add_argument('--methods', help='comma-separated methods to serve (default: all)')
+    parser.add_argument('--api-key', default=os.environ.get('GEMINI_API_KEY'),
+                        help='Gemini API key; without one, genai and ocr+genai tasks are left to other workers '
+                             '(default: $GEMINI_API_KEY)')
+    parser.add_argument('--ocr-workers', type=int, default=1, help='OCR processes per task (default: 1)')
+    parser.add_argument('--lease-seconds', type=int, default=None, help='lease length for the tasks this worker takes')
+    parser.add_argument('--max-tasks', type=int, default=None, help='exit after this many tasks')
+    args = parser.parse_args()
+
+    methods = args.methods.split(',') if args.methods else None
+    for name in methods or []:
+        if name not in method_names():
+            parser.error(f"Unknown method: {name}")
+    # Load the methods before the first task, so task time is processing time
+    preload(methods)
+
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: stop.set())
+    broker = SQLiteBroker(args.broker, lease_seconds=args.lease_seconds)
+    completed = run_worker(broker, methods=methods, api_key=args.api_key, max_tasks=args.max_tasks,
+                           stop=stop, ocr_workers=args.ocr_workers)
+    print(f"✅ Completed {completed} tasks")
+
+
+if __name__ == "__main__":
+    main()